@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AiCoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ai_core'
+
+    def ready(self):
+        from ai_core.signals import connect_signals
+        connect_signals()
@@ -0,0 +1,154 @@
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from channels.generic.websocket import AsyncWebsocketConsumer
+from ai_core.utils.channel_helpers import group_send, group_size, is_transient
+from ai_core.utils.llm_scheduler import LLMUnavailableError
+from users.utils.metrics import CHAT_STAGE_SECONDS
+from users.utils.rate_limit import rate_limiter, retry_after_header
+
+logger = logging.getLogger('ai_core.consumers')
+
+# Closes a socket that missed frames; the client reconnects and reloads its history.
+FRAMES_LOST_CLOSE_CODE = 4002
+
+
+class ConversationRoomConsumer(AsyncWebsocketConsumer):
+    """
+    Base consumer for sockets that share a per-conversation group.
+
+    Frames are written straight to this socket when it is the only member of
+    the group (the common case of one browser tab), skipping the channel layer
+    round trip. Frames broadcast inside `batch_frames()` are coalesced into a
+    single {"type": "batch", "frames": [...]} frame.
+
+    `with self.stage(name):` records a block in the chat_stage_seconds
+    histogram under this consumer's `metrics_label`, and `allow_turn()`
+    checks the user's LLM budget before a message is processed. Inside
+    `answering()`, a turn the LLM scheduler refuses ends with a
+    "busy" frame to this socket instead of closing it.
+
+    `run_in_background(coroutine, stage)` runs follow-up model work such as
+    titles and summaries without holding up the reply or the next message.
+    """
+
+    metrics_label = None
+    rate_limit_scope = "llm_turn"
+    room_group_name = None
+    _frame_buffer = None
+    _background_tasks = None
+
+    async def join_room(self, group_name: str):
+        self.room_group_name = group_name
+        await self.channel_layer.group_add(self.room_group_name, self.channel_name)
+
+    async def leave_room(self):
+        if self.room_group_name:
+            await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
+
+    async def broadcast_frame(self, frame: dict):
+        """Send one JSON frame to every socket in the room."""
+        if self._frame_buffer is not None:
+            self._frame_buffer.append(frame)
+            return
+        await self._deliver([frame])
+
+    @asynccontextmanager
+    async def batch_frames(self):
+        """Coalesce every frame broadcast inside the block into one socket write."""
+        if self._frame_buffer is not None:
+            # already batching, the outer block flushes
+            yield
+            return
+        self._frame_buffer = []
+        try:
+            yield
+        finally:
+            frames, self._frame_buffer = self._frame_buffer, None
+            if frames:
+                await self._deliver(frames)
+
+    async def allow_turn(self) -> bool:
+        """Take one LLM turn from the user's budget, telling only this socket when it is spent."""
+        wait = await rate_limiter.ahit(self.rate_limit_scope, f"user:{self.user.id}")
+        if not wait:
+            return True
+        await self.send(text_data=json.dumps({
+            "type": "rate_limited",
+            "content": "You're sending messages too quickly, please wait a moment.",
+            "retry_after": int(retry_after_header(wait)),
+        }))
+        return False
+
+    @asynccontextmanager
+    async def answering(self):
+        """Tell this socket the AI is busy when the scheduler refuses the turn's model calls."""
+        try:
+            yield
+        except LLMUnavailableError as exception:
+            logger.warning(f"LLM call refused for user {self.user.id}: {exception}")
+            await self.send(text_data=json.dumps({
+                "type": "busy",
+                "content": "The AI tutor is busy right now, please try again in a moment.",
+            }))
+
+    def stage(self, name: str):
+        return CHAT_STAGE_SECONDS.time(consumer=self.metrics_label, stage=name)
+
+    def run_in_background(self, coroutine, stage: str) -> asyncio.Task:
+        """Run `coroutine` as a task timed under `stage`, logging instead of raising its errors."""
+        if self._background_tasks is None:
+            self._background_tasks = set()
+        task = asyncio.create_task(self._run_stage(coroutine, stage))
+        # the loop only keeps a weak reference to running tasks
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+
+    async def _run_stage(self, coroutine, stage: str):
+        try:
+            with self.stage(stage):
+                await coroutine
+        except LLMUnavailableError as exception:
+            logger.warning(f"Skipped {stage} for {self.room_group_name}: {exception}")
+        except Exception:
+            logger.exception(f"{stage} failed for {self.room_group_name}")
+
+    async def _deliver(self, frames: list):
+        with self.stage("broadcast"):
+            if await self._is_sole_member():
+                await self.chat_frames({"frames": frames})
+                return
+            transient = is_transient(frames)
+            try:
+                await group_send(
+                    self.channel_layer,
+                    self.room_group_name,
+                    {"type": "chat.frames", "frames": frames},
+                    droppable=transient,
+                )
+            except Exception:
+                if transient:
+                    logger.warning(f"Dropped transient frames for {self.room_group_name}", exc_info=True)
+                    return
+                logger.exception(f"Could not broadcast frames to {self.room_group_name}")
+                await self.close(code=FRAMES_LOST_CLOSE_CODE)
+
+    async def _is_sole_member(self) -> bool:
+        return await group_size(self.channel_layer, self.room_group_name) == 1
+
+    async def chat_frames(self, event):
+        frames = event["frames"]
+        if len(frames) == 1:
+            await self.send(text_data=json.dumps(frames[0]))
+        else:
+            await self.send(text_data=json.dumps({"type": "batch", "frames": frames}))
+
+    # Legacy single-frame handlers, kept so workers running older code can
+    # still deliver to this socket during a rolling deploy.
+    async def chat_message(self, event):
+        await self.send(text_data=json.dumps(event["message"]))
+
+    async def chat_event(self, event):
+        await self.send(text_data=json.dumps(event["event"]))
@@ -1,9 +1,9 @@
 import json
 import uuid
-from channels.generic.websocket import AsyncWebsocketConsumer
 from ai_core.models import MessageSenderChoices, MessageTypeChoices
 from ai_core.utils.ai_helpers_general import AIService
 from ai_core.utils.auth_helpers import authenticate_user
+from ai_core.consumers.base import ConversationRoomConsumer
 from ai_core.utils.conversation_helpers import ConversationService
 from channels.db import database_sync_to_async
 import logging
@@ -12,34 +12,33 @@ import asyncio
 logger = logging.getLogger('ai_core.consumers')
 
 
-class AIChatConsumer(AsyncWebsocketConsumer):
+class AIChatConsumer(ConversationRoomConsumer):
+    metrics_label = "chat"
+    # pause between "typing" and the reply; benchmarks set it to 0
+    typing_delay_seconds = 1
+
     async def connect(self):
         logger.info("WebSocket connection attempt------------")
         self.conversation_id = uuid.UUID(self.scope['url_route']['kwargs']['conversation_id'])
         try:
-            self.user = await authenticate_user(self.scope)
+            with self.stage("auth"):
+                self.user = await authenticate_user(self.scope)
         except ValueError:
             await self.close(code=4001)
             return
         
-        self.room_group_name = f"conversation_{self.conversation_id}"
-        await self.channel_layer.group_add(
-            self.room_group_name,
-            self.channel_name
-        )
+        await self.join_room(f"conversation_{self.conversation_id}")
         self.ai_service = AIService()
         self.conversation_service = ConversationService()
 
-        self.conversation = await self.conversation_service.get_conversation(self.conversation_id)
+        with self.stage("load"):
+            self.conversation = await self.conversation_service.get_conversation(self.conversation_id)
         
         await self.accept()
 
 
     async def disconnect(self, close_code):
-        await self.channel_layer.group_discard(
-            self.room_group_name,
-            self.channel_name
-        )
+        await self.leave_room()
 
     async def receive(self, text_data):
         data = json.loads(text_data)
@@ -50,83 +49,72 @@ class AIChatConsumer(AsyncWebsocketConsumer):
         if not message_content and not code_snippet:
             return
 
-        # Save user message
-        user_message = await self.conversation_service.save_user_message(
-            self.conversation,
-            message_content,
-            code_snippet,
-            language,
-        )
-        await self.broadcast_message(user_message)
-        # tell the frontend the ai is typing...
-        await self.broadcast_event("typing_start")
+        if not await self.allow_turn():
+            return
 
-        # short natural delay to simulate human like pause
-        await asyncio.sleep(1)
-
-        needs_title = False
-        user_messages_count = await database_sync_to_async(
-                lambda: self.conversation.messages.filter(sender=MessageSenderChoices.USER).count()
-            )()
-        if user_messages_count == 1:
-            needs_title = True
-        
-        if needs_title:
-            await self.conversation_service.generate_and_update_title(
+        async with self.answering():
+            with self.stage("turn"):
+                await self._reply(message_content, code_snippet, language)
+
+    async def _reply(self, message_content, code_snippet, language):
+        # Save user message
+        with self.stage("save"):
+            user_message = await self.conversation_service.save_user_message(
                 self.conversation,
-                message_content
+                message_content,
+                code_snippet,
+                language,
             )
+        async with self.batch_frames():
+            await self.broadcast_message(user_message)
+            # tell the frontend the ai is typing...
+            await self.broadcast_event("typing_start")
 
+        # short natural delay to simulate human like pause
+        await asyncio.sleep(self.typing_delay_seconds)
+
+        # title_generated was loaded with the conversation, so only the first
+        # message of a conversation costs a query. The title runs on the
+        # background lane alongside the reply instead of ahead of it.
+        if not self.conversation.title_generated and await self.conversation_service.claim_title_generation(self.conversation):
+            self.run_in_background(
+                self.conversation_service.generate_and_update_title(self.conversation, message_content),
+                "title",
+            )
 
-        # Generate AI response
+        # Generate AI response (context and llm are recorded inside the service)
         ai_text = await self.ai_service.generate_response(message_content, code_snippet, self.conversation)
 
         # Save AI message
-        ai_message = await self.conversation_service.save_ai_message(
-            self.conversation,
-            ai_text
-        )
+        with self.stage("save"):
+            ai_message = await self.conversation_service.save_ai_message(
+                self.conversation,
+                ai_text
+            )
 
-        await self.ai_service.generate_summary(self.conversation)
+        async with self.batch_frames():
+            # tell the frontend the ai is done typing
+            await self.broadcast_event("done")
 
-        # tell the frontend the ai is done typing
-        await self.broadcast_event("done")
+            await self.broadcast_message(ai_message)
 
-        await self.broadcast_message(ai_message)
+        # the summary is only read by later turns, so the reply doesn't wait for it
+        self.run_in_background(self.ai_service.generate_summary(self.conversation), "summary")
 
 
     async def broadcast_message(self, message):
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                "type": "chat.message",
-                "message": {
-                    "id": str(message.id),
-                    "sender": message.sender,
-                    "content": message.content,
-                    "message_type": message.message_type,
-                    "code_snippet": message.code_snippet,
-                    "language": message.language,
-                    "timestamp": message.created_at.isoformat()
-                }
-            }
-        )
-
-    async def chat_message(self, event):
-        await self.send(text_data=json.dumps(event["message"]))
-
+        await self.broadcast_frame({
+            "id": str(message.id),
+            "sender": message.sender,
+            "content": message.content,
+            "message_type": message.message_type,
+            "code_snippet": message.code_snippet,
+            "language": message.language,
+            "timestamp": message.created_at.isoformat()
+        })
 
     async def broadcast_event(self, event_type: str, content: str = ""):
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                "type": "chat.event",
-                "event": {
-                    "type": event_type,
-                    "content": content,
-                },
-            },
-        )
-
-    async def chat_event(self, event):
-        await self.send(text_data=json.dumps(event["event"]))
+        await self.broadcast_frame({
+            "type": event_type,
+            "content": content,
+        })
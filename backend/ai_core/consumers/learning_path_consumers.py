@@ -1,40 +1,41 @@
 import json
 import uuid
-from channels.generic.websocket import AsyncWebsocketConsumer
 from ai_core.models import MessageSenderChoices, MessageTypeChoices
 from ai_core.utils.auth_helpers import authenticate_user
+from ai_core.consumers.base import ConversationRoomConsumer
 from ai_core.utils.conversation_helpers import ConversationService
 from channels.db import database_sync_to_async
 import logging
 import asyncio
 from learning_paths.models import UserLearningPath, SubtopicProgress, SubtopicProgressChoices, LearningSubtopic
-from learning_paths.services.learning_path_ai_services import LearningPathTutorAI
+from learning_paths.services.learning_path_ai_services import LearningPathTutorAI, progress_snapshot
+from learning_paths.services.subtopic_greeting_service import SubtopicGreetingService
 from django.utils import timezone
 from ai_core.models import Conversation, ConversationTypeChoices
 
 logger = logging.getLogger('ai_core.consumers')
 
 
-class LearningAIPathChatConsumer(AsyncWebsocketConsumer):
+class LearningAIPathChatConsumer(ConversationRoomConsumer):
+    metrics_label = "learning_path"
+    # pause between "typing" and the reply; benchmarks set it to 0
+    typing_delay_seconds = 3
+
     async def connect(self):
         self.learning_topic_id = uuid.UUID(self.scope['url_route']['kwargs']['learning_topic_id'])
         self.subtopic_id = uuid.UUID(self.scope['url_route']['kwargs']['subtopic_id'])
         
         try:
-            self.user = await authenticate_user(self.scope)
+            with self.stage("auth"):
+                self.user = await authenticate_user(self.scope)
         except ValueError:
             await self.close(code=4001)
             return
         
-        user_learning_path = await database_sync_to_async(
-            lambda: UserLearningPath.objects.get(topic=self.learning_topic_id, user=self.user)
-        )()
-        self.user_learning_path = user_learning_path
-        
         def get_or_create_progress():
             subtopic = LearningSubtopic.objects.get(id=self.subtopic_id)
             progress, created = SubtopicProgress.objects.get_or_create(
-                user_path=user_learning_path,
+                user_path=self.user_learning_path,
                 subtopic=subtopic,
                 defaults={
                     'status': SubtopicProgressChoices.LEARNING,
@@ -47,21 +48,21 @@ class LearningAIPathChatConsumer(AsyncWebsocketConsumer):
             if not progress.conversation:
                 conversation = Conversation.objects.create(
                     user=self.user,
-                    title=f"{user_learning_path.topic.name} - {subtopic.name}",
+                    title=f"{self.user_learning_path.topic.name} - {subtopic.name}",
                     conversation_type=ConversationTypeChoices.LEARNING_PATH
                 )
                 progress.conversation = conversation
                 progress.save()
             
             return progress, progress.conversation, subtopic
+
+        with self.stage("load"):
+            self.user_learning_path = await database_sync_to_async(
+                lambda: UserLearningPath.objects.get(topic=self.learning_topic_id, user=self.user)
+            )()
+            self.subtopic_progress, self.conversation, self.subtopic = await database_sync_to_async(get_or_create_progress)()
         
-        self.subtopic_progress, self.conversation, self.subtopic = await database_sync_to_async(get_or_create_progress)()
-        
-        self.room_group_name = f"conversation_{self.conversation.id}"
-        await self.channel_layer.group_add(
-            self.room_group_name,
-            self.channel_name
-        )
+        await self.join_room(f"conversation_{self.conversation.id}")
         self.ai_service = LearningPathTutorAI(self.user_learning_path)
         self.conversation_service = ConversationService()
 
@@ -70,30 +71,33 @@ class LearningAIPathChatConsumer(AsyncWebsocketConsumer):
         # check the message count if 0 send a greeting message.
         message_count = await database_sync_to_async(lambda: self.conversation.messages.count())()
         if message_count == 0:
-            topic_name = await database_sync_to_async(lambda: self.user_learning_path.topic.name)()
-            subtopic_name = await database_sync_to_async(lambda: self.subtopic.name)()
-            
-            greeting_data = await self.ai_service.generate_greeting_message(topic_name=topic_name, subtopic_name=subtopic_name)
-            greeting_content = greeting_data.get('greeting_message', 'Welcome to your learning journey!')
-            
-            # Save the greeting message to the database
-            greeting_message = await self.conversation_service.save_message(
-                conversation=self.conversation,
-                sender=MessageSenderChoices.AI,
-                content=greeting_content,
-                message_type=MessageTypeChoices.CONVERSATION
+            # a refused greeting is retried on the next connect, while the conversation is still empty
+            async with self.answering():
+                await self._greet()
+
+    async def _greet(self):
+        topic_name = await database_sync_to_async(lambda: self.user_learning_path.topic.name)()
+        subtopic_name = await database_sync_to_async(lambda: self.subtopic.name)()
+
+        with self.stage("greeting"):
+            greeting_content = await SubtopicGreetingService.get_greeting(
+                self.subtopic.id, topic_name, subtopic_name, user_id=self.user.id, conversation=self.conversation
             )
-            
-            # Broadcast the greeting message
-            await self.broadcast_message(greeting_message)
+        greeting_content = greeting_content or 'Welcome to your learning journey!'
 
+        # Save the greeting message to the database
+        greeting_message = await self.conversation_service.save_message(
+            conversation=self.conversation,
+            sender=MessageSenderChoices.AI,
+            content=greeting_content,
+            message_type=MessageTypeChoices.CONVERSATION
+        )
 
+        # Broadcast the greeting message
+        await self.broadcast_message(greeting_message)
 
     async def disconnect(self, close_code):
-        await self.channel_layer.group_discard(
-            self.room_group_name,
-            self.channel_name
-        )
+        await self.leave_room()
 
     async def receive(self, text_data):
         """Handle incoming messages from the user"""
@@ -102,7 +106,12 @@ class LearningAIPathChatConsumer(AsyncWebsocketConsumer):
         
         # Handle different actions
         if action == "next_subtopic":
-            await self.handle_next_subtopic()
+            # moving on generates a greeting, so it spends a turn too
+            if not await self.allow_turn():
+                return
+            async with self.answering():
+                with self.stage("transition"):
+                    await self.handle_next_subtopic()
             return
         
         message_content = data.get("message")
@@ -112,28 +121,40 @@ class LearningAIPathChatConsumer(AsyncWebsocketConsumer):
         if not message_content and not code_snippet:
             return
 
+        if not await self.allow_turn():
+            return
+
+        async with self.answering():
+            with self.stage("turn"):
+                await self._reply(message_content, code_snippet, language)
+
+    async def _reply(self, message_content, code_snippet, language):
         # Save user message
-        user_message = await self.conversation_service.save_message(
-            conversation=self.conversation,
-            sender=MessageSenderChoices.USER,
-            content=message_content or "",
-            code_snippet=code_snippet,
-            language=language,
-            message_type=MessageTypeChoices.CONVERSATION
-        )
-        await self.broadcast_message(user_message)
-        
-        # Tell the frontend the AI is typing
-        await self.broadcast_event("typing_start")
+        with self.stage("save"):
+            user_message = await self.conversation_service.save_message(
+                conversation=self.conversation,
+                sender=MessageSenderChoices.USER,
+                content=message_content or "",
+                code_snippet=code_snippet,
+                language=language,
+                message_type=MessageTypeChoices.CONVERSATION
+            )
+        async with self.batch_frames():
+            await self.broadcast_message(user_message)
+
+            # Tell the frontend the AI is typing
+            await self.broadcast_event("typing_start")
 
         # Short natural delay to simulate human-like pause
-        await asyncio.sleep(3)
+        await asyncio.sleep(self.typing_delay_seconds)
 
-        # Generate AI response using learning path tutor
+        # Generate AI response using learning path tutor (context, llm, parse and
+        # progress are recorded inside the service)
         ai_response_data = await self.ai_service.generate_response(
             message_content=message_content or "",
             code_snippet=code_snippet,
-            conversation=self.conversation
+            conversation=self.conversation,
+            signals=user_message.signals
         )
         
         # Parse AI response - it should be a JSON string with content, code_snippet, language, type
@@ -149,6 +170,7 @@ class LearningAIPathChatConsumer(AsyncWebsocketConsumer):
             ai_language = response_json.get('language', 'python')
             ai_message_type = response_json.get('type', 'conversation')
             subtopic_complete = response_json.get('subtopic_complete', False)
+            progress_data = response_json.get('progress')
         except (json.JSONDecodeError, AttributeError):
             # Fallback: treat as plain text
             ai_content = ai_response_data if isinstance(ai_response_data, str) else str(ai_response_data)
@@ -156,49 +178,48 @@ class LearningAIPathChatConsumer(AsyncWebsocketConsumer):
             ai_language = None
             ai_message_type = 'conversation'
             subtopic_complete = False
+            progress_data = None
 
         # Save AI message
-        ai_message = await self.conversation_service.save_message(
-            conversation=self.conversation,
-            sender=MessageSenderChoices.AI,
-            content=ai_content,
-            code_snippet=ai_code_snippet,
-            language=ai_language,
-            message_type=ai_message_type
-        )
-        
-        # Broadcast AI message FIRST
-        await self.broadcast_message(ai_message)
+        with self.stage("save"):
+            ai_message = await self.conversation_service.save_message(
+                conversation=self.conversation,
+                sender=MessageSenderChoices.AI,
+                content=ai_content,
+                code_snippet=ai_code_snippet,
+                language=ai_language,
+                message_type=ai_message_type
+            )
         
-        # THEN tell the frontend the AI is done typing
-        await self.broadcast_event("done")
+        # The tutor returns the row it just wrote; only re-read it when the
+        # reply carried no progress update
+        if not progress_data:
+            with self.stage("progress"):
+                progress_data = progress_snapshot(await database_sync_to_async(
+                    lambda: SubtopicProgress.objects.get(id=self.subtopic_progress.id)
+                )())
+        is_ready = progress_data['is_ready_to_move_on']
 
-        subtopic_progress = await database_sync_to_async(
-            lambda: SubtopicProgress.objects.get(id=self.subtopic_progress.id)
-        )()
-        
-        is_ready = await database_sync_to_async(lambda: subtopic_progress.is_ready_to_move_on)()
-        progress_data = {
-            'covered_points': subtopic_progress.covered_points,
-            'remaining_points': subtopic_progress.remaining_points,
-            'ai_confidence': subtopic_progress.ai_confidence,
-            'progress_percentage': await database_sync_to_async(lambda: subtopic_progress.progress_percentage)(),
-            'challenges_completed': subtopic_progress.challenges_completed,
-            'challenges_attempted': subtopic_progress.challenges_attempted,
-            'is_ready_to_move_on': is_ready
-        }
-        await self.broadcast_event("progress_update", json.dumps(progress_data))
-        
-        # Notify frontend if user is ready to move on
-        if is_ready:
-            await self.broadcast_event("ready_for_next_subtopic", "You're ready to move to the next subtopic!")
-        
-        # Check if AI detected subtopic completion
-        if subtopic_complete:
-            await self.broadcast_event("subtopic_complete", "The AI has detected you've mastered this subtopic!")
+        # The reply, typing-done and progress events go out as one frame
+        async with self.batch_frames():
+            # Broadcast AI message FIRST
+            await self.broadcast_message(ai_message)
+
+            # THEN tell the frontend the AI is done typing
+            await self.broadcast_event("done")
+
+            await self.broadcast_event("progress_update", json.dumps(progress_data))
+
+            # Notify frontend if user is ready to move on
+            if is_ready:
+                await self.broadcast_event("ready_for_next_subtopic", "You're ready to move to the next subtopic!")
+
+            # Check if AI detected subtopic completion
+            if subtopic_complete:
+                await self.broadcast_event("subtopic_complete", "The AI has detected you've mastered this subtopic!")
 
         # Generate summary of the learning session (async, doesn't block)
-        await self.ai_service.generate_summary(self.conversation)
+        self.run_in_background(self.ai_service.generate_summary(self.conversation), "summary")
 
     async def handle_next_subtopic(self):
         """Handle moving to the next subtopic"""
@@ -212,35 +233,40 @@ class LearningAIPathChatConsumer(AsyncWebsocketConsumer):
                                    f"{result['new_subtopic_description']}"
                 
                 # Generate greeting for new subtopic
-                greeting_data = await self.ai_service.generate_greeting_message(
-                    topic_name=await database_sync_to_async(lambda: self.user_learning_path.topic.name)(),
-                    subtopic_name=result['new_subtopic']
+                greeting_content = await SubtopicGreetingService.get_greeting(
+                    result['new_subtopic_id'],
+                    await database_sync_to_async(lambda: self.user_learning_path.topic.name)(),
+                    result['new_subtopic'],
+                    user_id=self.user.id,
+                    conversation=self.conversation
                 )
-                greeting_content = greeting_data.get('greeting_message', 'Let\'s begin this new subtopic!')
+                greeting_content = greeting_content or 'Let\'s begin this new subtopic!'
                 
-                # Save and broadcast transition message
+                # Save transition message
                 transition_msg = await self.conversation_service.save_message(
                     conversation=self.conversation,
                     sender=MessageSenderChoices.AI,
                     content=transition_message,
                     message_type=MessageTypeChoices.CONVERSATION
                 )
-                await self.broadcast_message(transition_msg)
                 
-                # Save and broadcast greeting
+                # Save greeting
                 greeting_msg = await self.conversation_service.save_message(
                     conversation=self.conversation,
                     sender=MessageSenderChoices.AI,
                     content=greeting_content,
                     message_type=MessageTypeChoices.CONVERSATION
                 )
-                await self.broadcast_message(greeting_msg)
-                
-                # Notify frontend of subtopic change
-                await self.broadcast_event("subtopic_changed", json.dumps({
-                    'new_subtopic': result['new_subtopic'],
-                    'completed_subtopic': result['completed_subtopic']
-                }))
+
+                async with self.batch_frames():
+                    await self.broadcast_message(transition_msg)
+                    await self.broadcast_message(greeting_msg)
+
+                    # Notify frontend of subtopic change
+                    await self.broadcast_event("subtopic_changed", json.dumps({
+                        'new_subtopic': result['new_subtopic'],
+                        'completed_subtopic': result['completed_subtopic']
+                    }))
                 
             elif result.get('learning_path_completed'):
                 # Learning path completed!
@@ -254,45 +280,27 @@ class LearningAIPathChatConsumer(AsyncWebsocketConsumer):
                     content=completion_message,
                     message_type=MessageTypeChoices.CONVERSATION
                 )
-                await self.broadcast_message(completion_msg)
-                
-                await self.broadcast_event("learning_path_completed", "Congratulations!")
+                async with self.batch_frames():
+                    await self.broadcast_message(completion_msg)
+
+                    await self.broadcast_event("learning_path_completed", "Congratulations!")
 
     async def broadcast_message(self, message):
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                "type": "chat.message", 
-                "message": {
-                    "type": message.message_type,
-                    "payload": {
-                        "id": str(message.id),
-                        "sender": message.sender,
-                        "content": message.content,
-                        "code_snippet": message.code_snippet,
-                        "language": message.language,
-                        "timestamp": message.created_at.isoformat()
-                    }
-                }
+        await self.broadcast_frame({
+            "type": message.message_type,
+            "payload": {
+                "id": str(message.id),
+                "sender": message.sender,
+                "content": message.content,
+                "code_snippet": message.code_snippet,
+                "language": message.language,
+                "timestamp": message.created_at.isoformat()
             }
-        )
-
-    async def chat_message(self, event):
-        await self.send(text_data=json.dumps(event["message"]))
+        })
 
     async def broadcast_event(self, event_type: str, content: str = ""):
         """Broadcast events like typing indicators"""
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {
-                "type": "chat.event",
-                "event": {
-                    "type": event_type,
-                    "content": content,
-                },
-            },
-        )
-
-    async def chat_event(self, event):
-        """Handle chat events like typing indicators"""
-        await self.send(text_data=json.dumps(event["event"]))
\ No newline at end of file
+        await self.broadcast_frame({
+            "type": event_type,
+            "content": content,
+        })
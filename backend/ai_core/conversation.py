@@ -2,9 +2,11 @@ from uuid import UUID
 from ninja import Router
 from ai_core.models import Conversation
 from ai_core.api_types import ConversationResponse, MessageResponse, CreateConversationSchema, UpdateConversationTitleSchema
+from django.db.models import Count, Max
 from django.http import HttpRequest
 from django.shortcuts import get_object_or_404
 from users.utils.ninja import post, get, put, delete
+from users.utils.etags import etag_matches, etag_response, make_etag, not_modified, render_json
 from typing import Dict
 import logging
 
@@ -42,10 +44,25 @@ def get_conversations(request: HttpRequest):
 
 @get(router, "/{conversation_id}/", response={200: ConversationResponse, 401: Dict[str, str]})
 def get_conversation(request: HttpRequest, conversation_id: UUID):
-    conversation = get_object_or_404(Conversation, id=conversation_id)
+    # messages are only ever appended or deleted, so their count and newest
+    # timestamp (one indexed aggregate) identify the version the client holds
+    conversation = get_object_or_404(
+        Conversation.objects.annotate(message_count=Count('messages'), last_message_at=Max('messages__created_at')),
+        id=conversation_id,
+    )
     if conversation is None:
         conversation = Conversation.objects.create(user=request.user, title="New Conversation")
-        
+
+    etag = make_etag(
+        conversation.id,
+        conversation.title,
+        conversation.last_active_at,
+        conversation.message_count,
+        conversation.last_message_at,
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
     response = ConversationResponse(
         id=conversation.id,
         title=conversation.title,
@@ -60,10 +77,10 @@ def get_conversation(request: HttpRequest, conversation_id: UUID):
                 timestamp=message.created_at,
                 language=message.language if message.language else None
             )
-            for message in conversation.messages.all()
+            for message in conversation.messages.order_by('created_at')
         ]
     )
-    return response
+    return etag_response(request, render_json(response), etag)
 
 
 @post(router, "create-conversation", response={200: ConversationResponse, 401: Dict[str, str]})
@@ -0,0 +1,118 @@
+import asyncio
+import multiprocessing
+import os
+import queue
+import time
+import uuid
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _setup_django():
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'bug_hunt_project.settings')
+    django.setup()
+
+
+def _receiver(group, count, ready, results, timeout):
+    """Worker process: joins `group` and counts messages until `count` arrive or `timeout`."""
+    _setup_django()
+    from channels.layers import get_channel_layer
+
+    async def run():
+        layer = get_channel_layer()
+        channel = await layer.new_channel()
+        await layer.group_add(group, channel)
+        ready.set()
+
+        received = 0
+        first_at = last_at = None
+        deadline = time.monotonic() + timeout
+        while received < count and time.monotonic() < deadline:
+            try:
+                await asyncio.wait_for(layer.receive(channel), timeout=max(deadline - time.monotonic(), 0.01))
+            except asyncio.TimeoutError:
+                break
+            last_at = time.monotonic()
+            first_at = first_at or last_at
+            received += 1
+
+        await layer.group_discard(group, channel)
+        results.put({'role': 'receiver', 'received': received, 'elapsed': (last_at - first_at) if received > 1 else 0})
+
+    asyncio.run(run())
+
+
+def _sender(group, count, payload_size, ready, results, timeout):
+    """Worker process: waits for the receiver, then sends `count` group messages."""
+    _setup_django()
+    from channels.layers import get_channel_layer
+
+    async def run():
+        layer = get_channel_layer()
+        if not ready.wait(timeout):
+            results.put({'role': 'sender', 'sent': 0, 'elapsed': 0})
+            return
+        payload = 'x' * payload_size
+        started = time.monotonic()
+        for i in range(count):
+            await layer.group_send(group, {'type': 'chat.event', 'event': {'type': 'benchmark', 'content': payload, 'seq': i}})
+        results.put({'role': 'sender', 'sent': count, 'elapsed': time.monotonic() - started})
+
+    asyncio.run(run())
+
+
+class Command(BaseCommand):
+    help = 'Measure channel layer throughput (messages/sec) between two worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=5000, help='Number of group messages to send')
+        parser.add_argument('--payload-size', type=int, default=256, help='Bytes of content per message')
+        parser.add_argument('--timeout', type=float, default=60, help='Seconds before the run is abandoned')
+
+    def handle(self, *args, **options):
+        from django.conf import settings
+
+        backend = settings.CHANNEL_LAYERS['default']['BACKEND']
+        self.stdout.write(f'Benchmarking {backend} with {options["messages"]} messages...')
+
+        ctx = multiprocessing.get_context('spawn')
+        group = f'benchmark_{uuid.uuid4().hex}'
+        ready = ctx.Event()
+        results = ctx.Queue()
+        workers = [
+            ctx.Process(target=_receiver, args=(group, options['messages'], ready, results, options['timeout'])),
+            ctx.Process(target=_sender, args=(group, options['messages'], options['payload_size'], ready, results, options['timeout'])),
+        ]
+        for worker in workers:
+            worker.start()
+
+        # drain before joining: a worker can't exit while its report is still buffered for the queue
+        reports = {}
+        deadline = time.monotonic() + options['timeout'] + 10
+        try:
+            while len(reports) < len(workers):
+                report = results.get(timeout=max(deadline - time.monotonic(), 0.1))
+                reports[report['role']] = report
+        except queue.Empty:
+            raise CommandError('A worker process did not report back')
+        finally:
+            for worker in workers:
+                worker.join(10)
+
+        sender, receiver = reports['sender'], reports['receiver']
+        if receiver['received'] == 0:
+            raise CommandError(
+                f'No messages crossed the process boundary; {backend} is not shared between processes. '
+                'Set REDIS_URL to use the Redis channel layer.'
+            )
+
+        send_rate = sender['sent'] / sender['elapsed'] if sender['elapsed'] else 0
+        receive_rate = receiver['received'] / receiver['elapsed'] if receiver['elapsed'] else 0
+        self.stdout.write(f'Sent:      {sender["sent"]} msgs in {sender["elapsed"]:.2f}s ({send_rate:,.0f} msgs/sec)')
+        self.stdout.write(f'Received:  {receiver["received"]} msgs in {receiver["elapsed"]:.2f}s ({receive_rate:,.0f} msgs/sec)')
+        dropped = sender['sent'] - receiver['received']
+        if dropped:
+            self.stdout.write(self.style.WARNING(
+                f'{dropped} messages were dropped (channel capacity {settings.CHANNEL_LAYER_CONFIG["capacity"]})'
+            ))
+        self.stdout.write(self.style.SUCCESS('Benchmark complete'))
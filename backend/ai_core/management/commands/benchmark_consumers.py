@@ -0,0 +1,344 @@
+import asyncio
+import contextvars
+import json
+import platform
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+from ai_core.consumers.consumers import AIChatConsumer
+from ai_core.consumers.learning_path_consumers import LearningAIPathChatConsumer
+from ai_core.models import Conversation, ConversationTypeChoices
+from ai_core.utils import ai_helpers_general
+from ai_core.utils.fake_llm import FakeClient
+from learning_paths.models import LearningSubtopic, LearningTopic, UserLearningPath
+from learning_paths.services import learning_path_ai_services
+from users.models import CustomUser
+from users.utils.auth import create_jwt
+from users.utils.rate_limit import rate_limiter
+
+# Metrics compared by --compare, as (section, key) paths into the results JSON
+COMPARED_METRICS = ('turn_ms.p50', 'turn_ms.p95', 'turn_ms.p99', 'first_event_ms.p95', 'queries_per_turn')
+
+
+def percentiles(samples):
+    """p50/p95/p99/max (nearest rank) of a list of milliseconds."""
+    if not samples:
+        return {'count': 0, 'p50': None, 'p95': None, 'p99': None, 'max': None}
+    ordered = sorted(samples)
+
+    def rank(p):
+        return round(ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))], 2)
+
+    return {'count': len(ordered), 'p50': rank(50), 'p95': rank(95), 'p99': rank(99), 'max': round(ordered[-1], 2)}
+
+
+# The query tally of the benchmark client whose consumer is running. Set inside
+# each client's application task, so it follows the consumer into its
+# sync_to_async threads and background tasks, and never into other clients'.
+client_queries = contextvars.ContextVar('client_queries', default=None)
+
+
+class QueryTally:
+    def __init__(self):
+        self.count = 0
+
+
+class QueryCounter:
+    """
+    Counts queries on every database connection, including the ones
+    sync_to_async threads open, and adds each to the running client's tally.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        tally = client_queries.get()
+        with self._lock:
+            self.count += 1
+            if tally is not None:
+                tally.count += 1
+        return execute(sql, params, many, context)
+
+    def install(self):
+        connection_created.connect(self._on_connection_created, weak=False)
+        for connection in connections.all(initialized_only=True):
+            connection.execute_wrappers.append(self)
+
+    def uninstall(self):
+        connection_created.disconnect(self._on_connection_created)
+
+    def _on_connection_created(self, sender, connection, **kwargs):
+        if self not in connection.execute_wrappers:
+            connection.execute_wrappers.append(self)
+
+
+def counted(application, tally: QueryTally):
+    """The ASGI application, with every query it runs added to `tally`."""
+    async def app(scope, receive, send):
+        client_queries.set(tally)
+        return await application(scope, receive, send)
+    return app
+
+
+def unpack(text):
+    """Frames carried by one socket message (batched or single)."""
+    frame = json.loads(text)
+    if frame.get('type') == 'batch':
+        return frame['frames']
+    return [frame]
+
+
+class Command(BaseCommand):
+    help = (
+        'Drive simulated clients through the chat and learning-path consumers with a fake LLM '
+        'and report turn latency, time to first event, event-loop lag and queries per turn'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chat-clients', type=int, default=20, help='Concurrent clients on ws/chat/<id>')
+        parser.add_argument('--learning-clients', type=int, default=20, help='Concurrent clients on ws/learning-path/...')
+        parser.add_argument('--turns', type=int, default=10, help='Messages each client sends')
+        parser.add_argument('--think-time', type=float, default=0.0, help='Seconds a client waits between turns')
+        parser.add_argument('--ramp-up', type=float, default=1.0, help='Seconds over which clients connect')
+        parser.add_argument('--llm-latency', type=float, default=0.0, help='Seconds the fake LLM takes per call')
+        parser.add_argument('--typing-delay', action='store_true', help="Keep the consumers' typing pause")
+        parser.add_argument('--rate-limit', action='store_true', help="Keep the per-user LLM turn rate limit")
+        parser.add_argument('--timeout', type=float, default=30.0, help='Seconds to wait for a turn to finish')
+        parser.add_argument('--lag-interval', type=float, default=0.01, help='Event-loop lag probe interval in seconds')
+        parser.add_argument('--output', help='Write the results JSON here')
+        parser.add_argument('--compare', help='Results JSON from an earlier run to compare against')
+        parser.add_argument('--keep-data', action='store_true', help='Leave the seeded users and conversations in place')
+
+    def handle(self, *args, **options):
+        if options['chat_clients'] + options['learning_clients'] == 0:
+            raise CommandError('Nothing to run; set --chat-clients or --learning-clients')
+        baseline = self._load(options['compare']) if options['compare'] else None
+
+        run = uuid.uuid4().hex[:8]
+        self.stdout.write(
+            f'Seeding {options["chat_clients"]} chat and {options["learning_clients"]} learning-path clients...'
+        )
+        clients = self._seed(run, options)
+
+        counter = QueryCounter()
+        fake_client = FakeClient(latency_seconds=options['llm_latency'])
+        try:
+            with ExitStack() as patches:
+                # the LLM is stubbed in-process; everything else (auth, DB, channel layer) is real
+                patches.enter_context(mock.patch.object(ai_helpers_general, 'client', fake_client))
+                patches.enter_context(mock.patch.object(learning_path_ai_services, 'client', fake_client))
+                if not options['typing_delay']:
+                    for consumer in (AIChatConsumer, LearningAIPathChatConsumer):
+                        patches.enter_context(mock.patch.object(consumer, 'typing_delay_seconds', 0))
+                if not options['rate_limit']:
+                    # a load test sends turns far faster than a person could
+                    patches.enter_context(mock.patch.object(rate_limiter, 'limits', {}))
+                counter.install()
+                results = asyncio.run(self._run(clients, counter, options))
+        finally:
+            counter.uninstall()
+            if not options['keep_data']:
+                self._cleanup(run)
+
+        report = {
+            'run': run,
+            'finished_at': timezone.now().isoformat(),
+            'options': {key: options[key] for key in (
+                'chat_clients', 'learning_clients', 'turns', 'think_time', 'ramp_up', 'llm_latency', 'typing_delay',
+                'rate_limit',
+            )},
+            'environment': {
+                'python': platform.python_version(),
+                'database': connections['default'].vendor,
+                'channel_layer': settings.CHANNEL_LAYERS['default']['BACKEND'],
+            },
+            **results,
+        }
+        self._print(report, baseline)
+        if options['output']:
+            path = Path(options['output'])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(report, indent=2))
+            self.stdout.write(f'Results written to {path}')
+
+    def _seed(self, run, options):
+        total = options['chat_clients'] + options['learning_clients']
+        users = CustomUser.objects.bulk_create([
+            CustomUser(email=f'loadtest-{run}-{i}@example.com', first_name='Load', last_name=str(i), password='!')
+            for i in range(total)
+        ])
+        chat_users, learning_users = users[:options['chat_clients']], users[options['chat_clients']:]
+
+        clients = []
+        conversations = Conversation.objects.bulk_create([
+            Conversation(user=user, title='New Conversation') for user in chat_users
+        ])
+        for user, conversation in zip(chat_users, conversations):
+            clients.append(('chat', f'/ws/chat/{conversation.id}/?token={create_jwt(user.id, "access")}'))
+
+        if learning_users:
+            topic = LearningTopic.objects.create(
+                name=f'Load test {run}',
+                description='Seeded by benchmark_consumers',
+                estimated_duration=timedelta(hours=3),
+                created_by=learning_users[0],
+            )
+            subtopics = LearningSubtopic.objects.bulk_create([
+                LearningSubtopic(
+                    topic=topic,
+                    name=f'Subtopic {order}',
+                    description=f'Subtopic {order}',
+                    order=order,
+                    learning_objectives=[f'objective {order}'],
+                    estimated_duration=timedelta(hours=1),
+                )
+                for order in range(1, 4)
+            ])
+            path_conversations = Conversation.objects.bulk_create([
+                Conversation(user=user, title=f'Learning: {topic.name}', conversation_type=ConversationTypeChoices.LEARNING_PATH)
+                for user in learning_users
+            ])
+            UserLearningPath.objects.bulk_create([
+                UserLearningPath(user=user, topic=topic, conversation=conversation, current_subtopic=subtopics[0])
+                for user, conversation in zip(learning_users, path_conversations)
+            ])
+            for user in learning_users:
+                clients.append((
+                    'learning_path',
+                    f'/ws/learning-path/{topic.id}/subtopic/{subtopics[0].id}/?token={create_jwt(user.id, "access")}',
+                ))
+        return clients
+
+    def _cleanup(self, run):
+        users = CustomUser.objects.filter(email__startswith=f'loadtest-{run}-')
+        LearningTopic.objects.filter(created_by__in=users).delete()
+        users.delete()
+
+    async def _run(self, clients, counter, options):
+        from bug_hunt_project.asgi import application
+
+        samples = {kind: {'connect_ms': [], 'first_event_ms': [], 'turn_ms': [], 'turns': 0, 'errors': 0, 'queries': 0}
+                   for kind, _ in clients}
+        lag_samples = []
+        stop = asyncio.Event()
+
+        async def probe_lag():
+            loop = asyncio.get_running_loop()
+            while not stop.is_set():
+                started = loop.time()
+                await asyncio.sleep(options['lag_interval'])
+                lag_samples.append((loop.time() - started - options['lag_interval']) * 1000)
+
+        async def drive(index, kind, path):
+            stats = samples[kind]
+            await asyncio.sleep(options['ramp_up'] * index / len(clients))
+            tally = QueryTally()
+            communicator = WebsocketCommunicator(counted(application, tally), path)
+            started = time.perf_counter()
+            try:
+                connected, _ = await communicator.connect(timeout=options['timeout'])
+                if not connected:
+                    stats['errors'] += 1
+                    return
+                if kind == 'learning_path':
+                    # a fresh subtopic conversation greets the learner right after accepting
+                    await communicator.receive_from(timeout=options['timeout'])
+                stats['connect_ms'].append((time.perf_counter() - started) * 1000)
+
+                for turn in range(options['turns']):
+                    queries_before = tally.count
+                    started = time.perf_counter()
+                    await communicator.send_to(text_data=json.dumps({'message': f'Question {turn} from client {index}'}))
+                    first_event = None
+                    while True:
+                        frames = unpack(await communicator.receive_from(timeout=options['timeout']))
+                        first_event = first_event or time.perf_counter()
+                        if any(frame.get('type') == 'done' for frame in frames):
+                            break
+                    stats['first_event_ms'].append((first_event - started) * 1000)
+                    stats['turn_ms'].append((time.perf_counter() - started) * 1000)
+                    # the consumer keeps working after "done" (summaries), so let it settle before counting
+                    await communicator.receive_nothing(timeout=0.05)
+                    stats['queries'] += tally.count - queries_before
+                    stats['turns'] += 1
+                    if options['think_time']:
+                        await asyncio.sleep(options['think_time'])
+            except (asyncio.TimeoutError, AssertionError):
+                stats['errors'] += 1
+            finally:
+                await communicator.disconnect()
+
+        prober = asyncio.create_task(probe_lag())
+        started = time.perf_counter()
+        await asyncio.gather(*(drive(index, kind, path) for index, (kind, path) in enumerate(clients)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await prober
+
+        results = {}
+        for kind, stats in samples.items():
+            results[kind] = {
+                'clients': sum(1 for client_kind, _ in clients if client_kind == kind),
+                'turns': stats['turns'],
+                'errors': stats['errors'],
+                'turns_per_second': round(stats['turns'] / elapsed, 2),
+                'connect_ms': percentiles(stats['connect_ms']),
+                'first_event_ms': percentiles(stats['first_event_ms']),
+                'turn_ms': percentiles(stats['turn_ms']),
+                'queries_per_turn': round(stats['queries'] / stats['turns'], 2) if stats['turns'] else None,
+            }
+        return {
+            'elapsed_seconds': round(elapsed, 2),
+            'event_loop_lag_ms': percentiles(lag_samples),
+            # every query of the run, including those no client caused (e.g. usage flushes)
+            'queries': counter.count,
+            'consumers': results,
+        }
+
+    def _print(self, report, baseline):
+        self.stdout.write(f'Finished in {report["elapsed_seconds"]}s')
+        for kind, result in report['consumers'].items():
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'{kind}: {result["clients"]} clients, {result["turns"]} turns, '
+                f'{result["turns_per_second"]} turns/s, {result["errors"]} errors'
+            ))
+            for metric in ('connect_ms', 'first_event_ms', 'turn_ms'):
+                values = result[metric]
+                self.stdout.write(
+                    f'  {metric:<15} p50 {values["p50"]}  p95 {values["p95"]}  p99 {values["p99"]}  max {values["max"]}'
+                )
+            self.stdout.write(f'  queries/turn    {result["queries_per_turn"]}')
+            if baseline and kind in baseline.get('consumers', {}):
+                self._print_comparison(result, baseline['consumers'][kind])
+
+        lag = report['event_loop_lag_ms']
+        self.stdout.write(f'event-loop lag ms  p50 {lag["p50"]}  p95 {lag["p95"]}  p99 {lag["p99"]}  max {lag["max"]}')
+
+    def _print_comparison(self, result, baseline):
+        for metric in COMPARED_METRICS:
+            current, previous = result, baseline
+            for key in metric.split('.'):
+                current, previous = current.get(key) if current else None, previous.get(key) if previous else None
+            if current is None or not previous:
+                continue
+            change = (current - previous) / previous * 100
+            style = self.style.ERROR if change > 10 else self.style.SUCCESS if change < -10 else str
+            self.stdout.write(style(f'  vs baseline {metric:<20} {previous} -> {current} ({change:+.1f}%)'))
+
+    def _load(self, path):
+        try:
+            return json.loads(Path(path).read_text())
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'Could not read baseline {path}: {exc}')
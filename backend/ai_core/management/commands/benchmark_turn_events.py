@@ -0,0 +1,79 @@
+import asyncio
+import json
+import time
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand
+from ai_core.consumers.base import ConversationRoomConsumer
+from ai_core.utils.channel_helpers import group_send
+from ai_core.utils.fake_llm import FakeChat
+
+
+class TurnReplayConsumer(ConversationRoomConsumer):
+    """
+    Replays the event sequence of one learning-path turn with the fake LLM,
+    either the legacy way (one group_send per event) or through the
+    direct-send/batched path used by the real consumers.
+    """
+
+    async def connect(self):
+        await self.join_room("conversation_benchmark")
+        self.chat = FakeChat()
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        await self.leave_room()
+
+    async def receive(self, text_data):
+        mode = json.loads(text_data)["mode"]
+        reply = json.loads(self.chat.send_message("benchmark").text)
+        user_frame = {"type": "conversation", "payload": {"id": "u", "sender": "user", "content": "hi"}}
+        ai_frame = {"type": reply["type"], "payload": {"id": "a", "sender": "ai", "content": reply["content"]}}
+        progress = {"type": "progress_update", "content": json.dumps(reply["progress_update"])}
+
+        if mode == "legacy":
+            for frame in (user_frame, {"type": "typing_start", "content": ""}, ai_frame,
+                          {"type": "done", "content": ""}, progress):
+                await group_send(self.channel_layer, self.room_group_name, {"type": "chat.frames", "frames": [frame]})
+            return
+
+        async with self.batch_frames():
+            await self.broadcast_frame(user_frame)
+            await self.broadcast_frame({"type": "typing_start", "content": ""})
+        async with self.batch_frames():
+            await self.broadcast_frame(ai_frame)
+            await self.broadcast_frame({"type": "done", "content": ""})
+            await self.broadcast_frame(progress)
+
+
+class Command(BaseCommand):
+    help = 'Compare per-turn WebSocket event overhead: legacy group_send vs direct send with batching'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--turns', type=int, default=2000, help='Number of turns per mode')
+
+    def handle(self, *args, **options):
+        results = asyncio.run(self._run(options['turns']))
+        for mode, (elapsed, frames) in results.items():
+            self.stdout.write(
+                f'{mode:>7}: {elapsed / options["turns"] * 1e6:8.1f} µs/turn, '
+                f'{frames / options["turns"]:.1f} socket frames/turn'
+            )
+        legacy, fast = results['legacy'][0], results['fast'][0]
+        self.stdout.write(self.style.SUCCESS(f'Per-turn event overhead reduced by {(1 - fast / legacy) * 100:.0f}%'))
+
+    async def _run(self, turns):
+        results = {}
+        for mode in ('legacy', 'fast'):
+            communicator = WebsocketCommunicator(TurnReplayConsumer.as_asgi(), "/ws/benchmark/")
+            await communicator.connect()
+            frames = 0
+            expected = 5 if mode == 'legacy' else 2
+            started = time.perf_counter()
+            for _ in range(turns):
+                await communicator.send_to(text_data=json.dumps({"mode": mode}))
+                for _ in range(expected):
+                    await communicator.receive_from(timeout=5)
+                    frames += 1
+            results[mode] = (time.perf_counter() - started, frames)
+            await communicator.disconnect()
+        return results
@@ -0,0 +1,76 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, Window
+from django.db.models.functions import RowNumber
+from ai_core.models import Summary
+
+
+class Command(BaseCommand):
+    help = 'Delete superseded conversation summaries in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep',
+            type=int,
+            default=getattr(settings, 'SUMMARY_HISTORY_LIMIT', 0),
+            help='Superseded summaries to keep per conversation (defaults to SUMMARY_HISTORY_LIMIT)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Maximum rows deleted per statement',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0.05,
+            help='Seconds to pause between batches to let other writers through',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many rows would be deleted')
+
+    def handle(self, *args, **options):
+        keep, batch_size = options['keep'], options['batch_size']
+
+        # Conversations holding more history than allowed, walked in keyset order so each
+        # batch is a short independent statement rather than one long-running delete.
+        conversations = (
+            Summary.objects.filter(is_current=False)
+            .values('conversation_id')
+            .annotate(history=Count('id'))
+            .filter(history__gt=keep)
+            .order_by('conversation_id')
+        )
+
+        deleted = 0
+        last_conversation_id = None
+        while True:
+            page = conversations
+            if last_conversation_id is not None:
+                page = page.filter(conversation_id__gt=last_conversation_id)
+            conversation_ids = list(page.values_list('conversation_id', flat=True)[:batch_size])
+            if not conversation_ids:
+                break
+            last_conversation_id = conversation_ids[-1]
+
+            stale_ids = list(
+                Summary.objects.filter(conversation_id__in=conversation_ids, is_current=False)
+                .annotate(rank=Window(
+                    RowNumber(),
+                    partition_by=F('conversation_id'),
+                    order_by=F('last_updated_at').desc(),
+                ))
+                .filter(rank__gt=keep)
+                .values_list('id', flat=True)
+            )
+            for start in range(0, len(stale_ids), batch_size):
+                chunk = stale_ids[start:start + batch_size]
+                if not options['dry_run']:
+                    Summary.objects.filter(id__in=chunk).delete()
+                    time.sleep(options['sleep'])
+                deleted += len(chunk)
+            self.stdout.write(f'{"Would delete" if options["dry_run"] else "Deleted"} {deleted} summaries so far...')
+
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {deleted} superseded summaries (keeping {keep} per conversation)'))
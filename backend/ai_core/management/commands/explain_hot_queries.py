@@ -0,0 +1,122 @@
+import re
+import uuid
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from ai_core.models import Conversation, Message, MessageSenderChoices, MessageTypeChoices, Summary
+from users.models import CustomUser
+
+SEQ_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+
+class _Rollback(Exception):
+    pass
+
+
+def hot_queries(conversation):
+    """The per-turn and listing queries whose plans we care about, as (label, queryset)."""
+    messages = Message.objects.filter(conversation_id=conversation.id)
+    return [
+        ('recent message window', messages.order_by('-created_at')[:10]),
+        ('newest message', messages.order_by('-created_at')[:1]),
+        ('user message count', messages.filter(sender=MessageSenderChoices.USER).values('conversation').annotate(n=Count('id'))),
+        ('latest user messages', messages.filter(sender=MessageSenderChoices.USER).order_by('-created_at')[:5]),
+        ('current summary', Summary.objects.filter(conversation_id=conversation.id, is_current=True)),
+        ('conversation list', Conversation.objects.filter(user_id=conversation.user_id).order_by('-last_active_at')),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Run EXPLAIN ANALYZE on the chat hot-path queries and flag sequential scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--no-seed', action='store_true', help='Explain against existing data instead of a seeded dataset')
+        parser.add_argument('--users', type=int, default=20, help='Users to seed')
+        parser.add_argument('--conversations', type=int, default=500, help='Conversations to seed')
+        parser.add_argument('--messages', type=int, default=40, help='Messages per seeded conversation')
+        parser.add_argument('--summaries', type=int, default=5, help='Summaries per seeded conversation')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print the full plan for every query')
+        parser.add_argument('--fail-on-seq-scan', action='store_true', help='Exit with an error if any query uses a sequential scan')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('EXPLAIN ANALYZE output is only understood on PostgreSQL')
+
+        if options['no_seed']:
+            conversation = Conversation.objects.order_by('-last_active_at').first()
+            if conversation is None:
+                raise CommandError('No conversations to explain against; drop --no-seed to use a seeded dataset')
+            flagged = self._explain_all(conversation, options)
+        else:
+            # Seed inside a transaction that is always rolled back
+            try:
+                with transaction.atomic():
+                    conversation = self._seed(options)
+                    flagged = self._explain_all(conversation, options)
+                    raise _Rollback()
+            except _Rollback:
+                pass
+
+        if flagged:
+            message = f'Sequential scans in: {", ".join(flagged)}'
+            if options['fail_on_seq_scan']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS('All hot queries use indexes'))
+
+    def _seed(self, options):
+        self.stdout.write(
+            f'Seeding {options["users"]} users, {options["conversations"]} conversations, '
+            f'{options["messages"]} messages and {options["summaries"]} summaries per conversation...'
+        )
+        run = uuid.uuid4().hex[:8]
+        users = CustomUser.objects.bulk_create([
+            CustomUser(email=f'explain-{run}-{i}@example.com', first_name='Explain', last_name=str(i), password='!')
+            for i in range(options['users'])
+        ])
+        conversations = Conversation.objects.bulk_create([
+            Conversation(user=users[i % len(users)], title=f'Seeded conversation {i}')
+            for i in range(options['conversations'])
+        ])
+        Message.objects.bulk_create(
+            (
+                Message(
+                    conversation=conversation,
+                    sender=MessageSenderChoices.USER if i % 2 == 0 else MessageSenderChoices.AI,
+                    content=f'Seeded message {i}',
+                    message_type=MessageTypeChoices.CONVERSATION,
+                )
+                for conversation in conversations
+                for i in range(options['messages'])
+            ),
+            batch_size=5000,
+        )
+        Summary.objects.bulk_create(
+            (
+                Summary(conversation=conversation, content=f'Seeded summary {i}', is_current=i == 0)
+                for conversation in conversations
+                for i in range(options['summaries'])
+            ),
+            batch_size=5000,
+        )
+        # refresh planner statistics so the plans reflect the seeded volume
+        with connection.cursor() as cursor:
+            for model in (CustomUser, Conversation, Message, Summary):
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+        return conversations[len(conversations) // 2]
+
+    def _explain_all(self, conversation, options):
+        flagged = []
+        for label, queryset in hot_queries(conversation):
+            plan = queryset.explain(analyze=True)
+            scans = SEQ_SCAN.findall(plan)
+            timing = next((line.strip() for line in plan.splitlines() if line.startswith('Execution Time')), '')
+            if scans:
+                flagged.append(label)
+                self.stdout.write(self.style.WARNING(f'SEQ SCAN  {label}: {", ".join(scans)}  ({timing})'))
+            else:
+                self.stdout.write(f'ok        {label}  ({timing})')
+            if options['verbose_plans'] or scans:
+                self.stdout.write('\n'.join(f'    {line}' for line in plan.splitlines()))
+        return flagged
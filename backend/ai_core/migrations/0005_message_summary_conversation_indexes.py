@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:00
+
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # build the indexes without blocking writes on existing message tables
+    atomic = False
+
+    dependencies = [
+        ('ai_core', '0004_conversation_conversation_type'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='conversation',
+            index=models.Index(fields=['user', '-last_active_at'], name='ai_core_con_user_id_893ffa_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='message',
+            index=models.Index(fields=['conversation', '-created_at'], name='ai_core_mes_convers_079b19_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='message',
+            index=models.Index(condition=models.Q(('sender', 'user')), fields=['conversation', '-created_at'], name='ai_core_message_user_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='summary',
+            index=models.Index(fields=['conversation', '-last_updated_at'], name='ai_core_sum_convers_6735b0_idx'),
+        ),
+    ]
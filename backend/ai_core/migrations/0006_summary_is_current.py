@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_core', '0005_message_summary_conversation_indexes'),
+    ]
+
+    operations = [
+        # existing rows start as history; only the newest per conversation becomes current
+        migrations.AddField(
+            model_name='summary',
+            name='is_current',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunSQL(
+            sql="""
+                UPDATE ai_core_summary SET is_current = TRUE
+                WHERE id IN (
+                    SELECT DISTINCT ON (conversation_id) id
+                    FROM ai_core_summary
+                    ORDER BY conversation_id, last_updated_at DESC
+                )
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AlterField(
+            model_name='summary',
+            name='is_current',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddConstraint(
+            model_name='summary',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_current', True)), fields=('conversation',), name='ai_core_summary_one_current'),
+        ),
+    ]
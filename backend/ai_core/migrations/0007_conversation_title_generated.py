@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_core', '0006_summary_is_current'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conversation',
+            name='title_generated',
+            field=models.BooleanField(default=False, help_text='Whether the AI title has been generated from the first user message'),
+        ),
+        # conversations that already have a user message were titled by the old count check
+        migrations.RunSQL(
+            sql="""
+                UPDATE ai_core_conversation SET title_generated = TRUE
+                WHERE EXISTS (
+                    SELECT 1 FROM ai_core_message
+                    WHERE ai_core_message.conversation_id = ai_core_conversation.id
+                    AND ai_core_message.sender = 'user'
+                )
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
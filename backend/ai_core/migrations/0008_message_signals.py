@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:39
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ai_core', '0007_conversation_title_generated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='signals',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=32), blank=True, null=True, size=None),
+        ),
+    ]
@@ -20,9 +20,18 @@ class Conversation(models.Model):
         default=ConversationTypeChoices.GENERAL,
         help_text="Type of conversation - general chat or structured learning"
     )
+    title_generated = models.BooleanField(
+        default=False,
+        help_text="Whether the AI title has been generated from the first user message"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     last_active_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-last_active_at']),
+        ]
+
     def __str__(self):
         return f"Conversation {self.id} - {self.user.email}"
 
@@ -58,6 +67,21 @@ class Message(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
 
     message_type = models.CharField(choices=MessageTypeChoices.choices, max_length=50, blank=True, null=True)
+    # intent and emotion signals of user messages, classified once when saved
+    # (see ai_core.utils.message_signals); null on AI messages and older rows
+    signals = ArrayField(models.CharField(max_length=32), null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # recent-message window and newest message per conversation
+            models.Index(fields=['conversation', '-created_at']),
+            # user message counts and latest user messages per conversation
+            models.Index(
+                fields=['conversation', '-created_at'],
+                condition=models.Q(sender='user'),
+                name='ai_core_message_user_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.sender} - {self.created_at} - {self.message_type}"
@@ -90,6 +114,22 @@ class Summary(models.Model):
         on_delete=models.SET_NULL
     )
 
+    # only the current summary is read; older rows are kept as bounded history
+    # (SUMMARY_HISTORY_LIMIT) and pruned by `manage.py compact_summaries`
+    is_current = models.BooleanField(default=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['conversation', '-last_updated_at']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['conversation'],
+                condition=models.Q(is_current=True),
+                name='ai_core_summary_one_current',
+            ),
+        ]
+
     def __str__(self):
         return f"Summary for Conversation {self.conversation.id}"
     
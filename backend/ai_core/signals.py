@@ -0,0 +1,15 @@
+"""
+Keep the per-conversation context cache (ai_core.utils.context_cache) in step
+with message and summary writes.
+"""
+from django.db.models.signals import post_delete, post_save
+from ai_core.models import Message, Summary
+from ai_core.utils.context_cache import message_deleted, message_saved, summary_deleted, summary_saved
+
+
+def connect_signals():
+    """Called from AiCoreConfig.ready()."""
+    post_save.connect(message_saved, sender=Message)
+    post_delete.connect(message_deleted, sender=Message)
+    post_save.connect(summary_saved, sender=Summary)
+    post_delete.connect(summary_deleted, sender=Summary)
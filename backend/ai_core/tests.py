@@ -1,3 +1,537 @@
-from django.test import TestCase
+import asyncio
+import socket
+import threading
+import time
+import uuid
+from io import StringIO
+from unittest import mock
+from asgiref.sync import async_to_sync
+from channels.testing import WebsocketCommunicator
+from channels_redis.core import RedisChannelLayer
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from fakeredis import TcpFakeServer
+from ai_core.consumers.consumers import AIChatConsumer
+from ai_core.models import Conversation, Message, MessageSenderChoices, Summary
+from ai_core.utils import channel_helpers
+from ai_core.utils.context_cache import CONTEXT_WINDOW_SIZE, ContextWindow, context_cache, get_context_window
+from ai_core.utils import ai_helpers_general
+from ai_core.utils.ai_helpers_general import AIService
+from ai_core.utils.fake_llm import FakeClient
+from ai_core.utils.llm_scheduler import (
+    BACKGROUND, INTERACTIVE, CircuitBreaker, LLMScheduler, LLMUnavailableError,
+)
+from ai_core.utils.message_signals import SIGNAL_KEYWORDS, classify, message_signals, requests_challenge
+from ai_core.utils import summary_helpers
+from ai_core.utils.summary_helpers import save_summary
+from users.models import CustomUser
+from users.utils.auth import create_jwt
+from users.utils.rate_limit import rate_limiter
+from users.testing.concurrency import run_concurrently
+from users.testing.query_budget import QueryBudgetTestCase
 
-# Create your tests here.
+
+class ConversationEndpointQueryBudgetTests(QueryBudgetTestCase):
+    scale_data_prefix = 'conversation-budget'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.conversation = cls.data['conversations'][0]
+
+    def test_get_conversations(self):
+        response = self.assert_within_budget('conversation.get_conversations', 'get', '/api/conversation/get-conversations', user=self.user)
+        self.assertGreaterEqual(len(response.json()), 200)
+
+    def test_get_conversation(self):
+        path = f'/api/conversation/{self.conversation.id}/'
+        response = self.assert_within_budget('conversation.get_conversation', 'get', path, user=self.user)
+        self.assertEqual(len(response.json()['messages']), 10)
+
+        self.assert_within_budget(
+            'conversation.get_conversation.not_modified', 'get', path, user=self.user,
+            expected_status=304, HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+
+    def test_create_conversation(self):
+        self.assert_within_budget('conversation.create_conversation', 'post', '/api/conversation/create-conversation', user=self.user)
+
+    def test_update_title(self):
+        self.assert_within_budget(
+            'conversation.update_title', 'put', f'/api/conversation/{self.conversation.id}/update-title',
+            user=self.user, data={'conversation_id': str(self.conversation.id), 'title': 'Renamed'},
+        )
+
+    def test_delete_conversation(self):
+        conversation = Conversation.objects.create(user=self.user, title='Short-lived')
+        messages = [
+            Message.objects.create(conversation=conversation, sender=sender, content='hello')
+            for sender in (MessageSenderChoices.USER, MessageSenderChoices.AI)
+        ]
+        Summary.objects.create(conversation=conversation, content='Greeting', last_message=messages[-1])
+        self.assert_within_budget(
+            'conversation.delete_conversation', 'delete', f'/api/conversation/{conversation.id}/',
+            user=self.user, expected_status=204,
+        )
+
+
+class SlowLayer:
+    """Wraps a channel layer so group sends take `delay` seconds and their concurrency is recorded."""
+
+    def __init__(self, layer, delay):
+        self.layer = layer
+        self.delay = delay
+        self.in_flight = self.peak = 0
+
+    async def group_send(self, group, message):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            await self.layer.group_send(group, message)
+        finally:
+            self.in_flight -= 1
+
+
+class RedisChannelLayerTests(SimpleTestCase):
+    """group_send and group_size against channels_redis, with a fakeredis TCP server standing in for Redis."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        cls.server = TcpFakeServer(('127.0.0.1', port), server_type='redis')
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.redis_url = f'redis://127.0.0.1:{port}/0'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    async def _layer(self, group, members):
+        layer = RedisChannelLayer(hosts=[self.redis_url], prefix=f'test-{uuid.uuid4().hex}')
+        channels = [await layer.new_channel() for _ in range(members)]
+        for channel in channels:
+            await layer.group_add(group, channel)
+        return layer, channels
+
+    async def test_group_send_reaches_every_member(self):
+        layer, channels = await self._layer('conversation_a', 2)
+        try:
+            self.assertTrue(await channel_helpers.group_send(layer, 'conversation_a', {'type': 'chat.event', 'seq': 1}))
+            for channel in channels:
+                self.assertEqual((await layer.receive(channel))['seq'], 1)
+            self.assertEqual(await channel_helpers.group_size(layer, 'conversation_a'), 2)
+            self.assertEqual(await channel_helpers.group_size(layer, 'conversation_empty'), 0)
+        finally:
+            await layer.close_pools()
+
+    async def test_sends_to_one_group_share_its_slots(self):
+        layer, channels = await self._layer('conversation_a', 1)
+        slow = SlowLayer(layer, delay=0.05)
+        try:
+            with mock.patch.object(channel_helpers, 'GROUP_SEND_CONCURRENCY', 2):
+                sent = await asyncio.gather(*(
+                    channel_helpers.group_send(slow, 'conversation_a', {'type': 'chat.event', 'seq': seq})
+                    for seq in range(6)
+                ))
+            self.assertEqual(sent, [True] * 6)
+            self.assertEqual(slow.peak, 2)
+            received = [(await layer.receive(channels[0]))['seq'] for _ in range(6)]
+            self.assertEqual(sorted(received), list(range(6)))
+            # idle groups don't keep their semaphore around
+            self.assertNotIn('conversation_a', channel_helpers._group_slots)
+        finally:
+            await layer.close_pools()
+
+    async def test_saturated_group_drops_only_droppable_sends_without_blocking_others(self):
+        layer, channels = await self._layer('conversation_a', 1)
+        await layer.group_add('conversation_b', channels[0])
+        slow = SlowLayer(layer, delay=0.5)
+        try:
+            with mock.patch.multiple(channel_helpers, GROUP_SEND_CONCURRENCY=1, GROUP_SEND_TIMEOUT=0.05):
+                holder = asyncio.ensure_future(
+                    channel_helpers.group_send(slow, 'conversation_a', {'type': 'chat.event', 'seq': 0})
+                )
+                await asyncio.sleep(0.01)
+                dropped = await channel_helpers.group_send(
+                    slow, 'conversation_a', {'type': 'chat.event', 'seq': 1}, droppable=True
+                )
+                other_group = await channel_helpers.group_send(layer, 'conversation_b', {'type': 'chat.event', 'seq': 2})
+                # a reply or "done" frame waits out the timeout and is sent anyway
+                kept = await channel_helpers.group_send(slow, 'conversation_a', {'type': 'chat.event', 'seq': 3})
+                self.assertTrue(await holder)
+
+            self.assertFalse(dropped)
+            self.assertTrue(other_group)
+            self.assertTrue(kept)
+            received = [(await layer.receive(channels[0]))['seq'] for _ in range(3)]
+            self.assertEqual(sorted(received), [0, 2, 3])
+        finally:
+            await layer.close_pools()
+
+
+class ContextCacheTests(TestCase):
+    def setUp(self):
+        context_cache.clear()
+        self.addCleanup(context_cache.clear)
+        user = CustomUser.objects.create_user(
+            email='context@example.com', password='password', first_name='Context', last_name='Cache'
+        )
+        self.conversation = Conversation.objects.create(user=user, title='Context')
+
+    def message(self, content):
+        return Message.objects.create(conversation=self.conversation, sender=MessageSenderChoices.USER, content=content)
+
+    def test_new_messages_are_appended_on_commit(self):
+        get_context_window(self.conversation.id)
+        with self.captureOnCommitCallbacks() as callbacks:
+            message = self.message('uncommitted')
+        # nothing changes until the transaction commits
+        self.assertEqual(get_context_window(self.conversation.id).messages, [])
+
+        for callback in callbacks:
+            callback()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_context_window(self.conversation.id).last_message, message)
+
+    def test_window_keeps_the_latest_messages(self):
+        get_context_window(self.conversation.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            messages = [self.message(f'message {i}') for i in range(CONTEXT_WINDOW_SIZE + 2)]
+
+        window = get_context_window(self.conversation.id)
+        self.assertEqual([m.id for m in window.messages], [m.id for m in messages[-CONTEXT_WINDOW_SIZE:]])
+        self.assertEqual([m.id for m in window.recent(3)], [m.id for m in messages[-3:]])
+
+    def test_new_summary_replaces_the_cached_one(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            last = self.message('hello')
+            save_summary(self.conversation, 'First summary', last)
+        get_context_window(self.conversation.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            save_summary(self.conversation, 'Second summary', last)
+        with self.assertNumQueries(0):
+            window = get_context_window(self.conversation.id)
+        self.assertEqual(window.summary.content, 'Second summary')
+        self.assertEqual(Summary.objects.filter(conversation=self.conversation, is_current=True).count(), 1)
+
+    def test_load_that_raced_a_write_is_not_cached(self):
+        conversation_id = str(self.conversation.id)
+        version = context_cache.version(conversation_id)
+        # a message commits while the load is still reading
+        with self.captureOnCommitCallbacks(execute=True):
+            self.message('written mid-load')
+
+        context_cache.set(conversation_id, ContextWindow([], None), version)
+        self.assertIsNone(context_cache.get(conversation_id))
+        self.assertEqual(len(get_context_window(conversation_id).messages), 1)
+
+    def test_edits_and_deletes_invalidate(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            message = self.message('original')
+        get_context_window(self.conversation.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            message.content = 'edited'
+            message.save()
+        self.assertEqual(get_context_window(self.conversation.id).last_message.content, 'edited')
+
+        message.delete()
+        self.assertEqual(get_context_window(self.conversation.id).messages, [])
+
+
+class SaveSummaryTests(TestCase):
+    def setUp(self):
+        user = CustomUser.objects.create_user(
+            email='summary@example.com', password='password', first_name='Sum', last_name='Mary'
+        )
+        self.conversation = Conversation.objects.create(user=user, title='Summaries')
+        self.message = Message.objects.create(conversation=self.conversation, sender=MessageSenderChoices.USER, content='hi')
+
+    def summaries(self, is_current):
+        return list(Summary.objects.filter(conversation=self.conversation, is_current=is_current)
+                    .order_by('last_updated_at').values_list('content', flat=True))
+
+    def test_without_history_the_current_row_is_updated_in_place(self):
+        first = save_summary(self.conversation, 'First', None)
+        second = save_summary(self.conversation, 'Second', self.message)
+
+        self.assertEqual(first.id, second.id)
+        self.assertEqual(self.summaries(True), ['Second'])
+        self.assertEqual(self.summaries(False), [])
+        self.assertEqual(Summary.objects.get(id=first.id).last_message, self.message)
+
+    def test_with_history_old_summaries_are_demoted_and_pruned(self):
+        with mock.patch.object(summary_helpers, 'SUMMARY_HISTORY_LIMIT', 2):
+            for content in ('First', 'Second', 'Third', 'Fourth'):
+                save_summary(self.conversation, content, self.message)
+
+        self.assertEqual(self.summaries(True), ['Fourth'])
+        self.assertEqual(self.summaries(False), ['Second', 'Third'])
+
+    def test_compact_summaries_keeps_the_newest_history(self):
+        with mock.patch.object(summary_helpers, 'SUMMARY_HISTORY_LIMIT', 10):
+            for content in ('First', 'Second', 'Third', 'Fourth'):
+                save_summary(self.conversation, content, self.message)
+
+        call_command('compact_summaries', keep=1, sleep=0, dry_run=True, stdout=StringIO())
+        self.assertEqual(len(self.summaries(False)), 3)
+
+        call_command('compact_summaries', keep=1, sleep=0, stdout=StringIO())
+        self.assertEqual(self.summaries(True), ['Fourth'])
+        self.assertEqual(self.summaries(False), ['Third'])
+
+
+class SaveSummaryConcurrencyTests(TransactionTestCase):
+    # Real transactions are needed so the row locks are actually contended
+    THREADS = 8
+
+    def test_concurrent_saves_leave_one_current_summary(self):
+        user = CustomUser.objects.create_user(
+            email='summary-race@example.com', password='password', first_name='Sum', last_name='Race'
+        )
+        conversation = Conversation.objects.create(user=user, title='Summaries')
+
+        with mock.patch.object(summary_helpers, 'SUMMARY_HISTORY_LIMIT', 20):
+            _, errors = run_concurrently(lambda i: save_summary(conversation, f'Summary {i}', None), self.THREADS)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(Summary.objects.filter(conversation=conversation, is_current=True).count(), 1)
+        self.assertEqual(Summary.objects.filter(conversation=conversation).count(), self.THREADS)
+
+
+class AIServiceTests(TransactionTestCase):
+    def setUp(self):
+        for patcher in (
+            mock.patch.object(ai_helpers_general, 'client', FakeClient()),
+            # usage accounting has its own tests; don't leave rows buffered past the test database
+            mock.patch('billing.utils.llm_usage.usage_writer.add'),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        context_cache.clear()
+        self.addCleanup(context_cache.clear)
+        user = CustomUser.objects.create_user(
+            email='service@example.com', password='password', first_name='AI', last_name='Service'
+        )
+        self.conversation = Conversation.objects.create(user=user, title='Service')
+
+    def test_background_calls_stay_out_of_the_tutoring_chat(self):
+        service = AIService()
+        Message.objects.create(conversation=self.conversation, sender=MessageSenderChoices.USER, content='hello')
+        async_to_sync(service.generate_summary)(self.conversation)
+        title = async_to_sync(service.generate_title)('hello', self.conversation)
+
+        self.assertEqual(title, 'Benchmark conversation')
+        self.assertEqual(Summary.objects.get(conversation=self.conversation, is_current=True).content,
+                         'The student is working through the material.')
+        # only the reply may add turns to the chat the model sees as history
+        self.assertEqual(service.chat.calls, 0)
+
+
+class ChatConsumerTests(TransactionTestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email='consumer@example.com', password='password', first_name='Chat', last_name='Consumer'
+        )
+        self.conversation = Conversation.objects.create(user=self.user, title='Chat')
+        rate_limiter.reset()
+
+    def communicator(self):
+        token = create_jwt(self.user.id, 'access')
+        communicator = WebsocketCommunicator(AIChatConsumer.as_asgi(), f'/ws/chat/{self.conversation.id}/?token={token}')
+        communicator.scope['url_route'] = {'kwargs': {'conversation_id': str(self.conversation.id)}}
+        return communicator
+
+    async def test_reply_is_sent_before_title_and_summary_finish(self):
+        release = asyncio.Event()
+        background_started = []
+
+        async def slow_title(conversation, message):
+            background_started.append('title')
+            await release.wait()
+
+        async def slow_summary(conversation):
+            background_started.append('summary')
+            await release.wait()
+
+        with mock.patch.object(AIChatConsumer, 'typing_delay_seconds', 0), \
+                mock.patch.object(AIService, 'generate_response', return_value='The reply'), \
+                mock.patch('ai_core.utils.conversation_helpers.ConversationService.generate_and_update_title',
+                           side_effect=slow_title), \
+                mock.patch.object(AIService, 'generate_summary', side_effect=slow_summary):
+            communicator = self.communicator()
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            await communicator.send_json_to({'message': 'How do loops work?'})
+
+            typing = await communicator.receive_json_from(timeout=5)
+            self.assertEqual([frame.get('type') for frame in typing['frames']], [None, 'typing_start'])
+            # neither the title nor the summary has finished when the reply goes out
+            reply = await communicator.receive_json_from(timeout=5)
+            self.assertEqual(reply['frames'][0]['type'], 'done')
+            self.assertEqual(reply['frames'][1]['content'], 'The reply')
+            self.assertFalse(release.is_set())
+
+            await asyncio.sleep(0)
+            self.assertEqual(sorted(background_started), ['summary', 'title'])
+            release.set()
+            await communicator.disconnect()
+
+    async def test_failed_summary_does_not_close_the_socket(self):
+        with mock.patch.object(AIChatConsumer, 'typing_delay_seconds', 0), \
+                mock.patch.object(AIService, 'generate_response', return_value='The reply'), \
+                mock.patch('ai_core.utils.conversation_helpers.ConversationService.generate_and_update_title'), \
+                mock.patch.object(AIService, 'generate_summary', side_effect=LLMUnavailableError('circuit open')):
+            communicator = self.communicator()
+            await communicator.connect()
+            for message in ('first', 'second'):
+                # the socket is allowed one turn a second
+                rate_limiter.reset()
+                await communicator.send_json_to({'message': message})
+                await communicator.receive_json_from(timeout=5)
+                reply = await communicator.receive_json_from(timeout=5)
+                self.assertEqual(reply['frames'][1]['content'], 'The reply')
+            await communicator.disconnect()
+
+
+class LLMSchedulerTests(SimpleTestCase):
+    def _scheduler(self, **kwargs):
+        kwargs.setdefault('retry_base_seconds', 0)
+        kwargs.setdefault('retry_max_seconds', 0)
+        return LLMScheduler(**kwargs)
+
+    def test_retries_transient_errors(self):
+        attempts = []
+
+        def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise ConnectionError("reset")
+            return 'ok'
+
+        self.assertEqual(self._scheduler(max_retries=3).submit(flaky).result(timeout=5), 'ok')
+        self.assertEqual(len(attempts), 3)
+
+    def test_does_not_retry_bad_requests(self):
+        attempts = []
+
+        def bad_request():
+            attempts.append(1)
+            raise ValueError("bad prompt")
+
+        with self.assertRaises(ValueError):
+            self._scheduler().submit(bad_request).result(timeout=5)
+        self.assertEqual(len(attempts), 1)
+
+    def test_breaker_opens_after_repeated_failures(self):
+        scheduler = self._scheduler(max_retries=0, breaker=CircuitBreaker(failure_threshold=2, reset_seconds=60))
+
+        def down():
+            raise ConnectionError("down")
+
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                scheduler.submit(down).result(timeout=5)
+        with self.assertRaises(LLMUnavailableError):
+            scheduler.submit(down)
+
+    def test_half_open_probe_closes_breaker(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0)
+        breaker.failure()
+        self.assertTrue(breaker.allow())
+        # only one probe at a time
+        breaker.reset_seconds = 60
+        self.assertFalse(breaker.allow())
+        breaker.success()
+        self.assertFalse(breaker.is_open)
+
+    def test_coalesced_calls_share_one_result(self):
+        release = threading.Event()
+        calls = []
+
+        def greeting():
+            calls.append(1)
+            release.wait(5)
+            return 'hello'
+
+        scheduler = self._scheduler()
+        first = scheduler.submit(greeting, coalesce_key=('greeting', 'Python', 'Loops'))
+        second = scheduler.submit(greeting, coalesce_key=('greeting', 'Python', 'Loops'))
+        release.set()
+        self.assertIs(first, second)
+        self.assertEqual(second.result(timeout=5), 'hello')
+        self.assertEqual(len(calls), 1)
+
+    def test_interactive_calls_jump_background_queue(self):
+        release = threading.Event()
+        order = []
+        scheduler = self._scheduler(max_in_flight=1)
+        blocker = scheduler.submit(release.wait, 5)
+        background = scheduler.submit(order.append, 'background', priority=BACKGROUND)
+        interactive = scheduler.submit(order.append, 'interactive', priority=INTERACTIVE)
+        release.set()
+        for future in (blocker, background, interactive):
+            future.result(timeout=5)
+        self.assertEqual(order, ['interactive', 'background'])
+
+    def test_rejects_when_queue_is_full(self):
+        release = threading.Event()
+        scheduler = self._scheduler(max_in_flight=1, max_queue=1)
+        blocker = scheduler.submit(release.wait, 5)
+        # wait until the worker has taken the blocker off the queue
+        while scheduler._queue.qsize():
+            time.sleep(0.001)
+        scheduler.submit(time.sleep, 0)
+        with self.assertRaises(LLMUnavailableError):
+            scheduler.submit(time.sleep, 0)
+        release.set()
+        blocker.result(timeout=5)
+
+
+class MessageSignalTests(SimpleTestCase):
+    def test_matches_per_list_scans(self):
+        messages = [
+            "I don't understand why this function fails, help?",
+            "Got it, that makes sense now. Next!",
+            "Can you give me a challenge? I'd LIKE to practice",
+            "i'm frustrated, this is hard",
+            "import os\nclass Foo: pass",
+            "ok",
+        ]
+        for message in messages:
+            expected = sorted(
+                signal for signal, phrases in SIGNAL_KEYWORDS.items()
+                if any(phrase in message.lower() for phrase in phrases)
+            )
+            self.assertEqual(classify(message), expected, message)
+
+    def test_reports_overlapping_phrases(self):
+        # "understand" sits inside "don't understand"; both lists must see it
+        self.assertEqual(
+            classify("I don't understand"),
+            ['confidence', 'help_request', 'needs_help', 'understood'],
+        )
+
+    def test_only_explicit_asks_request_a_challenge(self):
+        for message in (
+            'I am stuck on this exercise, can you give me a hint?',
+            'In practice, why would I use a decorator?',
+            'I finished the challenge, what next?',
+            'I want to understand this exercise',
+        ):
+            self.assertFalse(requests_challenge(message, classify(message)), message)
+        for message in ('Can you give me a challenge?', 'Give me another coding exercise', 'Quiz me on loops'):
+            self.assertTrue(requests_challenge(message, classify(message)), message)
+
+    def test_stored_signals_are_not_recomputed(self):
+        stored = Message(content="I'm stuck", signals=['engagement'])
+        legacy = Message(content="I'm stuck", signals=None)
+        self.assertEqual(message_signals(stored), ['engagement'])
+        self.assertEqual(message_signals(legacy), ['frustration', 'help_request', 'needs_help'])
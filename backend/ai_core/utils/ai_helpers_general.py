@@ -3,9 +3,14 @@ from google.genai import types
 from django.conf import settings
 import logging
 from ai_core.models import Summary, Message, Conversation
+from .context_cache import get_context_window
 from .context_helpers import generate_context
+from .summary_helpers import save_summary
 from .prompts import SYSTEM_PROMPT
 from asgiref.sync import sync_to_async
+from ai_core.utils.llm_scheduler import BACKGROUND, llm_scheduler
+from billing.utils.llm_usage import llm_call
+from users.utils.metrics import CHAT_STAGE_SECONDS
 
 GEMINI_API_KEY = settings.GEMINI_API_KEY
 AI_MODEL = "gemini-2.5-flash"
@@ -19,34 +24,43 @@ class AIService:
     """
 
     def __init__(self):
+        # the tutoring conversation; only generate_response talks to it, so
+        # background calls can't interleave with a reply or enter its history
         self.chat = client.chats.create(model=AI_MODEL)
 
     async def generate_response(self, message_content: str, code_snippet: str | None, conversation: Conversation) -> str:
         """Send user prompt to AI and return text response."""
-        additional_context = await generate_context(conversation)
+        with CHAT_STAGE_SECONDS.time(consumer='chat', stage='context'):
+            additional_context = await generate_context(conversation)
         full_prompt = f"{SYSTEM_PROMPT}\n\n{message_content}"
         if code_snippet:
             full_prompt += f"\n\nCode Snippet: {code_snippet}"
         if additional_context:
             full_prompt += f"\n\nAdditional Context: {additional_context}"
-        response = self.chat.send_message(
-            config=types.GenerateContentConfig(
-                thinking_config=types.ThinkingConfig(thinking_budget=0)
-            ),
-            message=full_prompt,
-        )
+        with CHAT_STAGE_SECONDS.time(consumer='chat', stage='llm'), llm_call('chat_response', conversation=conversation) as call:
+            response = call.record(await llm_scheduler.run(
+                self.chat.send_message,
+                config=types.GenerateContentConfig(
+                    thinking_config=types.ThinkingConfig(thinking_budget=0)
+                ),
+                message=full_prompt,
+            ))
         return response.text
 
     
-    async def generate_title(self, prompt: str) -> str:
+    async def generate_title(self, prompt: str, conversation: Conversation | None = None) -> str:
         """Generate a concise conversation title."""
         title_prompt = f"Generate a concise title for this conversation: {prompt}"
-        response = self.chat.send_message(
-            config=types.GenerateContentConfig(
-                thinking_config=types.ThinkingConfig(thinking_budget=0)
-            ),
-            message=title_prompt
-        )
+        with llm_call('title', conversation=conversation) as call:
+            response = call.record(await llm_scheduler.run(
+                client.models.generate_content,
+                priority=BACKGROUND,
+                model=AI_MODEL,
+                config=types.GenerateContentConfig(
+                    thinking_config=types.ThinkingConfig(thinking_budget=0)
+                ),
+                contents=title_prompt
+            ))
         return response.text
     
     async def generate_summary(self, conversation):
@@ -58,19 +72,18 @@ class AIService:
 
         summary_prompt = f"Summarize the following conversation:\n{context}"
 
-        summary_response = self.chat.send_message(
-            config=types.GenerateContentConfig(
-                thinking_config=types.ThinkingConfig(thinking_budget=0)
-            ),
-            message=summary_prompt
-        )
+        with llm_call('chat_summary', conversation=conversation) as call:
+            summary_response = call.record(await llm_scheduler.run(
+                client.models.generate_content,
+                priority=BACKGROUND,
+                model=AI_MODEL,
+                config=types.GenerateContentConfig(
+                    thinking_config=types.ThinkingConfig(thinking_budget=0)
+                ),
+                contents=summary_prompt
+            ))
 
-        last_message = await sync_to_async(
-            lambda: Message.objects.filter(conversation=conversation).order_by('-created_at').first()
-        )()
+        window = await sync_to_async(get_context_window)(conversation.id)
+        last_message = window.last_message
 
-        await sync_to_async(Summary.objects.create)(
-            conversation=conversation,
-            content=summary_response.text,
-            last_message=last_message
-        )        
\ No newline at end of file
+        await sync_to_async(save_summary)(conversation, summary_response.text, last_message)        
\ No newline at end of file
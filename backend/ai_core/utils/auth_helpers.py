@@ -1,6 +1,7 @@
 from users.models import CustomUser
 from typing import Optional
 from users.utils.auth import decode_jwt
+from users.utils.user_cache import load_active_user, user_cache
 from channels.db import database_sync_to_async
 from urllib.parse import parse_qs
 
@@ -18,7 +19,12 @@ async def authenticate_user(scope) -> Optional[CustomUser]:
     if not user_id:
         raise ValueError("Invalid token")
 
-    user = await database_sync_to_async(CustomUser.objects.get)(id=user_id)
+    # a cache hit doesn't need a trip to the DB thread
+    user = user_cache.get(str(user_id), decoded_token.get("iat"))
+    if user is None:
+        user = await database_sync_to_async(load_active_user)(user_id)
+    if user is None or not user.is_active:
+        raise ValueError("Invalid token")
     return user
 
 
@@ -0,0 +1,78 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from typing import Optional
+from django.conf import settings
+
+logger = logging.getLogger('ai_core.utils.channel_helpers')
+
+GROUP_SEND_CONCURRENCY = getattr(settings, "CHANNEL_GROUP_SEND_CONCURRENCY", 8)
+GROUP_SEND_TIMEOUT = getattr(settings, "CHANNEL_GROUP_SEND_TIMEOUT", 5)
+
+# Frames a client can miss without losing anything; only these are ever dropped.
+TRANSIENT_FRAME_TYPES = frozenset({"typing_start"})
+
+# One semaphore per group in this process. A slow layer (e.g. Redis under load)
+# makes producers for that group wait instead of piling up unbounded sends,
+# without stalling broadcasts to other conversations.
+_group_slots = defaultdict(lambda: asyncio.Semaphore(GROUP_SEND_CONCURRENCY))
+_group_waiters = defaultdict(int)
+
+
+def is_transient(frames: list) -> bool:
+    return all(frame.get("type") in TRANSIENT_FRAME_TYPES for frame in frames)
+
+
+async def group_send(channel_layer, group: str, message: dict, droppable: bool = False) -> bool:
+    """
+    Send `message` to `group` with per-group backpressure.
+    When the group stays saturated for longer than CHANNEL_GROUP_SEND_TIMEOUT,
+    a `droppable` message is dropped and False is returned; any other message
+    is sent without a slot rather than lost.
+    """
+    slots = _group_slots[group]
+    _group_waiters[group] += 1
+    try:
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=GROUP_SEND_TIMEOUT)
+        except asyncio.TimeoutError:
+            if droppable:
+                logger.warning(f"Dropping {message.get('type')} for saturated group {group}")
+                return False
+            logger.warning(f"Sending {message.get('type')} past saturated group {group}")
+            await channel_layer.group_send(group, message)
+            return True
+        try:
+            await channel_layer.group_send(group, message)
+            return True
+        finally:
+            slots.release()
+    finally:
+        _group_waiters[group] -= 1
+        if not _group_waiters[group]:
+            # nobody is sending to this group any more
+            del _group_waiters[group]
+            _group_slots.pop(group, None)
+
+
+async def group_size(channel_layer, group: str) -> Optional[int]:
+    """
+    Number of live channels in `group`, or None when the layer can't tell us cheaply.
+    """
+    groups = getattr(channel_layer, "groups", None)
+    if isinstance(groups, dict):
+        # InMemoryChannelLayer: the group dict is local to this process
+        return len(groups.get(group, {}))
+
+    group_key = getattr(channel_layer, "_group_key", None)
+    if group_key is not None:
+        # channels_redis: one ZCOUNT on the group's sorted set, ignoring expired members
+        try:
+            connection = channel_layer.connection(channel_layer.consistent_hash(group))
+            return await connection.zcount(
+                group_key(group), int(time.time()) - channel_layer.group_expiry, "+inf"
+            )
+        except Exception as exception:
+            logger.warning(f"Could not read size of group {group}: {exception}")
+    return None
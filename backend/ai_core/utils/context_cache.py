@@ -0,0 +1,158 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+from django.conf import settings
+from django.db import transaction
+from ai_core.models import Message, Summary
+
+# Rolling window of the most recent messages and the latest summary for each
+# active conversation, so building a turn's prompt context doesn't re-query
+# them every time. The window is written through from the Message and Summary
+# save signals (see ai_core.signals). Writes made by other processes are only
+# picked up once the TTL runs out.
+CONTEXT_WINDOW_SIZE = 10
+CONTEXT_CACHE_TTL_SECONDS = getattr(settings, "CONTEXT_CACHE_TTL_SECONDS", 300)
+CONTEXT_CACHE_MAX_SIZE = getattr(settings, "CONTEXT_CACHE_MAX_SIZE", 2000)
+
+
+class ContextWindow:
+    """Recent messages (oldest first) and latest summary of one conversation."""
+
+    def __init__(self, messages: List[Message], summary: Optional[Summary]):
+        self.messages = messages
+        self.summary = summary
+
+    def recent(self, count: int) -> List[Message]:
+        return self.messages[-count:]
+
+    @property
+    def last_message(self) -> Optional[Message]:
+        return self.messages[-1] if self.messages else None
+
+
+class ConversationContextCache:
+    """
+    Thread-safe LRU of conversation_id -> (ContextWindow, cached_at, version).
+    Same versioning scheme as users.utils.user_cache: a load that races with
+    a write is not cached.
+    """
+
+    def __init__(self, ttl_seconds: float = CONTEXT_CACHE_TTL_SECONDS, max_size: int = CONTEXT_CACHE_MAX_SIZE):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, conversation_id: str) -> Optional[ContextWindow]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            if entry is None:
+                return None
+            window, cached_at, version = entry
+            if version != self._versions.get(conversation_id, 0) or now - cached_at > self.ttl_seconds:
+                del self._entries[conversation_id]
+                return None
+            self._entries.move_to_end(conversation_id)
+            return window
+
+    def version(self, conversation_id: str) -> int:
+        with self._lock:
+            return self._versions.get(conversation_id, 0)
+
+    def set(self, conversation_id: str, window: ContextWindow, version: int) -> None:
+        with self._lock:
+            if version != self._versions.get(conversation_id, 0):
+                return
+            self._entries[conversation_id] = (window, time.time(), version)
+            self._entries.move_to_end(conversation_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _update(self, conversation_id: str, apply) -> None:
+        """Apply a write to the cached window in place, keeping its version current."""
+        with self._lock:
+            version = self._versions.get(conversation_id, 0) + 1
+            self._versions[conversation_id] = version
+            entry = self._entries.get(conversation_id)
+            if entry is None:
+                return
+            window, cached_at, _ = entry
+            apply(window)
+            self._entries[conversation_id] = (window, cached_at, version)
+
+    def append_message(self, message: Message) -> None:
+        def apply(window):
+            window.messages = (window.messages + [message])[-CONTEXT_WINDOW_SIZE:]
+        self._update(str(message.conversation_id), apply)
+
+    def set_summary(self, summary: Summary) -> None:
+        def apply(window):
+            window.summary = summary
+        self._update(str(summary.conversation_id), apply)
+
+    def invalidate(self, conversation_id) -> None:
+        conversation_id = str(conversation_id)
+        with self._lock:
+            self._versions[conversation_id] = self._versions.get(conversation_id, 0) + 1
+            self._entries.pop(conversation_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+
+context_cache = ConversationContextCache()
+
+
+def get_context_window(conversation_id) -> ContextWindow:
+    """
+    Return the conversation's context window, loading it from the DB on a miss.
+    Sync; wrap with database_sync_to_async from consumers.
+    """
+    conversation_id = str(conversation_id)
+    window = context_cache.get(conversation_id)
+    if window is None:
+        version = context_cache.version(conversation_id)
+        messages = list(
+            Message.objects.filter(conversation_id=conversation_id).order_by('-created_at')[:CONTEXT_WINDOW_SIZE]
+        )
+        messages.reverse()
+        summary = (
+            Summary.objects.filter(conversation_id=conversation_id, is_current=True)
+            .select_related('last_message')
+            .first()
+        )
+        window = ContextWindow(messages, summary)
+        context_cache.set(conversation_id, window, version)
+    return window
+
+
+def message_saved(sender, instance, created, raw=False, **kwargs):
+    """post_save receiver for Message."""
+    if raw:
+        return
+    if created:
+        transaction.on_commit(lambda: context_cache.append_message(instance))
+    else:
+        transaction.on_commit(lambda: context_cache.invalidate(instance.conversation_id))
+
+
+def summary_saved(sender, instance, raw=False, **kwargs):
+    """post_save receiver for Summary; history rows are ignored."""
+    if not raw and instance.is_current:
+        transaction.on_commit(lambda: context_cache.set_summary(instance))
+
+
+def message_deleted(sender, instance, **kwargs):
+    """post_delete receiver for Message."""
+    context_cache.invalidate(instance.conversation_id)
+
+
+def summary_deleted(sender, instance, **kwargs):
+    """post_delete receiver for Summary; pruning history leaves the window alone."""
+    if instance.is_current:
+        context_cache.invalidate(instance.conversation_id)
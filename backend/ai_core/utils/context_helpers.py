@@ -1,5 +1,6 @@
 import logging
-from ai_core.models import Conversation, Message, Summary
+from ai_core.models import Conversation
+from ai_core.utils.context_cache import get_context_window
 from channels.db import database_sync_to_async
 
 logger = logging.getLogger('ai_core.utils.context_helpers')
@@ -9,14 +10,15 @@ def generate_context(conversation: Conversation):
     """
     Generate additional context for AI for the conversation.
     """
-    messages = Message.objects.filter(conversation=conversation).order_by('-created_at')[:6]
-    summary = Summary.objects.filter(conversation=conversation).order_by('-last_updated_at').first()
+    window = get_context_window(conversation.id)
+    messages = window.recent(6)
+    summary = window.summary
 
     context_from_messages = ""
     context_from_summary = ""
 
-    # reversed so they are oldest to newest in context
-    for message in reversed(messages):
+    # window messages are already oldest to newest
+    for message in messages:
         context_from_messages += f"{message.sender}: {message.content}\n"
 
     # add summary content if available
@@ -3,6 +3,7 @@ import logging
 from channels.db import database_sync_to_async
 from ai_core.models import Conversation, Message, MessageSenderChoices, MessageTypeChoices, Summary
 from .ai_helpers_general import AIService
+from .message_signals import classify
 
 logger = logging.getLogger('ai_core.utils.conversation_helpers')
 
@@ -55,7 +56,8 @@ class ConversationService:
             content=content,
             code_snippet=code_snippet,
             language=language,
-            message_type=MessageTypeChoices.CONVERSATION
+            message_type=MessageTypeChoices.CONVERSATION,
+            signals=classify(content)
         )
 
     @staticmethod
@@ -70,7 +72,8 @@ class ConversationService:
             content=content,
             code_snippet=code_snippet,
             language=language,
-            message_type=message_type
+            message_type=message_type,
+            signals=classify(content) if sender == MessageSenderChoices.USER else None
         )
 
     @staticmethod
@@ -87,6 +90,18 @@ class ConversationService:
         conversation.title = title
         conversation.save(update_fields=['title'])
 
+    @staticmethod
+    @database_sync_to_async
+    def claim_title_generation(conversation):
+        """
+        Atomically mark the conversation as titled.
+        Returns True only for the caller that flipped the flag, so concurrent
+        sockets on the same conversation generate the title once.
+        """
+        claimed = Conversation.objects.filter(id=conversation.id, title_generated=False).update(title_generated=True)
+        conversation.title_generated = True
+        return bool(claimed)
+
     @staticmethod
     async def generate_and_update_title(conversation, initial_message: str):
         """
@@ -94,6 +109,6 @@ class ConversationService:
         """
         logger.info(f"Generating and updating title for conversation: {conversation.id}")
         ai_service = AIService()
-        generated_title = await ai_service.generate_title(initial_message)
+        generated_title = await ai_service.generate_title(initial_message, conversation)
         await ConversationService._update_title_in_db(conversation, generated_title)
         logger.debug(f"Updated title to: {generated_title}")
\ No newline at end of file
@@ -0,0 +1,61 @@
+import json
+import time
+from types import SimpleNamespace
+
+# Stand-in for the Gemini client used by benchmarks and load tests. It
+# mirrors the `chats.create(...).send_message(...)` surface used for replies
+# and the stateless `models.generate_content(...)` used for background calls,
+# and returns canned JSON in the formats the services expect.
+
+
+class FakeChat:
+    def __init__(self, latency_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+        self.calls = 0
+
+    def send_message(self, message: str, config=None):
+        self.calls += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        text = self._reply_for(message)
+        # roughly four characters per token, enough to exercise usage accounting
+        usage = SimpleNamespace(
+            prompt_token_count=len(message) // 4,
+            candidates_token_count=len(text) // 4,
+            thoughts_token_count=0,
+            total_token_count=len(message) // 4 + len(text) // 4,
+        )
+        return SimpleNamespace(text=text, usage_metadata=usage, model_version="fake")
+
+    @staticmethod
+    def _reply_for(message: str) -> str:
+        if '"greeting_message"' in message:
+            return json.dumps({"greeting_message": "Welcome! Shall we start?"})
+        if message.startswith("Generate a concise title"):
+            return "Benchmark conversation"
+        if message.startswith("Summarize") or "Summarize this learning session" in message:
+            return "The student is working through the material."
+        return json.dumps({
+            "type": "explanation",
+            "content": "Here is an explanation of the concept.",
+            "code": "print('hello')",
+            "language": "python",
+            "next_action": "Try changing the example.",
+            "progress_update": {
+                "covered_points": [],
+                "remaining_points": [],
+                "ai_confidence": 0.5,
+                "notes": "Making progress",
+            },
+        })
+
+
+class FakeClient:
+    """Drop-in for `genai.Client` exposing `chats.create` and `models.generate_content`."""
+
+    def __init__(self, latency_seconds: float = 0.0):
+        self.latency_seconds = latency_seconds
+        self.chats = SimpleNamespace(create=lambda model=None, **kwargs: FakeChat(self.latency_seconds))
+        self.models = SimpleNamespace(
+            generate_content=lambda model=None, contents='', config=None: FakeChat(self.latency_seconds).send_message(contents)
+        )
@@ -0,0 +1,206 @@
+import asyncio
+import itertools
+import logging
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+from django.conf import settings
+from users.utils.metrics import Counter, Histogram
+
+logger = logging.getLogger('ai_core.utils.llm_scheduler')
+
+# Every Gemini call goes through one scheduler per process:
+# - at most LLM_MAX_IN_FLIGHT calls run at once, on the scheduler's threads;
+#   waiting calls are served by lane, interactive replies before background
+#   work (summaries, titles), and refused once LLM_MAX_QUEUE are waiting
+# - rate-limit and server errors are retried with jittered exponential backoff
+# - LLM_BREAKER_FAILURES consecutive calls that exhaust their retries open a
+#   circuit breaker; calls then fail fast for LLM_BREAKER_RESET_SECONDS, after
+#   which one probe call decides whether it closes again
+# - calls submitted with the same coalesce_key while one is pending share its
+#   result instead of asking the model again
+LLM_MAX_IN_FLIGHT = getattr(settings, 'LLM_MAX_IN_FLIGHT', 8)
+LLM_MAX_QUEUE = getattr(settings, 'LLM_MAX_QUEUE', 200)
+LLM_MAX_RETRIES = getattr(settings, 'LLM_MAX_RETRIES', 3)
+LLM_RETRY_BASE_SECONDS = getattr(settings, 'LLM_RETRY_BASE_SECONDS', 0.5)
+LLM_RETRY_MAX_SECONDS = getattr(settings, 'LLM_RETRY_MAX_SECONDS', 8)
+LLM_BREAKER_FAILURES = getattr(settings, 'LLM_BREAKER_FAILURES', 5)
+LLM_BREAKER_RESET_SECONDS = getattr(settings, 'LLM_BREAKER_RESET_SECONDS', 30)
+
+INTERACTIVE = 0
+BACKGROUND = 1
+LANES = {INTERACTIVE: 'interactive', BACKGROUND: 'background'}
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+LLM_QUEUE_SECONDS = Histogram('llm_queue_wait_seconds', 'Time model calls waited for a scheduler slot.', ('lane',))
+LLM_RETRIES = Counter('llm_retries', 'Model call attempts retried after a transient error.')
+LLM_REJECTED = Counter('llm_rejected', 'Model calls refused without reaching the provider.', ('reason',))
+
+
+class LLMUnavailableError(Exception):
+    """The model is not being called right now: the circuit is open or the queue is full."""
+
+
+def is_retryable(exception: Exception) -> bool:
+    """Provider rate limits, server errors and dropped connections; not bad requests."""
+    code = getattr(exception, 'code', None)
+    if isinstance(code, int):
+        return code in RETRYABLE_STATUS_CODES
+    try:
+        import httpx
+    except ImportError:
+        return isinstance(exception, (ConnectionError, TimeoutError))
+    return isinstance(exception, (ConnectionError, TimeoutError, httpx.TransportError))
+
+
+class CircuitBreaker:
+    """Closed -> open after `failure_threshold` straight failures -> one half-open probe after `reset_seconds`."""
+
+    def __init__(self, failure_threshold: int = LLM_BREAKER_FAILURES, reset_seconds: float = LLM_BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at = None
+        self._probe_started_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self._opened_at is not None
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if now - self._opened_at < self.reset_seconds:
+                return False
+            # a probe that never reported back (e.g. cancelled while queued) stops counting after a while
+            if self._probe_started_at is not None and now - self._probe_started_at < self.reset_seconds:
+                return False
+            self._probe_started_at = now
+            return True
+
+    def success(self) -> None:
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("LLM circuit closed")
+            self._failures = 0
+            self._opened_at = None
+            self._probe_started_at = None
+
+    def failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probe_started_at is not None or (self._opened_at is None and self._failures >= self.failure_threshold):
+                logger.warning(f"LLM circuit opened after {self._failures} consecutive failures")
+                self._opened_at = time.monotonic()
+            self._probe_started_at = None
+
+
+class LLMScheduler:
+    """
+    Runs blocking model calls on a fixed pool of threads.
+    `await scheduler.run(client.models.generate_content, contents=..., priority=BACKGROUND)`
+    from async code; `scheduler.submit(...)` returns a concurrent Future.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = LLM_MAX_IN_FLIGHT,
+        max_queue: int = LLM_MAX_QUEUE,
+        max_retries: int = LLM_MAX_RETRIES,
+        retry_base_seconds: float = LLM_RETRY_BASE_SECONDS,
+        retry_max_seconds: float = LLM_RETRY_MAX_SECONDS,
+        breaker: CircuitBreaker = None,
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.breaker = breaker or CircuitBreaker()
+        self._queue = queue.PriorityQueue()
+        # tie-breaker keeps each lane first-in first-out
+        self._sequence = itertools.count()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._workers = []
+
+    def submit(self, fn, *args, priority: int = INTERACTIVE, coalesce_key=None, **kwargs) -> Future:
+        with self._lock:
+            if coalesce_key is not None and coalesce_key in self._pending:
+                return self._pending[coalesce_key]
+            if not self.breaker.allow():
+                LLM_REJECTED.inc(reason='circuit_open')
+                raise LLMUnavailableError("The AI service is temporarily unavailable")
+            if self._queue.qsize() >= self.max_queue:
+                LLM_REJECTED.inc(reason='queue_full')
+                raise LLMUnavailableError("Too many AI requests are waiting")
+            if len(self._workers) < self.max_in_flight:
+                self._start_worker()
+
+            future = Future()
+            if coalesce_key is not None:
+                self._pending[coalesce_key] = future
+                future.add_done_callback(lambda _: self._forget(coalesce_key, future))
+            self._queue.put((priority, next(self._sequence), (future, fn, args, kwargs, priority, time.monotonic())))
+            return future
+
+    async def run(self, fn, *args, priority: int = INTERACTIVE, coalesce_key=None, **kwargs):
+        future = asyncio.wrap_future(self.submit(fn, *args, priority=priority, coalesce_key=coalesce_key, **kwargs))
+        if coalesce_key is not None:
+            # other callers share this call, so one of them going away mustn't cancel it
+            return await asyncio.shield(future)
+        # cancelling a queued call (e.g. the socket closed) drops it before it reaches the model
+        return await future
+
+    def _forget(self, coalesce_key, future):
+        with self._lock:
+            if self._pending.get(coalesce_key) is future:
+                del self._pending[coalesce_key]
+
+    def _start_worker(self):
+        worker = threading.Thread(target=self._work, name=f'llm-scheduler-{len(self._workers)}', daemon=True)
+        self._workers.append(worker)
+        worker.start()
+
+    def _work(self):
+        while True:
+            _, _, (future, fn, args, kwargs, priority, queued_at) = self._queue.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            LLM_QUEUE_SECONDS.observe(time.monotonic() - queued_at, lane=LANES.get(priority, priority))
+            try:
+                result = self._call(fn, args, kwargs)
+            except BaseException as exception:
+                future.set_exception(exception)
+            else:
+                future.set_result(result)
+
+    def _call(self, fn, args, kwargs):
+        for attempt in range(self.max_retries + 1):
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as exception:
+                if not is_retryable(exception):
+                    # the provider answered; a bad request says nothing about its health
+                    self.breaker.success()
+                    raise
+                if attempt == self.max_retries:
+                    self.breaker.failure()
+                    raise
+                delay = min(self.retry_max_seconds, self.retry_base_seconds * 2 ** attempt)
+                LLM_RETRIES.inc()
+                logger.warning(f"Retrying LLM call after {type(exception).__name__}: {exception}")
+                time.sleep(random.uniform(delay / 2, delay))
+            else:
+                self.breaker.success()
+                return result
+
+
+llm_scheduler = LLMScheduler()
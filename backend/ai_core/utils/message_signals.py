@@ -0,0 +1,75 @@
+import re
+
+# Keyword signals read from a user's message by the learning path tutor: its
+# intent (response type, challenge requests), the conversation tone and the
+# emotional indicators. A signal is present when any of its phrases occurs
+# anywhere in the lower-cased message, exactly like `any(phrase in text)`.
+#
+# classify() lower-cases the message once and looks for each distinct phrase
+# once, however many signals share it. User messages store their signals when
+# saved (Message.signals), so history is never classified again.
+# `manage.py benchmark_message_signals` compares this with the old per-list
+# scans and with a compiled alternation regex, which CPython runs slower than
+# its substring search for a phrase set this small.
+SIGNAL_KEYWORDS = {
+    # intent
+    'code': ('def ', 'function', 'class ', 'import ', '```'),
+    'help_request': ('confused', "don't understand", 'stuck', 'help', '?'),
+    'progress_check': ('done', 'finished', 'complete', 'next'),
+    'explanation_request': ('explain', 'what is', 'how does', 'why'),
+    'challenge_request': ('challenge', 'exercise', 'practice', 'quiz me', 'test me'),
+    # conversation tone
+    'needs_help': ('confused', "don't understand", 'stuck', 'help'),
+    'understood': ('got it', 'understand', 'clear', 'thanks'),
+    # emotional indicators
+    'frustration': ('frustrated', 'confused', 'stuck', "don't get it", 'hard', 'difficult'),
+    'confidence': ('got it', 'understand', 'clear', 'easy', 'makes sense'),
+    'engagement': ('interesting', 'cool', 'awesome', 'love', 'like'),
+}
+
+
+def _signals_by_phrase(keywords: dict) -> dict:
+    signals_by_phrase = {}
+    for signal, phrases in keywords.items():
+        for phrase in phrases:
+            signals_by_phrase.setdefault(phrase, set()).add(signal)
+    return {phrase: frozenset(signals) for phrase, signals in signals_by_phrase.items()}
+
+
+_SIGNALS_BY_PHRASE = _signals_by_phrase(SIGNAL_KEYWORDS)
+
+
+def classify(text: str) -> list:
+    """Every signal in SIGNAL_KEYWORDS the text carries, sorted."""
+    lowered = text.lower()
+    found = set()
+    for phrase, signals in _SIGNALS_BY_PHRASE.items():
+        if phrase in lowered:
+            found |= signals
+    return sorted(found)
+
+
+# An explicit ask for a new exercise ("give me a challenge", "another exercise
+# please", "quiz me"). The challenge_request signal also fires on messages that
+# merely mention one ("I'm stuck on this exercise"), so it isn't enough alone.
+_CHALLENGE_REQUEST = re.compile(
+    r"\b(?:quiz|test) me\b"
+    r"|\b(?:give|send|set|want|need|try|have|get)(?: me| us)? (?:a|an|another|one more|a new|some|more)"
+    r"(?: \w+)? (?:challenge|exercise|practice problem)s?\b"
+)
+# asking for help, an explanation or what comes next is never a request for an exercise
+NOT_CHALLENGE_REQUEST_SIGNALS = frozenset({'needs_help', 'explanation_request', 'progress_check'})
+
+
+def requests_challenge(text: str, signals: list) -> bool:
+    """Whether a message (with its signals) explicitly asks for a new exercise."""
+    if 'challenge_request' not in signals or NOT_CHALLENGE_REQUEST_SIGNALS.intersection(signals):
+        return False
+    return _CHALLENGE_REQUEST.search(text.lower()) is not None
+
+
+def message_signals(message) -> list:
+    """A message's stored signals, classifying only rows saved before signals were stored."""
+    if message.signals is None:
+        return classify(message.content)
+    return message.signals
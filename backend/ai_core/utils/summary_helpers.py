@@ -0,0 +1,41 @@
+import logging
+from typing import Optional
+from django.conf import settings
+from django.db import transaction
+from ai_core.models import Conversation, Message, Summary
+
+logger = logging.getLogger('ai_core.utils.summary_helpers')
+
+SUMMARY_HISTORY_LIMIT = getattr(settings, "SUMMARY_HISTORY_LIMIT", 0)
+
+
+def save_summary(conversation: Conversation, content: str, last_message: Optional[Message]) -> Summary:
+    """
+    Upsert the conversation's current summary.
+    With SUMMARY_HISTORY_LIMIT = 0 (the default) the current row is updated in
+    place. Otherwise the previous summary is demoted to history and the oldest
+    history rows beyond the limit are deleted.
+    """
+    if not SUMMARY_HISTORY_LIMIT:
+        summary, _ = Summary.objects.update_or_create(
+            conversation=conversation,
+            is_current=True,
+            defaults={'content': content, 'last_message': last_message},
+        )
+        return summary
+
+    with transaction.atomic():
+        # Lock the conversation, not its current summary: a concurrent save
+        # that demoted and inserted after our UPDATE started would otherwise
+        # leave two current rows, and the first summary has no row to lock
+        Conversation.objects.select_for_update().filter(id=conversation.id).exists()
+        Summary.objects.filter(conversation=conversation, is_current=True).update(is_current=False)
+        summary = Summary.objects.create(conversation=conversation, content=content, last_message=last_message)
+        stale_ids = list(
+            Summary.objects.filter(conversation=conversation, is_current=False)
+            .order_by('-last_updated_at')
+            .values_list('id', flat=True)[SUMMARY_HISTORY_LIMIT:]
+        )
+        if stale_ids:
+            Summary.objects.filter(id__in=stale_ids).delete()
+    return summary
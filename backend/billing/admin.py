@@ -1,3 +1,27 @@
 from django.contrib import admin
+from .models import ConversationTokenUsage, LLMUsage, UserTokenUsage
 
-# Register your models here.
+
+@admin.register(LLMUsage)
+class LLMUsageAdmin(admin.ModelAdmin):
+    list_display = ('call_type', 'user', 'conversation', 'prompt_tokens', 'completion_tokens', 'latency_ms', 'created_at')
+    list_filter = ('call_type', 'model', 'created_at')
+    search_fields = ('user__email', 'conversation__title')
+    ordering = ('-created_at',)
+    list_select_related = ('user', 'conversation')
+
+
+@admin.register(UserTokenUsage)
+class UserTokenUsageAdmin(admin.ModelAdmin):
+    list_display = ('user', 'calls', 'prompt_tokens', 'completion_tokens', 'total_tokens', 'updated_at')
+    search_fields = ('user__email',)
+    ordering = ('-total_tokens',)
+    list_select_related = ('user',)
+
+
+@admin.register(ConversationTokenUsage)
+class ConversationTokenUsageAdmin(admin.ModelAdmin):
+    list_display = ('conversation', 'user', 'calls', 'prompt_tokens', 'completion_tokens', 'total_tokens', 'updated_at')
+    search_fields = ('conversation__title', 'user__email')
+    ordering = ('-total_tokens',)
+    list_select_related = ('conversation', 'user')
@@ -0,0 +1,62 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Avg, Count, ExpressionWrapper, FloatField, Max, Sum
+from django.utils import timezone
+from billing.models import LLMUsage
+
+GROUPINGS = {
+    'call_type': ('call_type',),
+    'user': ('user_id', 'user__email'),
+    'conversation': ('conversation_id', 'conversation__title', 'conversation__user__email'),
+}
+
+
+class Command(BaseCommand):
+    help = 'List the prompt types (or users, or conversations) that spent the most tokens'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help='Only count calls from the last N days')
+        parser.add_argument('--by', choices=sorted(GROUPINGS), default='call_type', help='What to group the calls by')
+        parser.add_argument('--limit', type=int, default=20, help='Rows to show')
+
+    def handle(self, *args, **options):
+        prompt_price = getattr(settings, 'LLM_PROMPT_PRICE_PER_MILLION', 0)
+        completion_price = getattr(settings, 'LLM_COMPLETION_PRICE_PER_MILLION', 0)
+        since = timezone.now() - timedelta(days=options['days'])
+        fields = GROUPINGS[options['by']]
+
+        rows = (
+            LLMUsage.objects.filter(created_at__gte=since)
+            .values(*fields)
+            .annotate(
+                calls=Count('id'),
+                prompt=Sum('prompt_tokens'),
+                # thinking tokens are billed as output
+                completion=Sum('completion_tokens') + Sum('thinking_tokens'),
+                avg_prompt=Avg('prompt_tokens'),
+                avg_latency=Avg('latency_ms'),
+                max_latency=Max('latency_ms'),
+                cost=ExpressionWrapper(
+                    (Sum('prompt_tokens') * prompt_price
+                     + (Sum('completion_tokens') + Sum('thinking_tokens')) * completion_price) / 1_000_000,
+                    output_field=FloatField(),
+                ),
+            )
+            .order_by('-cost')[:options['limit']]
+        )
+
+        self.stdout.write(
+            f'LLM usage over the last {options["days"]} days by {options["by"]} '
+            f'(${prompt_price}/M prompt, ${completion_price}/M completion tokens)'
+        )
+        self.stdout.write(
+            f'{"":<48} {"calls":>8} {"prompt":>12} {"completion":>12} {"avg prompt":>10} '
+            f'{"avg ms":>8} {"max ms":>8} {"est. $":>10}'
+        )
+        for row in rows:
+            label = ' / '.join(str(row[field]) for field in fields[1:] or fields)
+            self.stdout.write(
+                f'{label[:48]:<48} {row["calls"]:>8} {row["prompt"]:>12} {row["completion"]:>12} '
+                f'{row["avg_prompt"]:>10.0f} {row["avg_latency"]:>8.0f} {row["max_latency"]:>8} {row["cost"]:>10.4f}'
+            )
@@ -1,3 +1,80 @@
+import uuid
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
-# Create your models here.
+
+class LLMUsage(models.Model):
+    """
+    One model call and the tokens it used, as reported by Gemini's usage_metadata.
+    Written in batches by billing.utils.llm_usage, so created_at is when the
+    call finished rather than when the row was inserted.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.CASCADE, related_name="llm_usage")
+    # kept when the conversation is deleted so past spend doesn't disappear
+    conversation = models.ForeignKey(
+        'ai_core.Conversation',
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="llm_usage",
+    )
+    call_type = models.CharField(max_length=50, help_text="e.g. 'chat_response', 'title', 'tutor_summary'")
+    model = models.CharField(max_length=100)
+    prompt_tokens = models.PositiveIntegerField(default=0)
+    completion_tokens = models.PositiveIntegerField(default=0)
+    thinking_tokens = models.PositiveIntegerField(default=0)
+    total_tokens = models.PositiveIntegerField(default=0)
+    latency_ms = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at']),
+            models.Index(fields=['call_type', '-created_at']),
+            models.Index(fields=['-created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.call_type} - {self.total_tokens} tokens"
+
+
+class TokenUsageRollup(models.Model):
+    """Running totals shared by the per-user and per-conversation rollups."""
+    calls = models.PositiveIntegerField(default=0)
+    prompt_tokens = models.PositiveBigIntegerField(default=0)
+    completion_tokens = models.PositiveBigIntegerField(default=0)
+    thinking_tokens = models.PositiveBigIntegerField(default=0)
+    total_tokens = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+
+class UserTokenUsage(TokenUsageRollup):
+    """All-time token totals for a user, incremented with every batch of LLMUsage rows."""
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name="token_usage")
+
+    def __str__(self):
+        return f"{self.user_id} - {self.total_tokens} tokens"
+
+
+class ConversationTokenUsage(TokenUsageRollup):
+    """All-time token totals for a conversation, incremented with every batch of LLMUsage rows."""
+    conversation = models.OneToOneField(
+        'ai_core.Conversation',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="token_usage",
+    )
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="conversation_token_usage")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-total_tokens']),
+        ]
+
+    def __str__(self):
+        return f"{self.conversation_id} - {self.total_tokens} tokens"
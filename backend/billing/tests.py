@@ -1,3 +1,79 @@
+from unittest import mock
+from django.db import OperationalError
 from django.test import TestCase
+from ai_core.models import Conversation
+from billing.models import ConversationTokenUsage, LLMUsage, UserTokenUsage
+from billing.utils.llm_usage import UsageWriter
+from users.models import CustomUser
 
-# Create your tests here.
+
+class UsageWriterTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email='billing@example.com', password='password', first_name='Billing', last_name='Test'
+        )
+        self.conversation = Conversation.objects.create(user=self.user, title='Billing')
+        self.writer = UsageWriter(flush_seconds=0)
+
+    def _usage(self, conversation=None, prompt=100, completion=20):
+        return LLMUsage(
+            user=self.user,
+            conversation=conversation,
+            call_type='chat_response',
+            model='gemini-2.5-flash',
+            prompt_tokens=prompt,
+            completion_tokens=completion,
+            total_tokens=prompt + completion,
+            latency_ms=300,
+        )
+
+    def test_flush_writes_rows_and_rollups(self):
+        self.writer.add(self._usage(self.conversation))
+        self.writer.add(self._usage(self.conversation, prompt=50, completion=10))
+        self.writer.add(self._usage())
+
+        self.assertEqual(self.writer.flush(), 3)
+        self.assertEqual(self.writer.pending(), 0)
+        self.assertEqual(LLMUsage.objects.count(), 3)
+
+        user_usage = UserTokenUsage.objects.get(user=self.user)
+        self.assertEqual((user_usage.calls, user_usage.prompt_tokens, user_usage.completion_tokens), (3, 250, 50))
+        conversation_usage = ConversationTokenUsage.objects.get(conversation=self.conversation)
+        self.assertEqual((conversation_usage.calls, conversation_usage.total_tokens), (2, 180))
+
+        # a second batch increments the existing rollups
+        self.writer.add(self._usage(self.conversation))
+        self.writer.flush()
+        self.assertEqual(UserTokenUsage.objects.get(user=self.user).calls, 4)
+        self.assertEqual(ConversationTokenUsage.objects.get(conversation=self.conversation).calls, 3)
+
+    def test_deleted_conversation_keeps_user_usage(self):
+        self.writer.add(self._usage(self.conversation))
+        self.conversation.delete()
+
+        self.writer.flush()
+
+        self.assertIsNone(LLMUsage.objects.get().conversation_id)
+        self.assertEqual(UserTokenUsage.objects.get(user=self.user).calls, 1)
+        self.assertFalse(ConversationTokenUsage.objects.exists())
+
+    def test_failed_write_keeps_the_batch_for_the_next_flush(self):
+        self.writer.add(self._usage(self.conversation))
+        with mock.patch('billing.utils.llm_usage.write_usage', side_effect=OperationalError('connection lost')):
+            with self.assertRaises(OperationalError):
+                self.writer.flush()
+        self.writer.add(self._usage())
+        self.assertEqual(self.writer.pending(), 2)
+
+        self.assertEqual(self.writer.flush(), 2)
+        self.assertEqual(UserTokenUsage.objects.get(user=self.user).calls, 2)
+        self.assertEqual(ConversationTokenUsage.objects.get(conversation=self.conversation).calls, 1)
+
+    def test_rows_are_dropped_after_max_attempts(self):
+        writer = UsageWriter(flush_seconds=0, max_attempts=2)
+        writer.add(self._usage())
+        with mock.patch('billing.utils.llm_usage.write_usage', side_effect=OperationalError('connection lost')):
+            for pending in (1, 0):
+                with self.assertRaises(OperationalError):
+                    writer.flush()
+                self.assertEqual(writer.pending(), pending)
@@ -0,0 +1,224 @@
+import atexit
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from billing.models import ConversationTokenUsage, LLMUsage, UserTokenUsage
+from users.utils.metrics import track_llm_call
+
+logger = logging.getLogger('billing.utils.llm_usage')
+
+# Token accounting for every Gemini call. Recording a call only appends to an
+# in-memory buffer; a daemon thread writes the buffer every
+# LLM_USAGE_FLUSH_SECONDS (or as soon as LLM_USAGE_BATCH_SIZE rows are waiting)
+# with one bulk insert plus the rollup increments, so the event loop never
+# waits on billing writes. A batch whose write fails goes back to the front of
+# the buffer and is retried with the next flush; rows are only dropped (and
+# logged) after LLM_USAGE_MAX_ATTEMPTS failed writes, or when a worker is killed.
+LLM_USAGE_BATCH_SIZE = getattr(settings, 'LLM_USAGE_BATCH_SIZE', 200)
+LLM_USAGE_FLUSH_SECONDS = getattr(settings, 'LLM_USAGE_FLUSH_SECONDS', 5)
+LLM_USAGE_MAX_ATTEMPTS = getattr(settings, 'LLM_USAGE_MAX_ATTEMPTS', 12)
+
+ROLLUP_FIELDS = ('calls', 'prompt_tokens', 'completion_tokens', 'thinking_tokens', 'total_tokens')
+
+
+def usage_from_response(response) -> dict:
+    """Token counts from a response's usage_metadata (all zero when it has none)."""
+    metadata = getattr(response, 'usage_metadata', None)
+    prompt = getattr(metadata, 'prompt_token_count', None) or 0
+    completion = getattr(metadata, 'candidates_token_count', None) or 0
+    thinking = getattr(metadata, 'thoughts_token_count', None) or 0
+    return {
+        'prompt_tokens': prompt,
+        'completion_tokens': completion,
+        'thinking_tokens': thinking,
+        'total_tokens': getattr(metadata, 'total_token_count', None) or prompt + completion + thinking,
+    }
+
+
+def _rollup_deltas(rows) -> tuple:
+    by_user = defaultdict(lambda: dict.fromkeys(ROLLUP_FIELDS, 0))
+    by_conversation = defaultdict(lambda: dict.fromkeys(ROLLUP_FIELDS, 0))
+    conversation_users = {}
+    for row in rows:
+        targets = []
+        if row.user_id:
+            targets.append(by_user[row.user_id])
+        if row.conversation_id and row.user_id:
+            targets.append(by_conversation[row.conversation_id])
+            conversation_users[row.conversation_id] = row.user_id
+        for deltas in targets:
+            deltas['calls'] += 1
+            for field in ROLLUP_FIELDS[1:]:
+                deltas[field] += getattr(row, field)
+    return by_user, by_conversation, conversation_users
+
+
+def write_usage(rows: list) -> int:
+    """
+    Insert a batch of LLMUsage rows and add them to the user and conversation
+    rollups in one transaction. Rows pointing at a conversation deleted since
+    the call keep their user; rows of deleted users are dropped.
+    """
+    from ai_core.models import Conversation
+    from users.models import CustomUser
+
+    if not rows:
+        return 0
+    live_users = set(CustomUser.objects.filter(id__in={row.user_id for row in rows if row.user_id}).values_list('id', flat=True))
+    live_conversations = set(
+        Conversation.objects.filter(id__in={row.conversation_id for row in rows if row.conversation_id})
+        .values_list('id', flat=True)
+    )
+    kept = []
+    for row in rows:
+        if row.user_id and row.user_id not in live_users:
+            continue
+        if row.conversation_id not in live_conversations:
+            row.conversation_id = None
+        kept.append(row)
+
+    by_user, by_conversation, conversation_users = _rollup_deltas(kept)
+    with transaction.atomic():
+        LLMUsage.objects.bulk_create(kept)
+        # make sure every rollup row exists, then increment them in place
+        UserTokenUsage.objects.bulk_create([UserTokenUsage(user_id=user_id) for user_id in by_user], ignore_conflicts=True)
+        ConversationTokenUsage.objects.bulk_create(
+            [
+                ConversationTokenUsage(conversation_id=conversation_id, user_id=conversation_users[conversation_id])
+                for conversation_id in by_conversation
+            ],
+            ignore_conflicts=True,
+        )
+        for user_id, deltas in by_user.items():
+            UserTokenUsage.objects.filter(user_id=user_id).update(
+                **{field: F(field) + delta for field, delta in deltas.items()}
+            )
+        for conversation_id, deltas in by_conversation.items():
+            ConversationTokenUsage.objects.filter(conversation_id=conversation_id).update(
+                **{field: F(field) + delta for field, delta in deltas.items()}
+            )
+    return len(kept)
+
+
+class UsageWriter:
+    """
+    Thread-safe buffer of unsaved LLMUsage rows.
+    With flush_seconds = 0 no background thread is started and rows wait for
+    an explicit flush() (tests, management commands).
+    """
+
+    def __init__(
+        self,
+        batch_size: int = LLM_USAGE_BATCH_SIZE,
+        flush_seconds: float = LLM_USAGE_FLUSH_SECONDS,
+        max_attempts: int = LLM_USAGE_MAX_ATTEMPTS,
+    ):
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.max_attempts = max_attempts
+        self._rows = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def add(self, row: LLMUsage) -> None:
+        with self._lock:
+            self._rows.append(row)
+            full = len(self._rows) >= self.batch_size
+            if self._thread is None and self.flush_seconds:
+                self._thread = threading.Thread(target=self._run, name='llm-usage-writer', daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+        if full:
+            self._wake.set()
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._rows)
+
+    def flush(self) -> int:
+        """
+        Write everything buffered so far; returns the number of rows saved.
+        If the write fails the rows are put back for the next flush and the
+        error is raised.
+        """
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows = self._rows, []
+            try:
+                return write_usage(rows)
+            except Exception:
+                self._requeue(rows)
+                raise
+
+    def _requeue(self, rows: list) -> None:
+        retried = []
+        for row in rows:
+            row._write_attempts = getattr(row, '_write_attempts', 0) + 1
+            if row._write_attempts < self.max_attempts:
+                retried.append(row)
+        if len(retried) < len(rows):
+            logger.error(f"Dropping {len(rows) - len(retried)} LLM usage rows after {self.max_attempts} failed writes")
+        with self._lock:
+            # ahead of rows added since, so the batch keeps its place
+            self._rows[:0] = retried
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to write LLM usage batch")
+            finally:
+                close_old_connections()
+
+
+usage_writer = UsageWriter()
+
+
+class LLMCall:
+    """Handle yielded by llm_call(); pass the model's response through record()."""
+
+    def __init__(self):
+        self.response = None
+
+    def record(self, response):
+        self.response = response
+        return response
+
+
+@contextmanager
+def llm_call(call_type: str, conversation=None, user_id=None):
+    """
+    Time one model call for /metrics and queue its token usage:
+
+        with llm_call('title', conversation=conversation) as call:
+            response = call.record(chat.send_message(...))
+
+    Calls that raise are only counted as errors in the metrics.
+    """
+    call = LLMCall()
+    started = time.perf_counter()
+    with track_llm_call(call_type):
+        yield call
+    if call.response is None:
+        return
+    usage_writer.add(LLMUsage(
+        user_id=user_id or getattr(conversation, 'user_id', None),
+        conversation_id=getattr(conversation, 'id', None),
+        call_type=call_type,
+        model=getattr(call.response, 'model_version', None) or '',
+        latency_ms=round((time.perf_counter() - started) * 1000),
+        created_at=timezone.now(),
+        **usage_from_response(call.response),
+    ))
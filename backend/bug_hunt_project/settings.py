@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
 from dotenv import load_dotenv
+from corsheaders.defaults import default_headers
 
 load_dotenv()
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -21,6 +22,9 @@ ALLOWED_HOSTS = ["*"]
 
 CORS_ALLOW_ALL_ORIGINS = True # okay for development
 CORS_ALLOW_CREDENTIALS = True 
+# conditional GETs (see users.utils.etags)
+CORS_ALLOW_HEADERS = (*default_headers, "if-none-match")
+CORS_EXPOSE_HEADERS = ["ETag", "Retry-After"]
 
 # Application definition
 
@@ -148,16 +152,108 @@ AUTH_USER_MODEL = 'users.CustomUser'
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
 
-CHANNEL_LAYERS = {
-    "default": {
-        "BACKEND": "channels.layers.InMemoryChannelLayer",
-    },
+# Channel layer used by the WebSocket consumers.
+# With REDIS_URL set, groups are shared across uvicorn workers and nodes;
+# otherwise the in-memory layer only works inside a single process.
+REDIS_URL = os.getenv("REDIS_URL")
+
+CHANNEL_LAYER_CONFIG = {
+    # max messages buffered per channel before sends to it are dropped
+    "capacity": int(os.getenv("CHANNEL_LAYER_CAPACITY", 100)),
+    # seconds an undelivered message is kept
+    "expiry": int(os.getenv("CHANNEL_LAYER_EXPIRY", 60)),
+    # seconds a channel stays in a group without being re-added
+    "group_expiry": int(os.getenv("CHANNEL_LAYER_GROUP_EXPIRY", 86400)),
 }
 
+if REDIS_URL:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.core.RedisChannelLayer",
+            "CONFIG": {
+                "hosts": [REDIS_URL],
+                **CHANNEL_LAYER_CONFIG,
+            },
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer",
+            "CONFIG": CHANNEL_LAYER_CONFIG,
+        },
+    }
+
+# Per-group backpressure for consumer broadcasts (see ai_core.utils.channel_helpers)
+CHANNEL_GROUP_SEND_CONCURRENCY = int(os.getenv("CHANNEL_GROUP_SEND_CONCURRENCY", 8))
+CHANNEL_GROUP_SEND_TIMEOUT = float(os.getenv("CHANNEL_GROUP_SEND_TIMEOUT", 5))
+
+# In-process window of recent messages per conversation (see ai_core.utils.context_cache)
+CONTEXT_CACHE_TTL_SECONDS = int(os.getenv("CONTEXT_CACHE_TTL_SECONDS", 300))
+CONTEXT_CACHE_MAX_SIZE = int(os.getenv("CONTEXT_CACHE_MAX_SIZE", 2000))
+
+# Superseded summaries kept per conversation (see ai_core.utils.summary_helpers)
+SUMMARY_HISTORY_LIMIT = int(os.getenv("SUMMARY_HISTORY_LIMIT", 0))
+
+# Per-process cache of each topic's ordered subtopics (see learning_paths.utils.subtopic_order)
+SUBTOPIC_ORDER_CACHE_TTL_SECONDS = int(os.getenv("SUBTOPIC_ORDER_CACHE_TTL_SECONDS", 300))
+
+# Per-process cache of the rendered topic catalog (see learning_paths.utils.topic_catalog)
+TOPIC_CATALOG_CACHE_TTL_SECONDS = int(os.getenv("TOPIC_CATALOG_CACHE_TTL_SECONDS", 60))
+
+# Generate subtopic greetings in the background when a path is saved, instead
+# of on first open (see learning_paths.services.subtopic_greeting_service)
+SUBTOPIC_GREETING_PREGENERATE = os.getenv("SUBTOPIC_GREETING_PREGENERATE", "1") == "1"
+
+# Buffered per-call token accounting (see billing.utils.llm_usage)
+LLM_USAGE_BATCH_SIZE = int(os.getenv("LLM_USAGE_BATCH_SIZE", 200))
+LLM_USAGE_FLUSH_SECONDS = float(os.getenv("LLM_USAGE_FLUSH_SECONDS", 5))
+LLM_USAGE_MAX_ATTEMPTS = int(os.getenv("LLM_USAGE_MAX_ATTEMPTS", 12))
+# USD per million tokens, used by `manage.py llm_usage_report` cost estimates
+LLM_PROMPT_PRICE_PER_MILLION = float(os.getenv("LLM_PROMPT_PRICE_PER_MILLION", 0.30))
+LLM_COMPLETION_PRICE_PER_MILLION = float(os.getenv("LLM_COMPLETION_PRICE_PER_MILLION", 2.50))
+
+# Bearer token required to scrape /metrics; unset leaves it open (see users.utils.metrics)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+
+# Token-bucket rate limits per scope, as "<count>/<s|m|h|d>" lists (see users.utils.rate_limit).
+# Every REST route uses "default"; the others are tighter budgets for expensive work.
+RATE_LIMITS = {
+    "default": os.getenv("RATE_LIMIT_DEFAULT", "1000/h,100/m,10/s").split(","),
+    "llm_turn": os.getenv("RATE_LIMIT_LLM_TURN", "300/h,20/m,1/s").split(","),
+    "code_run": os.getenv("RATE_LIMIT_CODE_RUN", "300/h,30/m,2/s").split(","),
+    "path_generation": os.getenv("RATE_LIMIT_PATH_GENERATION", "20/h,3/m").split(","),
+}
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+# "redis" shares buckets across workers through REDIS_URL
+RATE_LIMIT_STORE = os.getenv("RATE_LIMIT_STORE", "redis" if REDIS_URL else "memory")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", 100000))
+# Addresses or CIDR ranges of the reverse proxy (frontend nginx). Only requests
+# from these have their X-Real-IP header used as the client address; with none
+# set, anonymous callers are limited by REMOTE_ADDR.
+RATE_LIMIT_TRUSTED_PROXIES = [proxy for proxy in os.getenv("RATE_LIMIT_TRUSTED_PROXIES", "").split(",") if proxy.strip()]
+
+# Per-process Gemini call scheduling (see ai_core.utils.llm_scheduler)
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", 8))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", 200))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 3))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", 0.5))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", 8))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", 5))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", 30))
+
 
 # JWT settings
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
 
+# In-process cache of authenticated users (see users.utils.user_cache).
+# Each worker caches on its own: after a user is deactivated or changed, the
+# other workers keep serving the cached copy for up to USER_CACHE_TTL_SECONDS.
+# Lower it where that window matters; 0 turns the cache off.
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", 30))
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", 10000))
+
 # Google OAuth settings
 GOOGLE_OAUTH_CLIENT_ID = os.getenv("GOOGLE_OAUTH_CLIENT_ID")
 
@@ -5,6 +5,7 @@ from ai_core.conversation import router as conversation_router
 from execution.api import router as execution_router
 from learning_paths.api import router as learning_paths_router
 from ninja import NinjaAPI
+from users.utils.metrics import metrics_view
 
 api = NinjaAPI()
 
@@ -15,5 +16,6 @@ api.add_router("learning-paths/", learning_paths_router)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('api/', api.urls)
+    path('api/', api.urls),
+    path('metrics', metrics_view),
 ]
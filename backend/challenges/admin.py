@@ -1,3 +1,18 @@
 from django.contrib import admin
+from .models import Challenge, ChallengeAssignment
 
-# Register your models here.
+
+@admin.register(Challenge)
+class ChallengeAdmin(admin.ModelAdmin):
+    list_display = ('title', 'topic', 'concept', 'difficulty', 'verified_at', 'created_at')
+    list_filter = ('difficulty', 'language', 'topic')
+    search_fields = ('title', 'topic', 'concept')
+    ordering = ('topic_key', 'concept_key', 'difficulty', 'created_at')
+
+
+@admin.register(ChallengeAssignment)
+class ChallengeAssignmentAdmin(admin.ModelAdmin):
+    list_display = ('challenge', 'user', 'conversation', 'assigned_at')
+    search_fields = ('user__email', 'challenge__title')
+    ordering = ('-assigned_at',)
+    list_select_related = ('challenge', 'user', 'conversation')
@@ -0,0 +1,111 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from challenges.models import Challenge
+from challenges.services.challenge_bank import ChallengeBank, bank_key, verify_challenge
+from challenges.services.challenge_generator import ChallengeGenerator
+from learning_paths.models import DifficultyLevelChoices, LearningSubtopic
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill the challenge bank: generate find-the-bug challenges for each topic, concept and difficulty, '
+        'and keep only those whose bug and fix are confirmed in the sandbox'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--topic', help='Topic name; with --concept, generate for that one key only')
+        parser.add_argument('--concept', action='append', default=[], help='Concept (subtopic) name; repeatable')
+        parser.add_argument(
+            '--difficulty', choices=DifficultyLevelChoices.values, default=DifficultyLevelChoices.BEGINNER,
+            help='Difficulty for --topic/--concept keys'
+        )
+        parser.add_argument('--topic-id', action='append', default=[], help='Use the subtopics of this learning topic; repeatable')
+        parser.add_argument('--per-concept', type=int, default=3, help='Verified challenges wanted per key')
+        parser.add_argument('--max-rounds', type=int, default=2, help='Generation rounds per key while it is short')
+        parser.add_argument('--sandbox-workers', type=int, default=4, help='Sandbox runs in parallel')
+        parser.add_argument('--dry-run', action='store_true', help='Generate and verify, but store nothing')
+
+    def handle(self, *args, **options):
+        keys = self._keys(options)
+        if not keys:
+            raise CommandError('Nothing to generate for; pass --topic with --concept, or --topic-id')
+
+        stored = rejected = 0
+        with ThreadPoolExecutor(max_workers=options['sandbox_workers']) as sandbox:
+            for round_number in range(options['max_rounds']):
+                wanted = {
+                    key: options['per_concept'] - ChallengeBank.count(*key)
+                    for key in keys
+                }
+                wanted = {key: count for key, count in wanted.items() if count > 0}
+                if not wanted:
+                    break
+
+                self.stdout.write(f'Round {round_number + 1}: generating for {len(wanted)} keys')
+                candidates = asyncio.run(self._generate(wanted))
+                for key, result in list(candidates.items()):
+                    if isinstance(result, Exception):
+                        self.stderr.write(f'  generation failed for {key[0]} / {key[1]}: {result}')
+                        del candidates[key]
+                checks = [
+                    (key, candidate, sandbox.submit(
+                        verify_challenge, candidate['buggy_code'], candidate['fixed_code'], candidate['test_code']
+                    ))
+                    for key, batch in candidates.items()
+                    for candidate in batch[:wanted[key]]
+                ]
+
+                verified = []
+                for (topic, concept, difficulty), candidate, check in checks:
+                    ok, reason = check.result()
+                    if not ok:
+                        rejected += 1
+                        self.stdout.write(f'  rejected "{candidate["title"]}" ({topic} / {concept}): {reason}')
+                        continue
+                    verified.append(Challenge(
+                        topic=topic,
+                        concept=concept,
+                        topic_key=bank_key(topic),
+                        concept_key=bank_key(concept),
+                        difficulty=difficulty,
+                        verified_at=timezone.now(),
+                        **{field: candidate[field] for field in (
+                            'title', 'description', 'hint', 'explanation', 'buggy_code', 'fixed_code', 'test_code'
+                        )},
+                    ))
+
+                stored += len(verified)
+                if options['dry_run']:
+                    break
+                Challenge.objects.bulk_create(verified)
+
+        action = 'Verified' if options['dry_run'] else 'Stored'
+        self.stdout.write(self.style.SUCCESS(f'{action} {stored} challenges, rejected {rejected}'))
+
+    def _keys(self, options) -> list:
+        keys = [(options['topic'], concept, options['difficulty']) for concept in options['concept'] if options['topic']]
+        if options['topic_id']:
+            subtopics = (
+                LearningSubtopic.objects.filter(topic_id__in=options['topic_id'], is_active=True)
+                .select_related('topic')
+                .order_by('topic_id', 'order')
+            )
+            keys += [
+                # saved paths may carry an upper-cased difficulty
+                (subtopic.topic.name, subtopic.name, subtopic.topic.difficulty_level.lower())
+                for subtopic in subtopics
+            ]
+        return list(dict.fromkeys(keys))
+
+    @staticmethod
+    async def _generate(wanted: dict) -> dict:
+        keys = list(wanted)
+        # one chat per key, so the concurrent requests don't share history
+        results = await asyncio.gather(
+            *(ChallengeGenerator().generate(topic, concept, difficulty, wanted[(topic, concept, difficulty)])
+              for topic, concept, difficulty in keys),
+            return_exceptions=True,
+        )
+        return dict(zip(keys, results))
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:38
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('ai_core', '0007_conversation_title_generated'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Challenge',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('topic', models.CharField(help_text="e.g., 'Python Basics'", max_length=255)),
+                ('concept', models.CharField(help_text="The subtopic this exercises, e.g., 'Loops'", max_length=255)),
+                ('topic_key', models.CharField(max_length=255)),
+                ('concept_key', models.CharField(max_length=255)),
+                ('difficulty', models.CharField(choices=[('beginner', 'Beginner'), ('intermediate', 'Intermediate'), ('advanced', 'Advanced')], max_length=20)),
+                ('title', models.CharField(max_length=255)),
+                ('description', models.TextField(help_text='What the code is supposed to do; shown to the student')),
+                ('hint', models.TextField(blank=True)),
+                ('explanation', models.TextField(blank=True, help_text='What the bug is and why the fix works')),
+                ('language', models.CharField(choices=[('python', 'Python'), ('javascript', 'Javascript'), ('typescript', 'Typescript')], default='python', max_length=20)),
+                ('buggy_code', models.TextField()),
+                ('fixed_code', models.TextField()),
+                ('test_code', models.TextField(help_text='Assertions run after either version of the code')),
+                ('verified_at', models.DateTimeField(help_text='When the sandbox last confirmed the bug and the fix')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['topic_key', 'concept_key', 'difficulty', 'created_at'],
+                'indexes': [models.Index(fields=['topic_key', 'concept_key', 'difficulty', 'created_at'], name='challenges__topic_k_866e3d_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ChallengeAssignment',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('assigned_at', models.DateTimeField(auto_now_add=True)),
+                ('challenge', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='assignments', to='challenges.challenge')),
+                ('conversation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='ai_core.conversation')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('challenge', 'user')},
+            },
+        ),
+    ]
@@ -1,3 +1,57 @@
 from django.db import models
+from django.conf import settings
+import uuid
+from ai_core.models import MessageLanguageChoices
+from learning_paths.models import DifficultyLevelChoices
 
-# Create your models here.
+
+class Challenge(models.Model):
+    """
+    A ready-made find-the-bug exercise. Only stored once the sandbox has shown
+    that the buggy code fails its tests and the fixed code passes them.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    topic = models.CharField(max_length=255, help_text="e.g., 'Python Basics'")
+    concept = models.CharField(max_length=255, help_text="The subtopic this exercises, e.g., 'Loops'")
+    # lookup keys, see challenges.services.challenge_bank.bank_key
+    topic_key = models.CharField(max_length=255)
+    concept_key = models.CharField(max_length=255)
+    difficulty = models.CharField(max_length=20, choices=DifficultyLevelChoices.choices)
+    title = models.CharField(max_length=255)
+    description = models.TextField(help_text="What the code is supposed to do; shown to the student")
+    hint = models.TextField(blank=True)
+    explanation = models.TextField(blank=True, help_text="What the bug is and why the fix works")
+    language = models.CharField(
+        choices=MessageLanguageChoices.choices,
+        default=MessageLanguageChoices.PYTHON,
+        max_length=20
+    )
+    buggy_code = models.TextField()
+    fixed_code = models.TextField()
+    test_code = models.TextField(help_text="Assertions run after either version of the code")
+    verified_at = models.DateTimeField(help_text="When the sandbox last confirmed the bug and the fix")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['topic_key', 'concept_key', 'difficulty', 'created_at']
+        indexes = [
+            models.Index(fields=['topic_key', 'concept_key', 'difficulty', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.topic} - {self.concept} ({self.difficulty}): {self.title}"
+
+
+class ChallengeAssignment(models.Model):
+    """A bank challenge handed to a user, so they are not given the same one twice"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    challenge = models.ForeignKey(Challenge, related_name='assignments', on_delete=models.CASCADE)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    conversation = models.ForeignKey('ai_core.Conversation', on_delete=models.SET_NULL, null=True, blank=True)
+    assigned_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['challenge', 'user']
+
+    def __str__(self):
+        return f"{self.user.email} - {self.challenge.title}"
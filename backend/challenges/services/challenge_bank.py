@@ -0,0 +1,78 @@
+import logging
+import re
+from typing import Callable, Optional
+from django.db import IntegrityError, transaction
+from challenges.models import Challenge, ChallengeAssignment
+
+logger = logging.getLogger('challenges.services.challenge_bank')
+
+# Outputs that mean the buggy version never ran, which makes it a typo rather than a bug to hunt
+UNRUNNABLE_ERRORS = ('SyntaxError', 'IndentationError', 'TabError')
+
+
+def bank_key(text: str) -> str:
+    """'Python OOP: Classes & Objects' -> 'python oop classes objects'"""
+    return re.sub(r'[^a-z0-9]+', ' ', text.lower()).strip()
+
+
+def verify_challenge(buggy_code: str, fixed_code: str, test_code: str, run: Optional[Callable] = None) -> tuple:
+    """
+    Run both versions against the tests in the sandbox. Returns (True, '')
+    when the buggy code fails them and the fixed code passes, otherwise
+    (False, reason).
+    """
+    if run is None:
+        from execution.services.python_executor import run_python as run
+
+    buggy = run(f"{buggy_code}\n\n{test_code}\n")
+    if buggy.get("error"):
+        return False, f"sandbox unavailable: {buggy['error']}"
+    if buggy["status"] == 0:
+        return False, "buggy code passes the tests"
+    if any(error in buggy["output"] for error in UNRUNNABLE_ERRORS):
+        return False, "buggy code does not compile"
+
+    fixed = run(f"{fixed_code}\n\n{test_code}\n")
+    if fixed.get("error"):
+        return False, f"sandbox unavailable: {fixed['error']}"
+    if fixed["status"] != 0:
+        return False, f"fixed code fails the tests: {fixed['output'][-300:]}"
+    return True, ""
+
+
+class ChallengeBank:
+    """
+    Verified challenges keyed by topic, concept (subtopic) and difficulty,
+    filled ahead of time by `manage.py generate_challenges`.
+    """
+
+    @staticmethod
+    def pick(topic: str, concept: str, difficulty: str, user_id, conversation=None) -> Optional[Challenge]:
+        """
+        The oldest challenge for this key that the user has not been given yet,
+        recorded as assigned to them. None when the bank has nothing left.
+        """
+        candidates = (
+            Challenge.objects.filter(
+                topic_key=bank_key(topic),
+                concept_key=bank_key(concept),
+                difficulty=difficulty.lower(),
+            )
+            .exclude(assignments__user_id=user_id)
+            .order_by('created_at')
+        )
+        # a second tab may claim the same challenge at the same moment; take the next one
+        for challenge in candidates[:3]:
+            try:
+                with transaction.atomic():
+                    ChallengeAssignment.objects.create(challenge=challenge, user_id=user_id, conversation=conversation)
+            except IntegrityError:
+                continue
+            return challenge
+        return None
+
+    @staticmethod
+    def count(topic: str, concept: str, difficulty: str) -> int:
+        return Challenge.objects.filter(
+            topic_key=bank_key(topic), concept_key=bank_key(concept), difficulty=difficulty.lower()
+        ).count()
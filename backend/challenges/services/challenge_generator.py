@@ -0,0 +1,72 @@
+from google import genai
+from google.genai import types
+from django.conf import settings
+import json
+import logging
+from ai_core.utils.llm_scheduler import BACKGROUND, llm_scheduler
+from billing.utils.llm_usage import llm_call
+
+logger = logging.getLogger('challenges.services.challenge_generator')
+
+GEMINI_API_KEY = settings.GEMINI_API_KEY
+AI_MODEL = "gemini-2.5-flash"
+client = genai.Client(api_key=GEMINI_API_KEY)
+
+CHALLENGE_FIELDS = ('title', 'description', 'hint', 'explanation', 'buggy_code', 'fixed_code', 'test_code')
+
+CHALLENGE_GENERATION_PROMPT = """You write find-the-bug coding exercises for a programming tutor.
+
+Topic: {topic}
+Concept: {concept}
+Difficulty: {difficulty}
+
+Write {count} different exercises that practise this concept. For each one:
+- "fixed_code": a short, self-contained Python 3.11 program (standard library only, no input(), files or network) that defines one or two functions
+- "buggy_code": the same program with one realistic mistake a {difficulty} learner of this concept makes; it must still run, so no syntax errors
+- "test_code": plain `assert` statements that call the functions; every assertion passes for fixed_code and at least one fails for buggy_code
+- "title": a few words
+- "description": what the program is supposed to do, without revealing the bug
+- "hint": one sentence pointing towards the bug
+- "explanation": what the bug is and why the fix works
+
+Response Format Rules (strict):
+- Respond only in JSON parsable by `json.loads`, with no Markdown fences or commentary.
+- Use exactly this structure: {{"challenges": [{{"title": "", "description": "", "hint": "", "explanation": "", "buggy_code": "", "fixed_code": "", "test_code": ""}}]}}
+"""
+
+
+class ChallengeGenerator:
+    """Asks Gemini for candidate challenges; they still have to pass verify_challenge before being stored."""
+
+    def __init__(self, user_id=None):
+        self.chat = client.chats.create(model=AI_MODEL)
+        # who the generation is billed to, if anyone
+        self.user_id = user_id
+
+    async def generate(self, topic: str, concept: str, difficulty: str, count: int) -> list:
+        """Candidate challenge dicts with every CHALLENGE_FIELDS key; malformed entries are dropped."""
+        prompt = CHALLENGE_GENERATION_PROMPT.format(topic=topic, concept=concept, difficulty=difficulty, count=count)
+
+        with llm_call('challenge_generation', user_id=self.user_id) as call:
+            response = call.record(await llm_scheduler.run(
+                self.chat.send_message,
+                priority=BACKGROUND,
+                config=types.GenerateContentConfig(
+                    response_mime_type="application/json",
+                ),
+                message=prompt,
+            ))
+
+        try:
+            data = json.loads(response.text)
+        except json.JSONDecodeError:
+            logger.error("Gemini returned invalid JSON for challenges: %s", response.text[:500])
+            return []
+
+        challenges = data.get("challenges", []) if isinstance(data, dict) else []
+        return [
+            challenge for challenge in challenges
+            if isinstance(challenge, dict)
+            and all(isinstance(challenge.get(field), str) for field in CHALLENGE_FIELDS)
+            and challenge["buggy_code"].strip() != challenge["fixed_code"].strip()
+        ]
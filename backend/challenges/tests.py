@@ -1,3 +1,141 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from ai_core.models import Conversation
+from challenges.models import Challenge, ChallengeAssignment
+from challenges.services.challenge_bank import ChallengeBank, bank_key, verify_challenge
+from learning_paths.models import LearningSubtopic, LearningTopic, SubtopicProgress, UserLearningPath
+from learning_paths.services.learning_path_ai_services import LearningPathTutorAI
+from users.models import CustomUser, UserStats
 
-# Create your tests here.
+FIXED = "def add(a, b):\n    return a + b"
+BUGGY = "def add(a, b):\n    return a - b"
+TESTS = "assert add(2, 3) == 5"
+
+
+def fake_sandbox(code: str) -> dict:
+    """Runs the snippet in-process the way the sandbox reports it."""
+    try:
+        exec(compile(code, '<challenge>', 'exec'), {})
+    except SyntaxError as exception:
+        return {"status": 1, "output": f"SyntaxError: {exception}"}
+    except Exception as exception:
+        return {"status": 1, "output": f"{type(exception).__name__}: {exception}"}
+    return {"status": 0, "output": ""}
+
+
+class VerifyChallengeTests(SimpleTestCase):
+    def test_accepts_failing_bug_and_passing_fix(self):
+        self.assertEqual(verify_challenge(BUGGY, FIXED, TESTS, run=fake_sandbox), (True, ''))
+
+    def test_rejects_bug_that_passes(self):
+        ok, reason = verify_challenge(FIXED, FIXED, TESTS, run=fake_sandbox)
+        self.assertFalse(ok)
+        self.assertIn('buggy code passes', reason)
+
+    def test_rejects_fix_that_fails(self):
+        ok, reason = verify_challenge(BUGGY, BUGGY, TESTS, run=fake_sandbox)
+        self.assertFalse(ok)
+        self.assertIn('fixed code fails', reason)
+
+    def test_rejects_syntax_error_as_bug(self):
+        ok, reason = verify_challenge("def add(a, b)\n    return a + b", FIXED, TESTS, run=fake_sandbox)
+        self.assertFalse(ok)
+        self.assertIn('does not compile', reason)
+
+    def test_rejects_when_sandbox_is_down(self):
+        ok, reason = verify_challenge(BUGGY, FIXED, TESTS, run=lambda code: {"status": 1, "error": "no docker", "output": ""})
+        self.assertFalse(ok)
+        self.assertIn('sandbox unavailable', reason)
+
+    def test_bank_key_normalizes_names(self):
+        self.assertEqual(bank_key('  Python OOP: Classes & Objects '), 'python oop classes objects')
+
+
+class ChallengeBankTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email='challenger@example.com', password='password', first_name='Test', last_name='Learner'
+        )
+        self.challenges = [
+            Challenge.objects.create(
+                topic='Python Basics',
+                concept='Functions',
+                topic_key=bank_key('Python Basics'),
+                concept_key=bank_key('Functions'),
+                difficulty='beginner',
+                title=f'Broken add {number}',
+                description='Add two numbers',
+                buggy_code=BUGGY,
+                fixed_code=FIXED,
+                test_code=TESTS,
+                verified_at=timezone.now(),
+            )
+            for number in range(2)
+        ]
+
+    def test_pick_never_repeats_a_challenge_for_a_user(self):
+        # saved paths may carry an upper-cased difficulty and differently cased names
+        picked = [ChallengeBank.pick('python basics', 'Functions', 'BEGINNER', self.user.id) for _ in range(3)]
+
+        self.assertEqual(picked, [*self.challenges, None])
+        self.assertEqual(ChallengeAssignment.objects.filter(user=self.user).count(), 2)
+
+    def test_pick_misses_other_keys(self):
+        self.assertIsNone(ChallengeBank.pick('Python Basics', 'Loops', 'beginner', self.user.id))
+        self.assertIsNone(ChallengeBank.pick('Python Basics', 'Functions', 'advanced', self.user.id))
+
+
+class TutorChallengeTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email='tutored@example.com', password='password', first_name='Test', last_name='Learner'
+        )
+        topic = LearningTopic.objects.create(
+            name='Python Basics', description='Basics', estimated_duration=timedelta(hours=1),
+            difficulty_level='beginner', created_by=self.user,
+        )
+        self.subtopic = LearningSubtopic.objects.create(
+            topic=topic, name='Functions', description='Functions', order=1, estimated_duration=timedelta(hours=1)
+        )
+        self.conversation = Conversation.objects.create(user=self.user, title='Learning: Python Basics')
+        self.path = UserLearningPath.objects.create(
+            user=self.user, topic=topic, current_subtopic=self.subtopic, conversation=self.conversation
+        )
+        self.challenge = Challenge.objects.create(
+            topic='Python Basics',
+            concept='Functions',
+            topic_key=bank_key('Python Basics'),
+            concept_key=bank_key('Functions'),
+            difficulty='beginner',
+            title='Broken add',
+            description='Add two numbers',
+            explanation='It subtracts instead of adding.',
+            buggy_code=BUGGY,
+            fixed_code=FIXED,
+            test_code=TESTS,
+            verified_at=timezone.now(),
+        )
+        self.tutor = LearningPathTutorAI(self.path)
+
+    def test_explicit_request_serves_and_counts_a_bank_challenge(self):
+        reply = json.loads(async_to_sync(self.tutor.generate_response)(
+            'Give me a challenge please', conversation=self.conversation
+        ))
+
+        self.assertEqual(reply['type'], 'challenge')
+        self.assertEqual(reply['progress']['challenges_attempted'], 1)
+        self.assertEqual(SubtopicProgress.objects.get(user_path=self.path).challenges_attempted, 1)
+        self.assertEqual(UserStats.objects.get(user=self.user).challenges_attempted, 1)
+
+    def test_served_challenge_is_in_the_tutor_context(self):
+        ChallengeBank.pick('Python Basics', 'Functions', 'beginner', self.user.id, self.conversation)
+
+        context = self.tutor._active_challenge_context(self.conversation, 'Functions')
+        self.assertIn(BUGGY, context)
+        self.assertIn(FIXED, context)
+        self.assertIn('It subtracts instead of adding.', context)
+        # a challenge from another subtopic is no longer the one being worked on
+        self.assertEqual(self.tutor._active_challenge_context(self.conversation, 'Loops'), '')
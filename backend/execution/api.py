@@ -6,7 +6,7 @@ from .api_types import RunParams, RunResponse
 
 router = Router(tags=["execution"])
 
-@post(router, "run", response={200: RunResponse})
+@post(router, "run", response={200: RunResponse}, rate_limit="code_run")
 def run(request: HttpRequest, params: RunParams):
     if params.language != "python":
         return RunResponse(
@@ -1,3 +1,21 @@
-from django.test import TestCase
+from unittest import mock
+from users.models import CustomUser
+from users.testing.query_budget import QueryBudgetTestCase
 
-# Create your tests here.
+
+class ExecutionEndpointQueryBudgetTests(QueryBudgetTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email='budget-runner@example.com', password='password', first_name='Budget', last_name='Runner'
+        )
+
+    # the Docker sandbox isn't what this budget is about
+    @mock.patch('execution.api.run_python', return_value={'output': 'hello\n', 'error': None})
+    def test_run(self, run_python):
+        response = self.assert_within_budget(
+            'execution.run', 'post', '/api/execution/run',
+            user=self.user, data={'code': "print('hello')", 'language': 'python'},
+        )
+        self.assertEqual(response.json()['output'], 'hello\n')
+        run_python.assert_called_once()
@@ -1,14 +1,19 @@
 from uuid import UUID
 from ninja import Router
-from django.http import HttpRequest
+from django.http import Http404, HttpRequest
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from users.utils.ninja import post, get, put, delete
 from users.utils.ninja import post
 from learning_paths.services.learning_path_service import LearningPathSaver
 from learning_paths.services.learning_path_ai_services import LearningPathAI
+from learning_paths.services.subtopic_transition_service import SubtopicTransitionService
+from learning_paths.utils.subtopic_order import first_subtopic, get_ordered_subtopics
+from learning_paths.utils import topic_catalog
+from users.utils.etags import etag_matches, etag_response, make_etag, not_modified, render_json
 from typing import Dict, List, Optional
 from django.db import transaction
+from django.db.models import Count, Max, Prefetch, prefetch_related_objects
 import logging
 import asyncio
 
@@ -38,6 +43,13 @@ from ai_core.models import Conversation, ConversationTypeChoices, Message
 
 logger = logging.getLogger('learning_paths.api')
 
+# Everything get_note_learning_context reads, so building a note response costs no extra queries
+NOTE_CONTEXT_RELATED = (
+    'message__conversation__userlearningpath__topic',
+    'message__conversation__subtopicprogress__subtopic',
+    'message__conversation__subtopicprogress__user_path__topic',
+)
+
 router = Router(tags=["learning_paths"])
 
 
@@ -87,9 +99,9 @@ def get_note_learning_context(note: MessageNote) -> dict:
         }
 
 
-@post(router, "/generate-learning-path", response={200: LearningTopicResponse})
+@post(router, "/generate-learning-path", response={200: LearningTopicResponse}, rate_limit="path_generation")
 def generate_learning_path(request, query: str):
-    learning_path_ai = LearningPathAI()
+    learning_path_ai = LearningPathAI(user_id=request.user.id)
 
     ai_output = asyncio.run(learning_path_ai.generate_learning_path(query))
 
@@ -123,64 +135,17 @@ def generate_learning_path(request, query: str):
 @get(router, "/topics", response={200: List[LearningTopicResponse], 401: Dict[str, str]})
 def get_available_topics(request: HttpRequest):
     """Get all available learning topics"""
-    topics = LearningTopic.objects.filter(is_active=True).prefetch_related('prerequisites')
-    
-    response = []
-    for topic in topics:
-        response.append(LearningTopicResponse(
-            id=topic.id,
-            name=topic.name,
-            description=topic.description,
-            difficulty_level=topic.difficulty_level,
-            estimated_duration=topic.estimated_duration,
-            is_active=topic.is_active,
-            created_at=topic.created_at,
-            subtopics_count=topic.subtopics.filter(is_active=True).count(),
-            prerequisites=[
-                LearningTopicResponse(
-                    id=prereq.id,
-                    name=prereq.name,
-                    description=prereq.description,
-                    difficulty_level=prereq.difficulty_level,
-                    estimated_duration=prereq.estimated_duration,
-                    is_active=prereq.is_active,
-                    created_at=prereq.created_at,
-                    subtopics_count=prereq.subtopics.filter(is_active=True).count(),
-                    prerequisites=[]
-                ) for prereq in topic.prerequisites.all()
-            ]
-        ))
-    
-    return response
+    body, etag = topic_catalog.get_topics_catalog()
+    return etag_response(request, body, etag)
 
 @get(router, "/topics/{topic_id}", response={200: LearningTopicDetailResponse, 401: Dict[str, str], 404: Dict[str, str]})
 def get_topic_details(request: HttpRequest, topic_id: UUID):
     """Get the topic details"""
-    topic = get_object_or_404(LearningTopic, id=topic_id, is_active=True)
-    subtopics = topic.subtopics.filter(is_active=True).order_by('order')
-    
-    response = LearningTopicDetailResponse(
-        id=topic.id,
-        name=topic.name,
-        description=topic.description,
-        difficulty_level=topic.difficulty_level,
-        estimated_duration=topic.estimated_duration,
-        is_active=topic.is_active,
-        created_at=topic.created_at,
-        subtopics=[
-            LearningSubtopicResponse(
-                id=subtopic.id,
-                name=subtopic.name,
-                description=subtopic.description,
-                order=subtopic.order,
-                learning_objectives=subtopic.learning_objectives,
-                estimated_duration=subtopic.estimated_duration,
-                is_active=subtopic.is_active
-            ) for subtopic in subtopics
-        ]
-    )
-    
-    return response
+    cached = topic_catalog.get_topic_details(topic_id)
+    if cached is None:
+        raise Http404("No LearningTopic matches the given query.")
+    body, etag = cached
+    return etag_response(request, body, etag)
 
 
 @get(router, "/user-learning-paths", response={200: List[UserLearningPathResponse], 401: Dict[str, str]})
@@ -192,11 +157,23 @@ def get_user_learning_paths(request: HttpRequest, topic_id: Optional[UUID] = Non
         topic = get_object_or_404(LearningTopic, id=topic_id, is_active=True)
         filters['topic'] = topic
 
+    # paths, their progress rows (via updated_at) and the topics' subtopics are all in the body
+    validators = UserLearningPath.objects.filter(**filters).aggregate(
+        paths=Count('id', distinct=True),
+        updated_at=Max('updated_at'),
+        topic_updated_at=Max('topic__updated_at'),
+        subtopics=Count('topic__subtopics', distinct=True),
+        subtopic_updated_at=Max('topic__subtopics__updated_at'),
+    )
+    etag = make_etag(request.user.id, topic_id, *validators.values())
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
     paths = (
         UserLearningPath.objects
         .filter(**filters)
         .select_related('topic', 'current_subtopic', 'conversation')
-        .prefetch_related('progress__subtopic', 'topic__subtopics')
+        .prefetch_related('progress__subtopic')
         .order_by('-started_at')
     )
 
@@ -216,7 +193,7 @@ def get_user_learning_paths(request: HttpRequest, topic_id: Optional[UUID] = Non
                     estimated_duration=progress.subtopic.estimated_duration,
                     is_active=progress.subtopic.is_active
                 ),
-                conversation_id=progress.conversation.id if progress.conversation else None,
+                conversation_id=progress.conversation_id,
                 status=progress.status,
                 started_at=progress.started_at,
                 completed_at=progress.completed_at,
@@ -236,10 +213,10 @@ def get_user_learning_paths(request: HttpRequest, topic_id: Optional[UUID] = Non
                 estimated_duration=path.topic.estimated_duration,
                 is_active=path.topic.is_active,
                 created_at=path.topic.created_at,
-                subtopics_count=path.topic.subtopics.filter(is_active=True).count(),
+                subtopics_count=len(get_ordered_subtopics(path.topic_id)),
                 prerequisites=[]
             ),
-            conversation_id=path.conversation.id,
+            conversation_id=path.conversation_id,
             current_subtopic=LearningSubtopicResponse(
                 id=path.current_subtopic.id,
                 name=path.current_subtopic.name,
@@ -257,7 +234,7 @@ def get_user_learning_paths(request: HttpRequest, topic_id: Optional[UUID] = Non
             progress=progress_data
         ))
     
-    return response
+    return etag_response(request, render_json(response), etag)
 
 
 @post(router, "/enroll", response={200: None, 401: Dict[str, str], 404: Dict[str, str]})
@@ -278,7 +255,7 @@ def enroll_in_learning_path(request: HttpRequest, topic_id: UUID):
             title=f"Learning: {topic.name}",
             conversation_type=ConversationTypeChoices.LEARNING_PATH
         ),
-        current_subtopic=topic.subtopics.filter(is_active=True).order_by('order').first()
+        current_subtopic=first_subtopic(topic.id)
     )
     return 200, None
 
@@ -304,11 +281,18 @@ def get_subtopic_messages(request: HttpRequest, topic_id: UUID, subtopic_id: UUI
     )
     
     # If no conversation exists yet, return empty list
-    if not subtopic_progress.conversation:
+    if not subtopic_progress.conversation_id:
         return []
-    
+
+    # Messages are only appended or deleted, so their count and newest timestamp identify the version
+    messages = Message.objects.filter(conversation_id=subtopic_progress.conversation_id)
+    validators = messages.aggregate(count=Count('id'), last_message_at=Max('created_at'))
+    etag = make_etag(subtopic_progress.conversation_id, validators['count'], validators['last_message_at'])
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
     # Get all messages from the associated conversation
-    messages = subtopic_progress.conversation.messages.all().order_by('created_at')
+    messages = messages.order_by('created_at')
     
     # Format messages for response
     message_list = []
@@ -341,7 +325,7 @@ def get_subtopic_messages(request: HttpRequest, topic_id: UUID, subtopic_id: UUI
         }
         message_list.append(message_data)
     
-    return message_list
+    return etag_response(request, render_json(message_list), etag)
 
 @post(router, "/{topic_id}/subtopics/{subtopic_id}/skip", response={200: UserLearningPathResponse, 401: Dict[str, str], 404: Dict[str, str]})
 def skip_subtopic(request: HttpRequest, topic_id: UUID, subtopic_id: UUID):
@@ -354,42 +338,16 @@ def skip_subtopic(request: HttpRequest, topic_id: UUID, subtopic_id: UUID):
         is_active=True
     )
     
-    # Get the subtopic progress
-    subtopic_progress = get_object_or_404(
-        SubtopicProgress,
-        user_path=learning_path,
-        subtopic_id=subtopic_id
-    )
-    
-    # Mark as skipped
-    subtopic_progress.status = SubtopicProgressChoices.SKIPPED
-    subtopic_progress.completed_at = timezone.now()
-    subtopic_progress.save()
-    
-    # Move to next subtopic
-    next_subtopic = learning_path.topic.subtopics.filter(
-        is_active=True,
-        order__gt=subtopic_progress.subtopic.order
-    ).order_by('order').first()
-    
-    if next_subtopic:
-        learning_path.current_subtopic = next_subtopic
-        learning_path.save()
-        
-        # Create or get progress for next subtopic
-        next_progress, created = SubtopicProgress.objects.get_or_create(
-            user_path=learning_path,
-            subtopic=next_subtopic,
-            defaults={'status': SubtopicProgressChoices.LEARNING, 'started_at': timezone.now()}
+    # Mark as skipped and move to the next subtopic in one locked transaction
+    try:
+        result = SubtopicTransitionService.update_status(
+            learning_path.id,
+            subtopic_id,
+            SubtopicProgressChoices.SKIPPED,
         )
-        if not created and next_progress.status == SubtopicProgressChoices.NOT_STARTED:
-            next_progress.status = SubtopicProgressChoices.LEARNING
-            next_progress.started_at = timezone.now()
-            next_progress.save()
-    else:
-        # All subtopics completed/skipped
-        learning_path.completed_at = timezone.now()
-        learning_path.save()
+    except SubtopicProgress.DoesNotExist:
+        raise Http404("Subtopic progress not found")
+    learning_path = result['path']
     
     return get_learning_path_response(learning_path)
 
@@ -404,53 +362,24 @@ def update_progress(request: HttpRequest, path_id: UUID, data: UpdateProgressReq
         is_active=True
     )
     
-    progress = get_object_or_404(
-        SubtopicProgress,
-        user_path=path,
-        subtopic_id=data.subtopic_id
-    )
-    
-    # Update progress
-    old_status = progress.status
-    progress.status = data.status
-    progress.notes = data.notes or progress.notes
-    
-    # Handle status transitions
-    if old_status == SubtopicProgressChoices.NOT_STARTED and data.status == SubtopicProgressChoices.LEARNING:
-        progress.started_at = timezone.now()
-    elif data.status == SubtopicProgressChoices.COMPLETED and old_status != SubtopicProgressChoices.COMPLETED:
-        progress.completed_at = timezone.now()
-        # Move to next subtopic
-        next_subtopic = path.topic.subtopics.filter(
-            is_active=True,
-            order__gt=progress.subtopic.order
-        ).order_by('order').first()
-        
-        if next_subtopic:
-            path.current_subtopic = next_subtopic
-            path.save()
-            # Start next subtopic
-            next_progress, created = SubtopicProgress.objects.get_or_create(
-                user_path=path,
-                subtopic=next_subtopic,
-                defaults={'status': SubtopicProgressChoices.LEARNING, 'started_at': timezone.now()}
-            )
-            if not created and next_progress.status == SubtopicProgressChoices.NOT_STARTED:
-                next_progress.status = SubtopicProgressChoices.LEARNING
-                next_progress.started_at = timezone.now()
-                next_progress.save()
-        else:
-            # All subtopics completed
-            path.completed_at = timezone.now()
-            path.save()
-    
-    progress.save()
+    # Status change and any move to the next subtopic happen in one locked transaction
+    try:
+        result = SubtopicTransitionService.update_status(
+            path.id,
+            data.subtopic_id,
+            data.status,
+            notes=data.notes,
+        )
+    except SubtopicProgress.DoesNotExist:
+        raise Http404("Subtopic progress not found")
+    path = result['path']
     
     return get_learning_path_response(path)
 
 
 def get_learning_path_response(path: UserLearningPath) -> UserLearningPathResponse:
     """Helper function to build learning path response"""
+    prefetch_related_objects([path], Prefetch('progress', queryset=SubtopicProgress.objects.select_related('subtopic')))
     progress_data = []
     for progress in path.progress.all():
         progress_data.append(SubtopicProgressResponse(
@@ -464,7 +393,7 @@ def get_learning_path_response(path: UserLearningPath) -> UserLearningPathRespon
                 estimated_duration=progress.subtopic.estimated_duration,
                 is_active=progress.subtopic.is_active
             ),
-            conversation_id=progress.conversation.id if progress.conversation else None,
+            conversation_id=progress.conversation_id,
             status=progress.status,
             started_at=progress.started_at,
             completed_at=progress.completed_at,
@@ -484,10 +413,10 @@ def get_learning_path_response(path: UserLearningPath) -> UserLearningPathRespon
             estimated_duration=path.topic.estimated_duration,
             is_active=path.topic.is_active,
             created_at=path.topic.created_at,
-            subtopics_count=path.topic.subtopics.filter(is_active=True).count(),
+            subtopics_count=len(get_ordered_subtopics(path.topic_id)),
             prerequisites=[]
         ),
-        conversation_id=path.conversation.id,
+        conversation_id=path.conversation_id,
         current_subtopic=LearningSubtopicResponse(
             id=path.current_subtopic.id,
             name=path.current_subtopic.name,
@@ -513,8 +442,8 @@ def get_explore_branches(request: HttpRequest, message_id: UUID):
     from ai_core.models import Message
     
     # Verify message exists and belongs to user's conversation
-    message = get_object_or_404(Message, id=message_id)
-    if message.conversation.user != request.user:
+    message = get_object_or_404(Message.objects.select_related('conversation'), id=message_id)
+    if message.conversation.user_id != request.user.id:
         return 401, {"error": "Unauthorized"}
     
     # Get all branches for this message
@@ -526,11 +455,11 @@ def get_explore_branches(request: HttpRequest, message_id: UUID):
     return [
         ExploreBranchResponse(
             id=branch.id,
-            message_id=branch.message.id,
+            message_id=branch.message_id,
             selection_start=branch.selection_start,
             selection_end=branch.selection_end,
             selection_text=branch.selection_text,
-            branch_conversation_id=branch.branch_conversation.id,
+            branch_conversation_id=branch.branch_conversation_id,
             created_at=branch.created_at,
             updated_at=branch.updated_at
         )
@@ -542,21 +471,21 @@ def get_explore_branches(request: HttpRequest, message_id: UUID):
 def get_message_notes(request: HttpRequest, message_id: UUID):
     """Get all notes for a message"""
     
-    message = get_object_or_404(Message, id=message_id)
-    if message.conversation.user != request.user:
+    message = get_object_or_404(Message.objects.select_related('conversation'), id=message_id)
+    if message.conversation.user_id != request.user.id:
         return 401, {"error": "Unauthorized"}
     
     notes = MessageNote.objects.filter(
         message=message,
         user=request.user
-    )
+    ).select_related(*NOTE_CONTEXT_RELATED)
     
     result = []
     for note in notes:
         context = get_note_learning_context(note)
         result.append(MessageNoteResponse(
             id=note.id,
-            message_id=note.message.id,
+            message_id=note.message_id,
             selection_start=note.selection_start,
             selection_end=note.selection_end,
             selection_text=note.selection_text,
@@ -579,18 +508,14 @@ def get_all_user_notes(request: HttpRequest):
     try:
         notes = MessageNote.objects.filter(
             user=request.user
-        ).select_related(
-            'message__conversation__userlearningpath__topic',
-            'message__conversation__subtopicprogress__subtopic',
-            'message__conversation__subtopicprogress__user_path__topic'
-        ).order_by('-created_at')
+        ).select_related(*NOTE_CONTEXT_RELATED).order_by('-created_at')
         
         result = []
         for note in notes:
             context = get_note_learning_context(note)
             result.append(MessageNoteResponse(
                 id=note.id,
-                message_id=note.message.id,
+                message_id=note.message_id,
                 selection_start=note.selection_start,
                 selection_end=note.selection_end,
                 selection_text=note.selection_text,
@@ -613,8 +538,11 @@ def get_all_user_notes(request: HttpRequest):
 def create_message_note(request: HttpRequest, data: CreateMessageNoteRequest):
     """Create a new note for a message"""
     
-    message = get_object_or_404(Message, id=data.message_id)
-    if message.conversation.user != request.user:
+    message = get_object_or_404(
+        Message.objects.select_related(*(related.removeprefix('message__') for related in NOTE_CONTEXT_RELATED)),
+        id=data.message_id
+    )
+    if message.conversation.user_id != request.user.id:
         return 401, {"error": "Unauthorized"}
     
     note = MessageNote.objects.create(
@@ -629,7 +557,7 @@ def create_message_note(request: HttpRequest, data: CreateMessageNoteRequest):
     context = get_note_learning_context(note)
     return MessageNoteResponse(
         id=note.id,
-        message_id=note.message.id,
+        message_id=note.message_id,
         selection_start=note.selection_start,
         selection_end=note.selection_end,
         selection_text=note.selection_text,
@@ -647,8 +575,8 @@ def create_message_note(request: HttpRequest, data: CreateMessageNoteRequest):
 def edit_message_note(request: HttpRequest, note_id: UUID, data: UpdateMessageNoteRequest):
     """Edit an existing note"""
     
-    note = get_object_or_404(MessageNote, id=note_id)
-    if note.user != request.user:
+    note = get_object_or_404(MessageNote.objects.select_related(*NOTE_CONTEXT_RELATED), id=note_id)
+    if note.user_id != request.user.id:
         return 401, {"error": "Unauthorized"}
     
     note.content = data.content
@@ -657,7 +585,7 @@ def edit_message_note(request: HttpRequest, note_id: UUID, data: UpdateMessageNo
     context = get_note_learning_context(note)
     return MessageNoteResponse(
         id=note.id,
-        message_id=note.message.id,
+        message_id=note.message_id,
         selection_start=note.selection_start,
         selection_end=note.selection_end,
         selection_text=note.selection_text,
@@ -676,7 +604,7 @@ def delete_message_note(request: HttpRequest, note_id: UUID):
     """Delete a note"""
     
     note = get_object_or_404(MessageNote, id=note_id)
-    if note.user != request.user:
+    if note.user_id != request.user.id:
         return 401, {"error": "Unauthorized"}
     
     note.delete()
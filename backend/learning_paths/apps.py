@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class LearningPathsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'learning_paths'
+
+    def ready(self):
+        from learning_paths.signals import connect_signals
+        connect_signals()
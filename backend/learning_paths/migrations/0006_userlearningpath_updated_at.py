@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_paths', '0005_explorebranch_messagenote'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userlearningpath',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning_paths', '0006_userlearningpath_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='learningsubtopic',
+            name='greeting',
+            field=models.TextField(blank=True, default='', help_text="Opening message of this subtopic's conversations; empty until generated"),
+        ),
+    ]
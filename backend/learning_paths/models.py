@@ -56,6 +56,12 @@ class LearningSubtopic(models.Model):
         help_text="List of learning goals for this subtopic"
     )
     estimated_duration = models.DurationField(help_text="Expected time to complete this subtopic")
+    # written once by learning_paths.services.subtopic_greeting_service
+    greeting = models.TextField(
+        blank=True,
+        default='',
+        help_text="Opening message of this subtopic's conversations; empty until generated"
+    )
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -90,6 +96,9 @@ class UserLearningPath(models.Model):
     started_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     is_active = models.BooleanField(default=True)
+    # bumped whenever the path or one of its progress rows changes; the
+    # learning path list derives its ETag from it (see learning_paths.signals)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ['user', 'topic']
@@ -101,10 +110,17 @@ class UserLearningPath(models.Model):
     @property
     def progress_percentage(self):
         """Calculate the percentage of subtopics completed"""
-        total_subtopics = self.topic.subtopics.filter(is_active=True).count()
+        from learning_paths.utils.subtopic_order import get_ordered_subtopics
+
+        total_subtopics = len(get_ordered_subtopics(self.topic_id))
         if total_subtopics == 0:
             return 0
-        completed_subtopics = self.progress.filter(status='completed').count()
+        prefetched = getattr(self, '_prefetched_objects_cache', {}).get('progress')
+        if prefetched is not None:
+            # listing endpoints prefetch progress; don't count it again per path
+            completed_subtopics = sum(1 for progress in prefetched if progress.status == 'completed')
+        else:
+            completed_subtopics = self.progress.filter(status='completed').count()
         return (completed_subtopics / total_subtopics) * 100
 
     @property
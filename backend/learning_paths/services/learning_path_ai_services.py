@@ -1,10 +1,14 @@
 from google import genai
 from google.genai import types
 from django.conf import settings
+from django.db import transaction
+from django.db.models import F
 from django.utils import timezone
 import json
 import logging
-from learning_paths.models import UserLearningPath, SubtopicProgress, LearningSubtopic
+import time
+from typing import Optional
+from learning_paths.models import UserLearningPath, SubtopicProgress, SubtopicProgressChoices, LearningSubtopic
 from learning_paths.utils.learning_prompts import (
     LEARNING_PATH_SYSTEM_PROMPT,
     SUBTOPIC_INTRODUCTION_PROMPT,
@@ -15,8 +19,18 @@ from learning_paths.utils.learning_prompts import (
     CONCEPT_EXPLANATION_PROMPT
 )
 from ai_core.models import Message, Summary
+from ai_core.utils.context_cache import get_context_window
+from ai_core.utils.summary_helpers import save_summary
+from learning_paths.services.subtopic_transition_service import SubtopicTransitionService
 from learning_paths.utils.learning_context_helpers import generate_learning_context
 from asgiref.sync import sync_to_async
+from ai_core.utils.llm_scheduler import BACKGROUND, INTERACTIVE, llm_scheduler
+from ai_core.utils.message_signals import classify, requests_challenge
+from billing.utils.llm_usage import llm_call
+from challenges.models import ChallengeAssignment
+from challenges.services.challenge_bank import ChallengeBank, bank_key
+from users.utils.metrics import CHAT_STAGE_SECONDS
+from users.utils.stats import increment_user_stats
 
 logger = logging.getLogger("ai_core.services.learning_path_service")
 
@@ -25,9 +39,24 @@ AI_MODEL = "gemini-2.5-flash"
 client = genai.Client(api_key=GEMINI_API_KEY)
 
 
+def progress_snapshot(progress: SubtopicProgress) -> dict:
+    """The progress_update payload sent to the frontend after each turn."""
+    return {
+        'covered_points': progress.covered_points,
+        'remaining_points': progress.remaining_points,
+        'ai_confidence': progress.ai_confidence,
+        'progress_percentage': progress.progress_percentage,
+        'challenges_completed': progress.challenges_completed,
+        'challenges_attempted': progress.challenges_attempted,
+        'is_ready_to_move_on': progress.is_ready_to_move_on
+    }
+
+
 class LearningPathAI:
-    def __init__(self):
+    def __init__(self, user_id=None):
         self.chat = client.chats.create(model=AI_MODEL)
+        # who the generated path is billed to
+        self.user_id = user_id
 
     async def generate_learning_path(self, user_query: str) -> dict:
         """
@@ -68,12 +97,14 @@ class LearningPathAI:
 
         full_prompt = f"{system_prompt}\n\nUser request: {user_query}"
 
-        response = self.chat.send_message(
-            config=types.GenerateContentConfig(
-                thinking_config=types.ThinkingConfig(thinking_budget=0)
-            ),
-            message=full_prompt,
-        )
+        with llm_call('learning_path', user_id=self.user_id) as call:
+            response = call.record(await llm_scheduler.run(
+                self.chat.send_message,
+                config=types.GenerateContentConfig(
+                    thinking_config=types.ThinkingConfig(thinking_budget=0)
+                ),
+                message=full_prompt,
+            ))
 
         try:
             data = json.loads(response.text)
@@ -84,17 +115,10 @@ class LearningPathAI:
         return data
 
 
-class LearningPathTutorAI:
-    """
-    Specialized AI tutor for learning path interactions using Socratic methodology
-    """
-    
-    def __init__(self, user_learning_path: UserLearningPath):
-        self.chat = client.chats.create(model=AI_MODEL)
-        self.user_learning_path = user_learning_path
-    
-    async def generate_greeting_message(self, topic_name: str, subtopic_name: str):
-        """Generate a greeting message for the user"""
+    async def generate_greeting_message(
+        self, topic_name: str, subtopic_name: str, conversation=None, priority: int = INTERACTIVE
+    ) -> dict:
+        """Generate the opening message of a subtopic; it depends only on the two names."""
         system_prompt = (
             "You are a helpful assistant that creates friendly, motivational greeting messages "
             "for learning modules. "
@@ -123,12 +147,18 @@ class LearningPathTutorAI:
 
         full_prompt = f"{system_prompt}\n\nUser request: {user_query}"
 
-        response = self.chat.send_message(
-            config=types.GenerateContentConfig(
-                thinking_config=types.ThinkingConfig(thinking_budget=0)
-            ),
-            message=full_prompt,
-        )
+        with llm_call('greeting', conversation=conversation, user_id=self.user_id) as call:
+            response = call.record(await llm_scheduler.run(
+                client.models.generate_content,
+                priority=priority,
+                # the same greeting for everyone starting this subtopic right now
+                coalesce_key=('greeting', topic_name, subtopic_name),
+                model=AI_MODEL,
+                config=types.GenerateContentConfig(
+                    thinking_config=types.ThinkingConfig(thinking_budget=0)
+                ),
+                contents=full_prompt,
+            ))
 
         try:
             data = json.loads(response.text)
@@ -137,27 +167,42 @@ class LearningPathTutorAI:
             raise ValueError("Invalid AI response format") from exception
 
         return data
+
+
+class LearningPathTutorAI:
+    """
+    Specialized AI tutor for learning path interactions using Socratic methodology
+    """
+    
+    def __init__(self, user_learning_path: UserLearningPath):
+        self.chat = client.chats.create(model=AI_MODEL)
+        self.user_learning_path = user_learning_path
+        self.user_id = user_learning_path.user_id
     
-    async def generate_response(self, message_content: str, code_snippet: str | None = None, conversation=None) -> str:
-        """Generate contextual tutoring response based on learning progress"""
+    async def generate_response(
+        self, message_content: str, code_snippet: str | None = None, conversation=None, signals: list | None = None
+    ) -> str:
+        """
+        Generate contextual tutoring response based on learning progress.
+        `signals` are the saved user message's; they are classified here when not given.
+        """
+        context_started = time.perf_counter()
+        if signals is None:
+            signals = classify(message_content)
         
         # Get conversation context (messages + summary)
         context_from_messages = ""
         context_from_summary = ""
         
         if conversation:
-            messages = await sync_to_async(
-                lambda: list(Message.objects.filter(conversation=conversation).order_by('-created_at')[:6])
-            )()
+            window = await sync_to_async(get_context_window)(conversation.id)
             
             # Build message context (oldest to newest)
-            for message in reversed(messages):
+            for message in window.recent(6):
                 context_from_messages += f"{message.sender}: {message.content[:300]}\n"
             
             # Get summary if available
-            summary = await sync_to_async(
-                lambda: Summary.objects.filter(conversation=conversation).order_by('-last_updated_at').first()
-            )()
+            summary = window.summary
             
             if summary:
                 context_from_summary = f"Previous Session Summary:\n{summary.content}\n\n"
@@ -166,6 +211,16 @@ class LearningPathTutorAI:
         current_subtopic = await sync_to_async(lambda: self.user_learning_path.current_subtopic)()
         subtopic_name = current_subtopic.name if current_subtopic else "General Programming"
         topic_name = await sync_to_async(lambda: self.user_learning_path.topic.name)()
+
+        if current_subtopic and not code_snippet and requests_challenge(message_content, signals):
+            banked = await self._banked_challenge(current_subtopic, topic_name, subtopic_name, conversation)
+            if banked:
+                return banked
+
+        # the bank challenge the student is working on, so their fix is judged against it
+        challenge_context = ""
+        if conversation and current_subtopic:
+            challenge_context = await sync_to_async(self._active_challenge_context)(conversation, subtopic_name)
         
         # Get SubtopicProgress context
         progress_context = ""
@@ -212,7 +267,7 @@ class LearningPathTutorAI:
             You are teaching: {topic_name} - {subtopic_name}
 
             {progress_context}
-            
+            {challenge_context}
             {context_from_summary}
 
             RECENT CONVERSATION:
@@ -235,51 +290,138 @@ class LearningPathTutorAI:
               }}
             
             IMPORTANT: Always include progress_update to track learning progress."""
-
-        response = await sync_to_async(self.chat.send_message)(
-            config=types.GenerateContentConfig(
-                thinking_config=types.ThinkingConfig(thinking_budget=0)
-            ),
-            message=teaching_prompt,
-        )
+        CHAT_STAGE_SECONDS.observe(time.perf_counter() - context_started, consumer='learning_path', stage='context')
+
+        with CHAT_STAGE_SECONDS.time(consumer='learning_path', stage='llm'):
+            with llm_call('tutor_response', conversation=conversation, user_id=self.user_id) as call:
+                response = call.record(await llm_scheduler.run(
+                    self.chat.send_message,
+                    config=types.GenerateContentConfig(
+                        thinking_config=types.ThinkingConfig(thinking_budget=0)
+                    ),
+                    message=teaching_prompt,
+                ))
         
         # Strip markdown and parse response
-        response_text = response.text.strip()
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]
-        elif response_text.startswith("```"):
-            response_text = response_text[3:]
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]
-        response_text = response_text.strip()
-        
-        try:
-            parsed = json.loads(response_text)
-            
-            # Update SubtopicProgress if progress_update is provided
-            subtopic_complete = False
-            if current_subtopic and parsed.get("progress_update"):
-                subtopic_complete = await self._update_subtopic_progress(
-                    current_subtopic,
-                    parsed["progress_update"]
-                )
+        with CHAT_STAGE_SECONDS.time(consumer='learning_path', stage='parse'):
+            response_text = response.text.strip()
+            if response_text.startswith("```json"):
+                response_text = response_text[7:]
+            elif response_text.startswith("```"):
+                response_text = response_text[3:]
+            if response_text.endswith("```"):
+                response_text = response_text[:-3]
+            response_text = response_text.strip()
             
-            return json.dumps({
-                "content": parsed.get("content", response_text),
-                "code_snippet": parsed.get("code"),
-                "language": parsed.get("language", "python"),
-                "type": parsed.get("type", "explanation"),
-                "next_action": parsed.get("next_action"),
-                "subtopic_complete": subtopic_complete
-            })
-        except json.JSONDecodeError:
+            try:
+                parsed = json.loads(response_text)
+            except json.JSONDecodeError:
+                parsed = None
+        
+        if parsed is None:
             return json.dumps({
                 "content": response_text,
                 "code_snippet": None,
                 "language": None,
                 "type": "explanation"
             })
+        
+        # Update SubtopicProgress if progress_update is provided
+        progress = None
+        if current_subtopic and parsed.get("progress_update"):
+            with CHAT_STAGE_SECONDS.time(consumer='learning_path', stage='progress'):
+                progress = await self._update_subtopic_progress(
+                    current_subtopic,
+                    parsed["progress_update"]
+                )
+        
+        return json.dumps({
+            "content": parsed.get("content", response_text),
+            "code_snippet": parsed.get("code"),
+            "language": parsed.get("language", "python"),
+            "type": parsed.get("type", "explanation"),
+            "next_action": parsed.get("next_action"),
+            "subtopic_complete": progress.subtopic_complete if progress else False,
+            # fresh progress snapshot so the consumer doesn't re-read the row
+            "progress": progress_snapshot(progress) if progress else None
+        })
     
+    async def _banked_challenge(
+        self, current_subtopic, topic_name: str, subtopic_name: str, conversation=None
+    ) -> str | None:
+        """A verified challenge from the bank as a tutor reply, or None to let the model write one."""
+        difficulty = await sync_to_async(lambda: self.user_learning_path.topic.difficulty_level)()
+        challenge = await sync_to_async(ChallengeBank.pick)(
+            topic_name, subtopic_name, difficulty, self.user_id, conversation
+        )
+        if challenge is None:
+            return None
+
+        logger.info(f"Served bank challenge {challenge.id} for {topic_name} - {subtopic_name}")
+        progress = await sync_to_async(self._record_challenge_attempt)(current_subtopic)
+        content = (
+            f"## 🐞 {challenge.title}\n\n"
+            f"{challenge.description}\n\n"
+            "---\n\n"
+            "The code below has a bug. Run it, find what's wrong, and send me your fixed version."
+        )
+        if challenge.hint:
+            content += f"\n\n*Stuck? Hint: {challenge.hint}*"
+        return json.dumps({
+            "content": content,
+            # the tests come along so running the code shows whether it is fixed
+            "code_snippet": f"{challenge.buggy_code}\n\n{challenge.test_code}",
+            "language": challenge.language,
+            "type": "challenge",
+            "next_action": "Fix the bug and share your code.",
+            "subtopic_complete": False,
+            "progress": progress_snapshot(progress)
+        })
+
+    def _record_challenge_attempt(self, current_subtopic) -> SubtopicProgress:
+        """Count a served challenge on the subtopic's progress row and return the row."""
+        now = timezone.now()
+        with transaction.atomic():
+            SubtopicProgress.objects.get_or_create(
+                user_path=self.user_learning_path,
+                subtopic=current_subtopic,
+                defaults={'status': SubtopicProgressChoices.LEARNING, 'started_at': now},
+            )
+            # update() skips the save signals, so the user's rollup is kept here
+            SubtopicProgress.objects.filter(user_path=self.user_learning_path, subtopic=current_subtopic).update(
+                challenges_attempted=F('challenges_attempted') + 1
+            )
+            increment_user_stats(self.user_id, challenges_attempted=1)
+            # the path list shows the counters, so its ETag moves
+            UserLearningPath.objects.filter(id=self.user_learning_path.id).update(updated_at=now)
+            return SubtopicProgress.objects.get(user_path=self.user_learning_path, subtopic=current_subtopic)
+
+    @staticmethod
+    def _active_challenge_context(conversation, subtopic_name: str) -> str:
+        """The latest bank challenge served in this conversation for this subtopic, as prompt text."""
+        assignment = (
+            ChallengeAssignment.objects.filter(conversation=conversation, challenge__concept_key=bank_key(subtopic_name))
+            .select_related('challenge')
+            .order_by('-assigned_at')
+            .first()
+        )
+        if assignment is None:
+            return ""
+        challenge = assignment.challenge
+        return f"""
+            ACTIVE CHALLENGE (a find-the-bug exercise the student was given; judge their fix against it
+            and don't reveal the fixed code or the explanation unless they ask for the answer):
+            - Title: {challenge.title}
+            - Task: {challenge.description}
+            - Buggy code:
+            {challenge.buggy_code}
+            - Tests:
+            {challenge.test_code}
+            - Reference fix:
+            {challenge.fixed_code}
+            - The bug: {challenge.explanation}
+            """
+
     async def _determine_response_type(self, message_content: str, learning_context: str) -> str:
         """Determine what type of response is most appropriate"""
         
@@ -287,16 +429,18 @@ class LearningPathTutorAI:
         if "start_learning_path" in learning_context or "introduce_subtopic" in learning_context:
             return "introduction"
         
+        signals = classify(message_content)
+
         # Check for code submission (feedback needed)
-        if any(keyword in message_content.lower() for keyword in ['def ', 'function', 'class ', 'import ', '```']):
+        if 'code' in signals:
             return "feedback"
         
         # Check for confusion/help requests
-        if any(keyword in message_content.lower() for keyword in ['confused', 'don\'t understand', 'stuck', 'help', '?']):
+        if 'help_request' in signals:
             return "socratic_question"
         
         # Check for progress assessment needs
-        if any(keyword in message_content.lower() for keyword in ['done', 'finished', 'complete', 'next']):
+        if 'progress_check' in signals:
             return "assessment"
         
         # Check for encouragement needs
@@ -304,7 +448,7 @@ class LearningPathTutorAI:
             return "encouragement"
         
         # Check for explanation requests
-        if any(keyword in message_content.lower() for keyword in ['explain', 'what is', 'how does', 'why']):
+        if 'explanation_request' in signals:
             return "explanation"
         
         return "socratic_question"  # Default to Socratic questioning
@@ -332,12 +476,14 @@ class LearningPathTutorAI:
         
         full_prompt = f"{LEARNING_PATH_SYSTEM_PROMPT}\n\n{prompt}"
         
-        response = await sync_to_async(self.chat.send_message)(
-            config=types.GenerateContentConfig(
-                thinking_config=types.ThinkingConfig(thinking_budget=0)
-            ),
-            message=full_prompt,
-        )
+        with llm_call('subtopic_introduction', user_id=self.user_id) as call:
+            response = call.record(await llm_scheduler.run(
+                self.chat.send_message,
+                config=types.GenerateContentConfig(
+                    thinking_config=types.ThinkingConfig(thinking_budget=0)
+                ),
+                message=full_prompt,
+            ))
         
         return response.text
     
@@ -360,12 +506,14 @@ class LearningPathTutorAI:
         
         full_prompt = f"{LEARNING_PATH_SYSTEM_PROMPT}\n\n{prompt}"
         
-        response = await sync_to_async(self.chat.send_message)(
-            config=types.GenerateContentConfig(
-                thinking_config=types.ThinkingConfig(thinking_budget=0)
-            ),
-            message=full_prompt,
-        )
+        with llm_call('socratic_question', user_id=self.user_id) as call:
+            response = call.record(await llm_scheduler.run(
+                self.chat.send_message,
+                config=types.GenerateContentConfig(
+                    thinking_config=types.ThinkingConfig(thinking_budget=0)
+                ),
+                message=full_prompt,
+            ))
         
         return response.text
     
@@ -396,12 +544,14 @@ class LearningPathTutorAI:
         
         full_prompt = f"{LEARNING_PATH_SYSTEM_PROMPT}\n\n{prompt}"
         
-        response = await sync_to_async(self.chat.send_message)(
-            config=types.GenerateContentConfig(
-                thinking_config=types.ThinkingConfig(thinking_budget=0)
-            ),
-            message=full_prompt,
-        )
+        with llm_call('adaptive_feedback', user_id=self.user_id) as call:
+            response = call.record(await llm_scheduler.run(
+                self.chat.send_message,
+                config=types.GenerateContentConfig(
+                    thinking_config=types.ThinkingConfig(thinking_budget=0)
+                ),
+                message=full_prompt,
+            ))
         
         # Update progress based on feedback
         await self._update_subtopic_progress_from_feedback(response.text)
@@ -437,12 +587,14 @@ class LearningPathTutorAI:
         
         full_prompt = f"{LEARNING_PATH_SYSTEM_PROMPT}\n\n{prompt}"
         
-        response = await sync_to_async(self.chat.send_message)(
-            config=types.GenerateContentConfig(
-                thinking_config=types.ThinkingConfig(thinking_budget=0)
-            ),
-            message=full_prompt,
-        )
+        with llm_call('progress_assessment', user_id=self.user_id) as call:
+            response = call.record(await llm_scheduler.run(
+                self.chat.send_message,
+                config=types.GenerateContentConfig(
+                    thinking_config=types.ThinkingConfig(thinking_budget=0)
+                ),
+                message=full_prompt,
+            ))
         
         return response.text
     
@@ -471,12 +623,14 @@ class LearningPathTutorAI:
         
         full_prompt = f"{LEARNING_PATH_SYSTEM_PROMPT}\n\n{prompt}"
         
-        response = await sync_to_async(self.chat.send_message)(
-            config=types.GenerateContentConfig(
-                thinking_config=types.ThinkingConfig(thinking_budget=0)
-            ),
-            message=full_prompt,
-        )
+        with llm_call('encouragement', user_id=self.user_id) as call:
+            response = call.record(await llm_scheduler.run(
+                self.chat.send_message,
+                config=types.GenerateContentConfig(
+                    thinking_config=types.ThinkingConfig(thinking_budget=0)
+                ),
+                message=full_prompt,
+            ))
         
         return response.text
     
@@ -506,12 +660,14 @@ class LearningPathTutorAI:
         
         full_prompt = f"{LEARNING_PATH_SYSTEM_PROMPT}\n\n{prompt}"
         
-        response = await sync_to_async(self.chat.send_message)(
-            config=types.GenerateContentConfig(
-                thinking_config=types.ThinkingConfig(thinking_budget=0)
-            ),
-            message=full_prompt,
-        )
+        with llm_call('concept_explanation', user_id=self.user_id) as call:
+            response = call.record(await llm_scheduler.run(
+                self.chat.send_message,
+                config=types.GenerateContentConfig(
+                    thinking_config=types.ThinkingConfig(thinking_budget=0)
+                ),
+                message=full_prompt,
+            ))
         
         return response.text
     
@@ -519,12 +675,14 @@ class LearningPathTutorAI:
         """Generate general tutoring response"""
         full_prompt = f"{LEARNING_PATH_SYSTEM_PROMPT}\n\nLearning Context:\n{learning_context}\n\nStudent Message: {message_content}"
         
-        response = await sync_to_async(self.chat.send_message)(
-            config=types.GenerateContentConfig(
-                thinking_config=types.ThinkingConfig(thinking_budget=0)
-            ),
-            message=full_prompt,
-        )
+        with llm_call('general_response', user_id=self.user_id) as call:
+            response = call.record(await llm_scheduler.run(
+                self.chat.send_message,
+                config=types.GenerateContentConfig(
+                    thinking_config=types.ThinkingConfig(thinking_budget=0)
+                ),
+                message=full_prompt,
+            ))
         
         # Strip markdown code fences if present
         response_text = response.text.strip()
@@ -557,66 +715,110 @@ class LearningPathTutorAI:
             })
     
     async def _update_subtopic_progress(self, current_subtopic, progress_update: dict):
-        """Update SubtopicProgress based on AI's assessment and return completion status"""
+        """
+        Update SubtopicProgress based on AI's assessment.
+        Returns the fresh progress row, or None if the update failed.
+        """
         
         try:
-            progress, created = await sync_to_async(
-                SubtopicProgress.objects.get_or_create
-            )(
-                user_path=self.user_learning_path,
-                subtopic=current_subtopic,
-                defaults={
-                    'status': 'learning',
-                    'started_at': timezone.now(),
-                    'remaining_points': progress_update.get('remaining_points', [])
-                }
-            )
-            
-            # Update progress fields
-            if 'covered_points' in progress_update:
-                progress.covered_points = progress_update['covered_points']
-            
-            if 'remaining_points' in progress_update:
-                progress.remaining_points = progress_update['remaining_points']
-            
-            if 'ai_confidence' in progress_update:
-                # Ensure ai_confidence is between 0 and 1
-                confidence = float(progress_update['ai_confidence'])
-                progress.ai_confidence = max(0.0, min(1.0, confidence))
-            
-            if 'notes' in progress_update:
-                # Append new notes to existing notes
-                timestamp = timezone.now().strftime("%Y-%m-%d %H:%M")
-                new_note = f"[{timestamp}] {progress_update['notes']}"
-                if progress.notes:
-                    progress.notes = f"{progress.notes}\n{new_note}"
-                else:
-                    progress.notes = new_note
-            
-            # Update status if not already set
-            if progress.status == 'not_started':
-                progress.status = 'learning'
-                if not progress.started_at:
-                    progress.started_at = timezone.now()
-            
-            await sync_to_async(progress.save)()
-            
-            # Check if subtopic is complete using the property
-            is_complete = await sync_to_async(lambda: progress.subtopic_complete)()
+            progress = await sync_to_async(self._apply_progress_update)(current_subtopic, progress_update)
             
             logger.info(
                 f"Updated progress for {current_subtopic.name}: "
                 f"confidence={progress.ai_confidence:.2f}, "
                 f"covered={len(progress.covered_points)}, "
                 f"remaining={len(progress.remaining_points)}, "
-                f"complete={is_complete}"
+                f"complete={progress.subtopic_complete}"
             )
             
-            return is_complete
+            return progress
             
         except Exception as e:
             logger.error(f"Error updating subtopic progress: {e}")
-            return False
+            return None
+
+    # Columns the AI's progress update writes; the learning path list shows
+    # them, so a change to any of them moves the path's ETag on
+    PROGRESS_UPDATE_COLUMNS = ('covered_points', 'remaining_points', 'ai_confidence', 'notes', 'status')
+
+    @staticmethod
+    def _progress_points(value) -> Optional[list]:
+        """The strings of an LLM-supplied point list; None when it isn't a list at all."""
+        if not isinstance(value, list):
+            return None
+        return [point for point in value if isinstance(point, str)]
+
+    def _apply_progress_update(self, current_subtopic, progress_update: dict) -> SubtopicProgress:
+        """
+        Apply the AI's progress update with a single UPDATE ... RETURNING and
+        return the updated row. Falls back to creating the row if it is missing.
+        Like queryset.update(), this skips the SubtopicProgress save signals;
+        it never touches the challenge counters they track, and bumps the
+        path's updated_at itself when a listed column changes.
+        """
+        now = timezone.now()
+        table = SubtopicProgress._meta.db_table
+        assignments, params = [], []
+        points = {
+            field: self._progress_points(progress_update.get(field))
+            for field in ('covered_points', 'remaining_points')
+        }
+        
+        for field, value in points.items():
+            if value is not None:
+                assignments.append(f"{field} = %s")
+                params.append(value)
+        
+        if 'ai_confidence' in progress_update:
+            # Ensure ai_confidence is between 0 and 1
+            assignments.append("ai_confidence = %s")
+            params.append(max(0.0, min(1.0, float(progress_update['ai_confidence']))))
+        
+        if 'notes' in progress_update:
+            # Append new notes to existing notes
+            new_note = f"[{now.strftime('%Y-%m-%d %H:%M')}] {progress_update['notes']}"
+            assignments.append("notes = CASE WHEN notes = '' THEN %s ELSE notes || %s END")
+            params.extend([new_note, f"\n{new_note}"])
+        
+        # Move out of not_started (right-hand sides see the pre-update row)
+        assignments.append("started_at = CASE WHEN status = %s THEN COALESCE(started_at, %s) ELSE started_at END")
+        params.extend([SubtopicProgressChoices.NOT_STARTED, now])
+        assignments.append("status = CASE WHEN status = %s THEN %s ELSE status END")
+        params.extend([SubtopicProgressChoices.NOT_STARTED, SubtopicProgressChoices.LEARNING])
+        
+        # the locked pre-update copy lets RETURNING report whether anything changed
+        columns = self.PROGRESS_UPDATE_COLUMNS
+        updated = list(SubtopicProgress.objects.raw(
+            f"UPDATE {table} SET {', '.join(assignments)} "
+            f"FROM (SELECT id AS old_id, {', '.join(f'{column} AS old_{column}' for column in columns)} "
+            f"FROM {table} WHERE user_path_id = %s AND subtopic_id = %s FOR UPDATE) AS old "
+            f"WHERE {table}.id = old.old_id "
+            f"RETURNING {table}.*, "
+            f"({', '.join(f'{table}.{column}' for column in columns)}) IS DISTINCT FROM "
+            f"({', '.join(f'old.old_{column}' for column in columns)}) AS changed",
+            params + [self.user_learning_path.id, current_subtopic.id],
+        ))
+        if updated:
+            progress = updated[0]
+            if progress.changed:
+                UserLearningPath.objects.filter(id=self.user_learning_path.id).update(updated_at=now)
+            return progress
+        
+        progress, created = SubtopicProgress.objects.get_or_create(
+            user_path=self.user_learning_path,
+            subtopic=current_subtopic,
+            defaults={
+                'status': SubtopicProgressChoices.LEARNING,
+                'started_at': now,
+                'covered_points': points['covered_points'] or [],
+                'remaining_points': points['remaining_points'] or [],
+                'ai_confidence': max(0.0, min(1.0, float(progress_update.get('ai_confidence', 0.0)))),
+                'notes': f"[{now.strftime('%Y-%m-%d %H:%M')}] {progress_update['notes']}" if 'notes' in progress_update else '',
+            }
+        )
+        if created:
+            UserLearningPath.objects.filter(id=self.user_learning_path.id).update(updated_at=now)
+        return progress
     
     async def _update_subtopic_progress_from_feedback(self, ai_response: str):
         """Update subtopic progress based on AI feedback analysis"""
@@ -653,72 +855,41 @@ class LearningPathTutorAI:
     async def move_to_next_subtopic(self):
         """Move the user to the next subtopic in the learning path"""
         
-        current_subtopic = await sync_to_async(lambda: self.user_learning_path.current_subtopic)()
+        current_subtopic_id = self.user_learning_path.current_subtopic_id
         
-        if not current_subtopic:
+        if not current_subtopic_id:
             return None
         
-        # Mark current subtopic as completed
-        progress, created = await sync_to_async(
-            SubtopicProgress.objects.get_or_create
-        )(
-            user_path=self.user_learning_path,
-            subtopic=current_subtopic,
-            defaults={'status': 'completed', 'completed_at': timezone.now()}
+        # Complete the current subtopic and advance in one locked transaction
+        result = await sync_to_async(SubtopicTransitionService.update_status)(
+            self.user_learning_path.id,
+            current_subtopic_id,
+            SubtopicProgressChoices.COMPLETED,
+            create_missing=True,
+            close_path=True
         )
+        self.user_learning_path = result['path']
         
-        if not created and progress.status != 'completed':
-            progress.status = 'completed'
-            progress.completed_at = timezone.now()
-            await sync_to_async(progress.save)()
-        
-        # Get next subtopic
-        topic = await sync_to_async(lambda: self.user_learning_path.topic)()
-        next_subtopic = await sync_to_async(
-            lambda: LearningSubtopic.objects.filter(
-                topic=topic,
-                order__gt=current_subtopic.order,
-                is_active=True
-            ).order_by('order').first()
-        )()
+        if not result['changed']:
+            # Another request (double click, second tab) already moved the path on
+            return None
+        
+        completed_subtopic = result['progress'].subtopic
+        next_subtopic = result['next_subtopic']
         
         if next_subtopic:
-            # Update current subtopic
-            self.user_learning_path.current_subtopic = next_subtopic
-            await sync_to_async(self.user_learning_path.save)()
-            
-            # Get learning objectives for the new subtopic
-            learning_objectives = await sync_to_async(lambda: next_subtopic.learning_objectives)()
-            
-            # Create progress entry for new subtopic with initialized remaining_points
-            await sync_to_async(
-                SubtopicProgress.objects.get_or_create
-            )(
-                user_path=self.user_learning_path,
-                subtopic=next_subtopic,
-                defaults={
-                    'status': 'learning',
-                    'started_at': timezone.now(),
-                    'remaining_points': learning_objectives,
-                    'covered_points': []
-                }
-            )
-            
             return {
                 'moved': True,
-                'completed_subtopic': current_subtopic.name,
+                'completed_subtopic': completed_subtopic.name,
+                'new_subtopic_id': next_subtopic.id,
                 'new_subtopic': next_subtopic.name,
                 'new_subtopic_description': next_subtopic.description
             }
         else:
             # No more subtopics - learning path completed!
-            self.user_learning_path.completed_at = timezone.now()
-            self.user_learning_path.is_active = False
-            await sync_to_async(self.user_learning_path.save)()
-            
             return {
                 'moved': False,
-                'completed_subtopic': current_subtopic.name,
+                'completed_subtopic': completed_subtopic.name,
                 'learning_path_completed': True
             }
     
@@ -731,14 +902,12 @@ class LearningPathTutorAI:
         # learning_context = await generate_learning_context(self.user_learning_path)
         
         # Get recent conversation messages
-        messages = await sync_to_async(
-            lambda: list(Message.objects.filter(conversation=conversation).order_by('-created_at')[:10])
-        )()
+        window = await sync_to_async(get_context_window)(conversation.id)
         
         # Build conversation context
         conversation_text = "\n".join([
             f"{msg.sender}: {msg.content}" 
-            for msg in reversed(messages)
+            for msg in window.recent(10)
         ])
         
         # Get current subtopic info
@@ -761,20 +930,18 @@ class LearningPathTutorAI:
 
             Provide a concise summary (2-3 sentences) that captures the essence of this learning session."""
 
-        summary_response = await sync_to_async(self.chat.send_message)(
-            config=types.GenerateContentConfig(
-                thinking_config=types.ThinkingConfig(thinking_budget=0)
-            ),
-            message=summary_prompt
-        )
-
-        last_message = await sync_to_async(
-            lambda: Message.objects.filter(conversation=conversation).order_by('-created_at').first()
-        )()
-
-        await sync_to_async(Summary.objects.create)(
-            conversation=conversation,
-            content=summary_response.text,
-            last_message=last_message,
-
-        )
+        with llm_call('tutor_summary', conversation=conversation, user_id=self.user_id) as call:
+            # stateless, so the summary stays out of the tutoring history
+            summary_response = call.record(await llm_scheduler.run(
+                client.models.generate_content,
+                priority=BACKGROUND,
+                model=AI_MODEL,
+                config=types.GenerateContentConfig(
+                    thinking_config=types.ThinkingConfig(thinking_budget=0)
+                ),
+                contents=summary_prompt
+            ))
+
+        last_message = window.last_message
+
+        await sync_to_async(save_summary)(conversation, summary_response.text, last_message)
@@ -1,13 +1,17 @@
 import uuid
 from datetime import timedelta
 from learning_paths.models import LearningTopic, LearningSubtopic
+from learning_paths.services.subtopic_greeting_service import SubtopicGreetingService
 from users.models import CustomUser
+from learning_paths.utils.subtopic_order import invalidate_topic
+from learning_paths.utils.topic_catalog import invalidate_catalog
 
 class LearningPathSaver:
     @staticmethod
     def save_learning_path(data: dict, user: CustomUser) -> LearningTopic:
         """
-        Save AI-generated topic and subtopics into DB.
+        Save AI-generated topic and subtopics into DB, and start generating
+        the subtopic greetings once the transaction commits.
         Returns the created LearningTopic.
         """
         topic_data = data["topic"]
@@ -42,6 +46,10 @@ class LearningPathSaver:
             )
 
         LearningSubtopic.objects.bulk_create(subtopics)
+        # bulk_create skips the save signals that keep these caches fresh
+        invalidate_topic(topic.id)
+        invalidate_catalog()
+        SubtopicGreetingService.pregenerate(topic, user.id)
         return topic
 
     @staticmethod
@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import threading
+from typing import Optional
+from uuid import UUID
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from ai_core.utils.llm_scheduler import BACKGROUND, INTERACTIVE
+from learning_paths.models import LearningSubtopic, LearningTopic
+from learning_paths.services.learning_path_ai_services import LearningPathAI
+
+logger = logging.getLogger('learning_paths.services.subtopic_greeting_service')
+
+# A subtopic's greeting depends only on the topic and subtopic names, so it is
+# generated once and stored on LearningSubtopic.greeting. New paths have their
+# greetings generated in the background as soon as they are saved (unless
+# SUBTOPIC_GREETING_PREGENERATE is off); anything still missing is filled the
+# first time a learner opens the subtopic.
+SUBTOPIC_GREETING_PREGENERATE = getattr(settings, 'SUBTOPIC_GREETING_PREGENERATE', True)
+
+
+class SubtopicGreetingService:
+    @staticmethod
+    async def get_greeting(
+        subtopic_id: UUID, topic_name: str, subtopic_name: str, user_id=None, conversation=None
+    ) -> Optional[str]:
+        """
+        The stored greeting of a subtopic, generating and storing it first if
+        there is none yet. Returns None when the model gave no greeting.
+        """
+        greeting = await database_sync_to_async(
+            lambda: LearningSubtopic.objects.filter(id=subtopic_id).values_list('greeting', flat=True).first()
+        )()
+        if greeting:
+            return greeting
+        return await SubtopicGreetingService._generate(
+            subtopic_id, topic_name, subtopic_name, user_id, conversation, INTERACTIVE
+        )
+
+    @staticmethod
+    def pregenerate(topic: LearningTopic, user_id=None) -> None:
+        """Generate the greetings of a new topic's subtopics once its transaction commits."""
+        if not SUBTOPIC_GREETING_PREGENERATE:
+            return
+        transaction.on_commit(lambda: threading.Thread(
+            target=SubtopicGreetingService._pregenerate_in_thread,
+            args=(topic.id, topic.name, user_id),
+            name=f'greetings-{topic.id}',
+            daemon=True,
+        ).start())
+
+    @staticmethod
+    def _pregenerate_in_thread(topic_id: UUID, topic_name: str, user_id) -> None:
+        try:
+            asyncio.run(SubtopicGreetingService.pregenerate_now(topic_id, topic_name, user_id))
+        finally:
+            close_old_connections()
+
+    @staticmethod
+    async def pregenerate_now(topic_id: UUID, topic_name: str, user_id=None) -> int:
+        """Generate every missing greeting of a topic on the background lane. Returns how many were stored."""
+        missing = await database_sync_to_async(
+            lambda: list(LearningSubtopic.objects.filter(topic_id=topic_id, greeting='').values_list('id', 'name'))
+        )()
+        results = await asyncio.gather(
+            *(
+                SubtopicGreetingService._generate(subtopic_id, topic_name, name, user_id, None, BACKGROUND)
+                for subtopic_id, name in missing
+            ),
+            return_exceptions=True,
+        )
+        for (_, name), result in zip(missing, results):
+            if isinstance(result, Exception):
+                # the subtopic is filled lazily on first open instead
+                logger.warning(f"Could not pregenerate the greeting for '{topic_name} - {name}': {result}")
+        return sum(1 for result in results if isinstance(result, str))
+
+    @staticmethod
+    async def _generate(subtopic_id, topic_name, subtopic_name, user_id, conversation, priority) -> Optional[str]:
+        data = await LearningPathAI(user_id=user_id).generate_greeting_message(
+            topic_name, subtopic_name, conversation=conversation, priority=priority
+        )
+        greeting = data.get('greeting_message')
+        if greeting:
+            # the first stored greeting wins, so every learner opens the subtopic the same way
+            await database_sync_to_async(
+                lambda: LearningSubtopic.objects.filter(id=subtopic_id, greeting='').update(greeting=greeting)
+            )()
+        return greeting
@@ -0,0 +1,148 @@
+from uuid import UUID
+from django.db import transaction
+from django.utils import timezone
+from learning_paths.models import (
+    LearningSubtopic,
+    SubtopicProgress,
+    SubtopicProgressChoices,
+    UserLearningPath,
+)
+from learning_paths.utils import subtopic_order
+
+# Statuses that finish a subtopic and move the path on to the next one
+TERMINAL_STATUSES = (SubtopicProgressChoices.COMPLETED, SubtopicProgressChoices.SKIPPED)
+
+
+class SubtopicTransitionService:
+    """
+    Status changes on a learning path, each applied in one transaction.
+
+    The UserLearningPath row is locked first, so parallel clicks and multiple
+    tabs acting on the same path are serialized. A repeated transition (the
+    subtopic is already finished and the path has moved past it) is a no-op
+    instead of advancing the path a second time.
+    """
+
+    @staticmethod
+    def update_status(
+        path_id: UUID,
+        subtopic_id: UUID,
+        status: str,
+        notes: str | None = None,
+        create_missing: bool = False,
+        close_path: bool = False,
+    ) -> dict:
+        """
+        Set the status of one subtopic. When the path's current subtopic
+        becomes completed or skipped, advance the path to the next unfinished
+        active subtopic, or mark the path completed if there is none.
+        `close_path` also deactivates a completed path.
+
+        Raises SubtopicProgress.DoesNotExist if there is no progress row and
+        `create_missing` is False.
+
+        Returns a dict with the locked `path`, the updated `progress`,
+        `changed`, `next_subtopic` and `path_completed`.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            path = (
+                UserLearningPath.objects.select_for_update(of=('self',))
+                .select_related('topic', 'current_subtopic')
+                .get(id=path_id)
+            )
+            progress = (
+                SubtopicProgress.objects.select_for_update(of=('self',))
+                .select_related('subtopic')
+                .filter(user_path=path, subtopic_id=subtopic_id)
+                .first()
+            )
+            if progress is None:
+                if not create_missing:
+                    raise SubtopicProgress.DoesNotExist()
+                progress = SubtopicProgress.objects.create(
+                    user_path=path,
+                    subtopic=LearningSubtopic.objects.get(id=subtopic_id),
+                    started_at=now,
+                )
+
+            result = {
+                'path': path,
+                'progress': progress,
+                'changed': False,
+                'next_subtopic': None,
+                'path_completed': False,
+            }
+
+            old_status = progress.status
+            finishing = status in TERMINAL_STATUSES
+            if old_status == status and (not finishing or path.current_subtopic_id != progress.subtopic_id):
+                # Repeated request; an earlier one already applied the transition
+                if notes and notes != progress.notes:
+                    progress.notes = notes
+                    progress.save(update_fields=['notes'])
+                    result['changed'] = True
+                return result
+
+            update_fields = ['status']
+            progress.status = status
+            if notes:
+                progress.notes = notes
+                update_fields.append('notes')
+            if status == SubtopicProgressChoices.LEARNING and not progress.started_at:
+                progress.started_at = now
+                update_fields.append('started_at')
+            if finishing and old_status != status:
+                progress.completed_at = now
+                update_fields.append('completed_at')
+            progress.save(update_fields=update_fields)
+            result['changed'] = True
+
+            # Only finishing the current subtopic moves the path; finishing another one just records it
+            if finishing and path.current_subtopic_id == progress.subtopic_id:
+                next_subtopic = SubtopicTransitionService._advance(path, progress.subtopic, now, close_path)
+                result['next_subtopic'] = next_subtopic
+                result['path_completed'] = next_subtopic is None
+            return result
+
+    @staticmethod
+    def _advance(path: UserLearningPath, finished: LearningSubtopic, now, close_path: bool):
+        """Point the locked path at the first unfinished subtopic after `finished` and start it."""
+        finished_ids = set(
+            SubtopicProgress.objects.filter(user_path=path, status__in=TERMINAL_STATUSES)
+            .values_list('subtopic_id', flat=True)
+        )
+        next_subtopic = subtopic_order.next_subtopic(path.topic_id, finished.order, skip_ids=finished_ids)
+
+        if next_subtopic is None:
+            path.completed_at = path.completed_at or now
+            update_fields = ['completed_at', 'updated_at']
+            if close_path:
+                path.is_active = False
+                update_fields.append('is_active')
+            path.save(update_fields=update_fields)
+            return None
+
+        path.current_subtopic = next_subtopic
+        path.save(update_fields=['current_subtopic', 'updated_at'])
+
+        # Upsert the next subtopic's progress: insert it if missing, then start it if it hadn't been
+        SubtopicProgress.objects.bulk_create(
+            [
+                SubtopicProgress(
+                    user_path=path,
+                    subtopic=next_subtopic,
+                    status=SubtopicProgressChoices.LEARNING,
+                    started_at=now,
+                    remaining_points=next_subtopic.learning_objectives,
+                    covered_points=[],
+                )
+            ],
+            ignore_conflicts=True,
+        )
+        SubtopicProgress.objects.filter(
+            user_path=path,
+            subtopic=next_subtopic,
+            status=SubtopicProgressChoices.NOT_STARTED,
+        ).update(status=SubtopicProgressChoices.LEARNING, started_at=now)
+        return next_subtopic
@@ -0,0 +1,33 @@
+"""
+Keep the per-topic subtopic ordering cache (learning_paths.utils.subtopic_order)
+and the topic catalog cache (learning_paths.utils.topic_catalog) in step with
+topic and subtopic writes, and move UserLearningPath.updated_at on progress
+writes. bulk_create and queryset.update() bypass these; callers using them
+invalidate or bump themselves.
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.utils import timezone
+from learning_paths.models import LearningSubtopic, LearningTopic, SubtopicProgress, UserLearningPath
+from learning_paths.utils.subtopic_order import invalidate_topic_subtopics
+from learning_paths.utils.topic_catalog import invalidate_catalog
+
+
+def touch_learning_path(sender, instance, raw=False, **kwargs):
+    """Progress rows are listed with their path, so a change to one is a change to the path."""
+    if raw:
+        return
+    UserLearningPath.objects.filter(id=instance.user_path_id).update(updated_at=timezone.now())
+
+
+def connect_signals():
+    """Called from LearningPathsConfig.ready()."""
+    post_save.connect(invalidate_topic_subtopics, sender=LearningSubtopic)
+    post_delete.connect(invalidate_topic_subtopics, sender=LearningSubtopic)
+
+    for model in (LearningTopic, LearningSubtopic):
+        post_save.connect(invalidate_catalog, sender=model)
+        post_delete.connect(invalidate_catalog, sender=model)
+    m2m_changed.connect(invalidate_catalog, sender=LearningTopic.prerequisites.through)
+
+    post_save.connect(touch_learning_path, sender=SubtopicProgress)
+    post_delete.connect(touch_learning_path, sender=SubtopicProgress)
@@ -0,0 +1,586 @@
+from datetime import timedelta
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from ai_core.models import Conversation, ConversationTypeChoices, Message, MessageSenderChoices
+from learning_paths.models import (
+    LearningSubtopic,
+    LearningTopic,
+    SubtopicProgress,
+    SubtopicProgressChoices,
+    UserLearningPath,
+)
+from ai_core.utils.llm_scheduler import BACKGROUND
+from learning_paths.services.learning_path_ai_services import LearningPathAI, LearningPathTutorAI
+from learning_paths.services.subtopic_greeting_service import SubtopicGreetingService
+from learning_paths.services.subtopic_transition_service import SubtopicTransitionService
+from learning_paths.utils import subtopic_order, topic_catalog
+from learning_paths.utils.learning_context_helpers import LearningContextGenerator
+from users.models import CustomUser
+from users.utils.auth import create_jwt
+from users.testing.concurrency import run_concurrently
+from users.testing.query_budget import QueryBudgetTestCase
+
+
+class SubtopicTransitionConcurrencyTests(TransactionTestCase):
+    # Real transactions are needed so the row locks are actually contended
+    THREADS = 12
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email='learner@example.com', password='password', first_name='Test', last_name='Learner'
+        )
+        self.topic = LearningTopic.objects.create(
+            name='Python Basics',
+            description='Basics',
+            estimated_duration=timedelta(hours=3),
+            created_by=self.user,
+        )
+        self.subtopics = [
+            LearningSubtopic.objects.create(
+                topic=self.topic,
+                name=f'Subtopic {order}',
+                description=f'Subtopic {order}',
+                order=order,
+                learning_objectives=[f'objective {order}'],
+                estimated_duration=timedelta(hours=1),
+            )
+            for order in range(1, 4)
+        ]
+        self.path = UserLearningPath.objects.create(
+            user=self.user,
+            topic=self.topic,
+            conversation=Conversation.objects.create(
+                user=self.user,
+                title='Learning: Python Basics',
+                conversation_type=ConversationTypeChoices.LEARNING_PATH,
+            ),
+            current_subtopic=self.subtopics[0],
+        )
+        SubtopicProgress.objects.create(
+            user_path=self.path,
+            subtopic=self.subtopics[0],
+            status=SubtopicProgressChoices.LEARNING,
+        )
+
+    def test_parallel_completions_advance_exactly_once(self):
+        results, errors = run_concurrently(
+            lambda i: SubtopicTransitionService.update_status(
+                self.path.id, self.subtopics[0].id, SubtopicProgressChoices.COMPLETED
+            ),
+            self.THREADS,
+        )
+
+        self.assertEqual(errors, [])
+        self.assertEqual(sum(result['changed'] for result in results), 1)
+        self.path.refresh_from_db()
+        self.assertEqual(self.path.current_subtopic_id, self.subtopics[1].id)
+        self.assertIsNone(self.path.completed_at)
+        next_progress = SubtopicProgress.objects.get(user_path=self.path, subtopic=self.subtopics[1])
+        self.assertEqual(next_progress.status, SubtopicProgressChoices.LEARNING)
+        self.assertEqual(next_progress.remaining_points, ['objective 2'])
+
+    def test_parallel_next_clicks_from_stale_tabs_do_not_skip_subtopics(self):
+        # Every tab still thinks the first subtopic is current
+        results, errors = run_concurrently(
+            lambda i: SubtopicTransitionService.update_status(
+                self.path.id,
+                self.subtopics[0].id,
+                SubtopicProgressChoices.COMPLETED,
+                create_missing=True,
+                close_path=True,
+            ),
+            self.THREADS,
+        )
+
+        self.assertEqual(errors, [])
+        self.path.refresh_from_db()
+        self.assertEqual(self.path.current_subtopic_id, self.subtopics[1].id)
+        self.assertTrue(self.path.is_active)
+        self.assertFalse(
+            SubtopicProgress.objects.filter(user_path=self.path, subtopic=self.subtopics[2]).exists()
+        )
+
+    def test_mixed_skip_and_complete_apply_one_transition(self):
+        statuses = [SubtopicProgressChoices.SKIPPED, SubtopicProgressChoices.COMPLETED]
+        results, errors = run_concurrently(
+            lambda i: SubtopicTransitionService.update_status(
+                self.path.id, self.subtopics[0].id, statuses[i % 2]
+            ),
+            self.THREADS,
+        )
+
+        self.assertEqual(errors, [])
+        self.path.refresh_from_db()
+        self.assertEqual(self.path.current_subtopic_id, self.subtopics[1].id)
+        self.assertEqual(SubtopicProgress.objects.filter(user_path=self.path).count(), 2)
+
+    def test_finishing_every_subtopic_in_parallel_completes_the_path(self):
+        for subtopic in self.subtopics[1:]:
+            SubtopicProgress.objects.create(user_path=self.path, subtopic=subtopic)
+
+        results, errors = run_concurrently(
+            lambda i: SubtopicTransitionService.update_status(
+                self.path.id,
+                self.subtopics[i % len(self.subtopics)].id,
+                SubtopicProgressChoices.COMPLETED,
+            ),
+            self.THREADS,
+        )
+
+        self.assertEqual(errors, [])
+        self.assertEqual(
+            SubtopicProgress.objects.filter(
+                user_path=self.path, status=SubtopicProgressChoices.COMPLETED
+            ).count(),
+            len(self.subtopics),
+        )
+        self.assertEqual(SubtopicProgress.objects.filter(user_path=self.path).count(), len(self.subtopics))
+        self.path.refresh_from_db()
+        self.assertIsNotNone(self.path.completed_at)
+
+    def test_missing_progress_raises(self):
+        with self.assertRaises(SubtopicProgress.DoesNotExist):
+            SubtopicTransitionService.update_status(
+                self.path.id, self.subtopics[2].id, SubtopicProgressChoices.SKIPPED
+            )
+
+
+class LearningPathEndpointQueryBudgetTests(QueryBudgetTestCase):
+    scale_data_prefix = 'learning-budget'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        data = cls.data
+        cls.topic = data['topics'][0]
+        cls.path = next(path for path in data['paths'] if path.user_id == cls.user.id and path.topic_id == cls.topic.id)
+        cls.progress = next(
+            progress for progress in data['progress']
+            if progress.user_path_id == cls.path.id and progress.status == SubtopicProgressChoices.LEARNING
+        )
+        cls.note = next(note for note in data['notes'] if note.user_id == cls.user.id)
+        cls.branch = next(branch for branch in data['branches'] if branch.user_id == cls.user.id)
+        # a topic the user isn't enrolled in yet
+        cls.new_topic = LearningTopic.objects.create(
+            name='Not enrolled yet', description='Enroll target', estimated_duration=timedelta(hours=1), created_by=cls.user
+        )
+        LearningSubtopic.objects.create(
+            topic=cls.new_topic, name='Intro', description='Intro', order=1, estimated_duration=timedelta(hours=1)
+        )
+
+    def test_topics(self):
+        response = self.assert_within_budget('learning_paths.topics', 'get', '/api/learning-paths/topics', user=self.user)
+        self.assertEqual(len(response.json()), 4)
+
+        # a warm catalog answers a matching If-None-Match without touching it again
+        self.assert_within_budget(
+            'learning_paths.topics.not_modified', 'get', '/api/learning-paths/topics', user=self.user,
+            cold=False, expected_status=304, HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+
+    def test_topic_details(self):
+        self.assert_within_budget('learning_paths.topic_details', 'get', f'/api/learning-paths/topics/{self.topic.id}', user=self.user)
+
+    def test_user_learning_paths(self):
+        response = self.assert_within_budget(
+            'learning_paths.user_learning_paths', 'get', '/api/learning-paths/user-learning-paths', user=self.user
+        )
+        self.assertEqual(len(response.json()), 3)
+
+        self.assert_within_budget(
+            'learning_paths.user_learning_paths.not_modified', 'get', '/api/learning-paths/user-learning-paths',
+            user=self.user, expected_status=304, HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+
+    def test_user_learning_paths_for_topic(self):
+        self.assert_within_budget(
+            'learning_paths.user_learning_paths.topic', 'get',
+            f'/api/learning-paths/user-learning-paths?topic_id={self.topic.id}', user=self.user,
+        )
+
+    def test_subtopic_messages(self):
+        path = f'/api/learning-paths/{self.topic.id}/subtopics/{self.progress.subtopic_id}/messages'
+        response = self.assert_within_budget('learning_paths.subtopic_messages', 'get', path, user=self.user)
+        self.assertEqual(len(response.json()), 20)
+
+        self.assert_within_budget(
+            'learning_paths.subtopic_messages.not_modified', 'get', path, user=self.user,
+            expected_status=304, HTTP_IF_NONE_MATCH=response['ETag'],
+        )
+
+    def test_enroll(self):
+        self.assert_within_budget(
+            'learning_paths.enroll', 'post', f'/api/learning-paths/enroll?topic_id={self.new_topic.id}', user=self.user
+        )
+
+    def test_skip_subtopic(self):
+        self.assert_within_budget(
+            'learning_paths.skip_subtopic', 'post',
+            f'/api/learning-paths/{self.topic.id}/subtopics/{self.progress.subtopic_id}/skip', user=self.user,
+        )
+
+    def test_update_progress(self):
+        response = self.assert_within_budget(
+            'learning_paths.update_progress', 'put', f'/api/learning-paths/{self.path.id}/progress', user=self.user,
+            data={'subtopic_id': str(self.progress.subtopic_id), 'status': 'completed', 'notes': 'Done'},
+        )
+        self.assertNotEqual(response.json()['current_subtopic']['id'], str(self.progress.subtopic_id))
+
+    def test_explore_branches(self):
+        self.assert_within_budget(
+            'learning_paths.explore_branches', 'get', f'/api/learning-paths/messages/{self.branch.message_id}/branches',
+            user=self.user,
+        )
+
+    def test_message_notes(self):
+        self.assert_within_budget(
+            'learning_paths.message_notes', 'get', f'/api/learning-paths/messages/{self.note.message_id}/notes',
+            user=self.user,
+        )
+
+    def test_all_notes(self):
+        response = self.assert_within_budget('learning_paths.all_notes', 'get', '/api/learning-paths/notes/all', user=self.user)
+        self.assertEqual(len(response.json()), 30)
+
+    def test_create_note(self):
+        message = self.progress.conversation.messages.filter(sender=MessageSenderChoices.AI).first()
+        response = self.assert_within_budget(
+            'learning_paths.create_note', 'post', '/api/learning-paths/notes/create', user=self.user,
+            data={
+                'message_id': str(message.id),
+                'selection_start': 0,
+                'selection_end': 6,
+                'selection_text': 'Seeded',
+                'content': 'New note',
+            },
+        )
+        self.assertEqual(response.json()['subtopic_id'], str(self.progress.subtopic_id))
+
+    def test_edit_note(self):
+        self.assert_within_budget(
+            'learning_paths.edit_note', 'post', f'/api/learning-paths/notes/{self.note.id}/edit', user=self.user,
+            data={'content': 'Edited'},
+        )
+
+    def test_delete_note(self):
+        self.assert_within_budget('learning_paths.delete_note', 'delete', f'/api/learning-paths/notes/{self.note.id}', user=self.user)
+
+
+class SubtopicGreetingServiceTests(TransactionTestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email='greeting@example.com', password='password', first_name='Test', last_name='Learner'
+        )
+        self.topic = LearningTopic.objects.create(
+            name='Python Basics',
+            description='Basics',
+            estimated_duration=timedelta(hours=3),
+            created_by=self.user,
+        )
+        self.subtopics = [
+            LearningSubtopic.objects.create(
+                topic=self.topic,
+                name=f'Subtopic {order}',
+                description=f'Subtopic {order}',
+                order=order,
+                estimated_duration=timedelta(hours=1),
+            )
+            for order in (1, 2)
+        ]
+        patcher = mock.patch.object(
+            LearningPathAI,
+            'generate_greeting_message',
+            new=mock.AsyncMock(side_effect=lambda topic, subtopic, **kwargs: {'greeting_message': f'Welcome to {subtopic}!'}),
+        )
+        self.generate = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_generates_once_then_serves_stored_greeting(self):
+        subtopic = self.subtopics[0]
+        for _ in range(2):
+            greeting = async_to_sync(SubtopicGreetingService.get_greeting)(
+                subtopic.id, self.topic.name, subtopic.name, user_id=self.user.id
+            )
+            self.assertEqual(greeting, 'Welcome to Subtopic 1!')
+
+        self.assertEqual(self.generate.await_count, 1)
+        subtopic.refresh_from_db()
+        self.assertEqual(subtopic.greeting, 'Welcome to Subtopic 1!')
+
+    def test_pregenerate_fills_only_missing_greetings(self):
+        LearningSubtopic.objects.filter(id=self.subtopics[0].id).update(greeting='Already here')
+
+        stored = async_to_sync(SubtopicGreetingService.pregenerate_now)(self.topic.id, self.topic.name, self.user.id)
+
+        self.assertEqual(stored, 1)
+        self.assertEqual(
+            list(LearningSubtopic.objects.filter(topic=self.topic).order_by('order').values_list('greeting', flat=True)),
+            ['Already here', 'Welcome to Subtopic 2!'],
+        )
+        self.assertEqual(self.generate.await_args.kwargs['priority'], BACKGROUND)
+
+    def test_missing_greeting_is_not_stored(self):
+        self.generate.side_effect = lambda topic, subtopic, **kwargs: {}
+        subtopic = self.subtopics[0]
+
+        greeting = async_to_sync(SubtopicGreetingService.get_greeting)(subtopic.id, self.topic.name, subtopic.name)
+
+        self.assertIsNone(greeting)
+        subtopic.refresh_from_db()
+        self.assertEqual(subtopic.greeting, '')
+
+
+class ProgressUpdateTests(TestCase):
+    def setUp(self):
+        user = CustomUser.objects.create_user(
+            email='progress@example.com', password='password', first_name='Test', last_name='Learner'
+        )
+        topic = LearningTopic.objects.create(
+            name='Python Basics', description='Basics', estimated_duration=timedelta(hours=1), created_by=user
+        )
+        self.subtopic = LearningSubtopic.objects.create(
+            topic=topic, name='Loops', description='Loops', order=1, estimated_duration=timedelta(hours=1)
+        )
+        self.path = UserLearningPath.objects.create(
+            user=user,
+            topic=topic,
+            current_subtopic=self.subtopic,
+            conversation=Conversation.objects.create(user=user, title='Learning: Python Basics'),
+        )
+        self.progress = SubtopicProgress.objects.create(
+            user_path=self.path,
+            subtopic=self.subtopic,
+            status=SubtopicProgressChoices.LEARNING,
+            remaining_points=['for loops', 'while loops'],
+        )
+        self.tutor = LearningPathTutorAI(self.path)
+        self.long_ago = self.path.started_at - timedelta(days=1)
+
+    def apply(self, update):
+        UserLearningPath.objects.filter(id=self.path.id).update(updated_at=self.long_ago)
+        progress = self.tutor._apply_progress_update(self.subtopic, update)
+        return progress, UserLearningPath.objects.get(id=self.path.id).updated_at != self.long_ago
+
+    def test_returns_the_updated_row_and_moves_the_path_etag(self):
+        progress, moved = self.apply({'ai_confidence': 0.7, 'covered_points': ['for loops']})
+
+        self.assertEqual(progress.id, self.progress.id)
+        self.assertEqual(progress.ai_confidence, 0.7)
+        self.assertEqual(progress.covered_points, ['for loops'])
+        self.assertEqual(progress.remaining_points, ['for loops', 'while loops'])
+        self.assertTrue(moved)
+
+    def test_started_row_changes_move_the_etag_and_repeats_do_not(self):
+        self.assertTrue(self.apply({'ai_confidence': 0.4})[1])
+        self.assertFalse(self.apply({'ai_confidence': 0.4})[1])
+        self.assertTrue(self.apply({'remaining_points': ['while loops']})[1])
+
+    def test_non_list_points_are_ignored(self):
+        progress, moved = self.apply({'covered_points': 'for loops', 'remaining_points': ['while loops', 3, None]})
+
+        self.assertEqual(progress.covered_points, [])
+        self.assertEqual(progress.remaining_points, ['while loops'])
+        self.assertTrue(moved)
+
+    def test_not_started_row_starts(self):
+        SubtopicProgress.objects.filter(id=self.progress.id).update(status=SubtopicProgressChoices.NOT_STARTED)
+
+        progress, moved = self.apply({})
+
+        self.assertEqual(progress.status, SubtopicProgressChoices.LEARNING)
+        self.assertIsNotNone(progress.started_at)
+        self.assertTrue(moved)
+
+    def test_missing_row_is_created(self):
+        self.progress.delete()
+
+        progress, moved = self.apply({'covered_points': 'for loops', 'remaining_points': ['while loops']})
+
+        self.assertEqual(progress.status, SubtopicProgressChoices.LEARNING)
+        self.assertEqual((progress.covered_points, progress.remaining_points), ([], ['while loops']))
+        self.assertTrue(moved)
+
+
+class LearningContextSnapshotTests(TestCase):
+    def setUp(self):
+        user = CustomUser.objects.create_user(
+            email='snapshot@example.com', password='password', first_name='Snap', last_name='Shot'
+        )
+        topic = LearningTopic.objects.create(
+            name='Python Basics', description='Basics', estimated_duration=timedelta(hours=1), created_by=user
+        )
+        subtopic = LearningSubtopic.objects.create(
+            topic=topic, name='Loops', description='Loops', order=1, estimated_duration=timedelta(hours=1)
+        )
+        conversation = Conversation.objects.create(user=user, title='Learning: Python Basics')
+        self.path = UserLearningPath.objects.create(
+            user=user, topic=topic, current_subtopic=subtopic, conversation=conversation
+        )
+        started = timezone.now() - timedelta(hours=1)
+        # user messages only in the older half, so the two windows barely overlap
+        self.messages = []
+        for index in range(20):
+            message = Message.objects.create(
+                conversation=conversation,
+                sender=MessageSenderChoices.USER if index < 8 or index % 2 else MessageSenderChoices.AI,
+                content=f'message {index}',
+            )
+            Message.objects.filter(id=message.id).update(created_at=started + timedelta(minutes=index))
+            self.messages.append(message)
+
+    def test_loads_both_windows_with_limited_queries(self):
+        generator = LearningContextGenerator(self.path)
+        with CaptureQueriesContext(connection) as context:
+            generator._load_snapshot()
+
+        newest_first = self.messages[::-1]
+        self.assertEqual([m.id for m in generator.recent_messages], [m.id for m in newest_first[:10]])
+        self.assertEqual(
+            [m.id for m in generator.recent_user_messages],
+            [m.id for m in newest_first if m.sender == MessageSenderChoices.USER][:5],
+        )
+        message_sql = next(q['sql'] for q in context.captured_queries if 'ai_core_message' in q['sql'])
+        self.assertIn('UNION ALL', message_sql)
+        self.assertNotIn('ROW_NUMBER', message_sql)
+
+
+class SubtopicOrderCacheTests(TestCase):
+    def setUp(self):
+        subtopic_order.subtopic_order_cache.clear()
+        self.addCleanup(subtopic_order.subtopic_order_cache.clear)
+        user = CustomUser.objects.create_user(
+            email='order@example.com', password='password', first_name='Test', last_name='Learner'
+        )
+        self.topic = LearningTopic.objects.create(
+            name='Python Basics', description='Basics', estimated_duration=timedelta(hours=3), created_by=user
+        )
+        # created out of order, with an inactive one in the middle
+        self.subtopics = {
+            order: LearningSubtopic.objects.create(
+                topic=self.topic,
+                name=f'Subtopic {order}',
+                description=f'Subtopic {order}',
+                order=order,
+                learning_objectives=[f'objective {order}'],
+                estimated_duration=timedelta(hours=1),
+                is_active=order != 3,
+            )
+            for order in (4, 1, 3, 2)
+        }
+
+    def names(self):
+        return [subtopic.name for subtopic in subtopic_order.get_ordered_subtopics(self.topic.id)]
+
+    def test_lookups_follow_learning_order(self):
+        self.assertEqual(self.names(), ['Subtopic 1', 'Subtopic 2', 'Subtopic 4'])
+        with self.assertNumQueries(0):
+            self.assertEqual(subtopic_order.first_subtopic(self.topic.id).order, 1)
+            self.assertEqual(subtopic_order.next_subtopic(self.topic.id, 2).order, 4)
+            self.assertEqual(subtopic_order.next_subtopic(self.topic.id, 1, skip_ids={self.subtopics[2].id}).order, 4)
+            self.assertIsNone(subtopic_order.next_subtopic(self.topic.id, 4))
+            self.assertEqual(subtopic_order.previous_subtopic(self.topic.id, 4).order, 2)
+            self.assertEqual(subtopic_order.subtopic_position(self.topic.id, self.subtopics[4].id), 2)
+            self.assertIsNone(subtopic_order.subtopic_position(self.topic.id, self.subtopics[3].id))
+
+    def test_saving_or_deleting_a_subtopic_invalidates_its_topic(self):
+        self.names()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.subtopics[3].is_active = True
+            self.subtopics[3].save()
+        self.assertEqual(self.names(), ['Subtopic 1', 'Subtopic 2', 'Subtopic 3', 'Subtopic 4'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.subtopics[1].delete()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.names(), ['Subtopic 2', 'Subtopic 3', 'Subtopic 4'])
+
+    def test_invalidation_waits_for_the_commit(self):
+        self.names()
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.subtopics[3].is_active = True
+            self.subtopics[3].save()
+            # a reader before the commit must not re-cache the old order under a new version
+            with self.assertNumQueries(0):
+                self.assertEqual(self.names(), ['Subtopic 1', 'Subtopic 2', 'Subtopic 4'])
+        self.assertTrue(callbacks)
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.names(), ['Subtopic 1', 'Subtopic 2', 'Subtopic 3', 'Subtopic 4'])
+
+    def test_callers_get_their_own_copies(self):
+        first = subtopic_order.first_subtopic(self.topic.id)
+        first.learning_objectives.append('changed by a caller')
+        first.name = 'Renamed by a caller'
+
+        again = subtopic_order.first_subtopic(self.topic.id)
+        self.assertIsNot(again, first)
+        self.assertEqual((again.name, again.learning_objectives), ('Subtopic 1', ['objective 1']))
+
+
+class TopicCatalogETagTests(TestCase):
+    def setUp(self):
+        topic_catalog.topic_catalog_cache.invalidate()
+        self.addCleanup(topic_catalog.topic_catalog_cache.invalidate)
+        self.user = CustomUser.objects.create_user(
+            email='catalog@example.com', password='password', first_name='Test', last_name='Learner'
+        )
+        self.topic = LearningTopic.objects.create(
+            name='Python Basics', description='Basics', estimated_duration=timedelta(hours=3), created_by=self.user
+        )
+        self.subtopic = LearningSubtopic.objects.create(
+            topic=self.topic, name='Loops', description='Loops', order=1, estimated_duration=timedelta(hours=1)
+        )
+
+    def get(self, path='/api/learning-paths/topics', **headers):
+        return self.client.get(path, HTTP_AUTHORIZATION=f'Bearer {create_jwt(self.user.id, "access")}', **headers)
+
+    def test_catalog_edit_changes_the_etag_once_committed(self):
+        etag = self.get()['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.topic.name = 'Python Fundamentals'
+            self.topic.save()
+        # still the cached catalog until the edit commits
+        self.assertEqual(self.get()['ETag'], etag)
+
+        for callback in callbacks:
+            callback()
+        response = self.get()
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()[0]['name'], 'Python Fundamentals')
+
+    def test_subtopic_edit_changes_the_topic_details_etag(self):
+        path = f'/api/learning-paths/topics/{self.topic.id}'
+        etag = self.get(path)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.subtopic.name = 'For and while loops'
+            self.subtopic.save()
+
+        response = self.get(path)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['subtopics'][0]['name'], 'For and while loops')
+
+    def test_if_none_match(self):
+        old_etag = self.get()['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.topic.description = 'Updated'
+            self.topic.save()
+        etag = self.get()['ETag']
+
+        for header in (etag, etag.removeprefix('W/'), f'{old_etag}, {etag}', '*'):
+            response = self.get(HTTP_IF_NONE_MATCH=header)
+            self.assertEqual(response.status_code, 304, header)
+            self.assertEqual(response['ETag'], etag)
+            self.assertEqual(response.content, b'')
+
+        response = self.get(HTTP_IF_NONE_MATCH=old_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.json()[0]['description'], 'Updated')
@@ -1,7 +1,9 @@
-from django.db.models import Q, Count, Avg
+from django.db.models import Prefetch, Value
 from asgiref.sync import sync_to_async
 from learning_paths.models import UserLearningPath, SubtopicProgress, LearningSubtopic
+from learning_paths.utils.subtopic_order import get_ordered_subtopics
 from ai_core.models import Message, Conversation
+from ai_core.utils.message_signals import message_signals
 import json
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
@@ -19,20 +21,58 @@ class LearningContextGenerator:
     
     async def generate_full_context(self) -> Dict:
         """Generate comprehensive context for AI tutoring"""
+        await sync_to_async(self._load_snapshot)()
         context = {
-            "learning_profile": await self._get_learning_profile(),
-            "current_progress": await self._get_current_progress(),
-            "performance_patterns": await self._get_performance_patterns(),
-            "conversation_context": await self._get_conversation_context(),
-            "next_steps": await self._get_suggested_next_steps(),
-            "emotional_indicators": await self._get_emotional_indicators()
+            "learning_profile": self._get_learning_profile(),
+            "current_progress": self._get_current_progress(),
+            "performance_patterns": self._get_performance_patterns(),
+            "conversation_context": self._get_conversation_context(),
+            "next_steps": self._get_suggested_next_steps(),
+            "emotional_indicators": self._get_emotional_indicators()
         }
         return context
+
+    def _load_snapshot(self):
+        """
+        Load everything the sections below need up front, in a fixed number of
+        queries: the path with its user, topic and current subtopic, the path's
+        progress rows, and the recent messages. The topic's ordered subtopics
+        come from the shared subtopic ordering cache.
+        Every section is then computed from this in-memory snapshot.
+        """
+        self.user_learning_path = (
+            UserLearningPath.objects
+            .select_related('user', 'topic', 'current_subtopic')
+            .prefetch_related(
+                Prefetch('progress', queryset=SubtopicProgress.objects.select_related('subtopic').order_by('subtopic__order')),
+            )
+            .get(pk=self.user_learning_path.pk)
+        )
+        self.subtopics = get_ordered_subtopics(self.user_learning_path.topic_id)
+        self.progress_records = list(self.user_learning_path.progress.all())
+
+        # The 10 most recent messages plus the 5 most recent user messages, in one
+        # query: a UNION ALL of two LIMITed index scans of (conversation, -created_at)
+        messages = Message.objects.filter(conversation_id=self.user_learning_path.conversation_id).order_by('-created_at')
+        snapshot = list(
+            messages.annotate(part=Value('recent'))[:10]
+            .union(messages.filter(sender='user').annotate(part=Value('user'))[:5], all=True)
+        )
+        newest_first = sorted(snapshot, key=lambda msg: msg.created_at, reverse=True)
+        self.recent_messages = [msg for msg in newest_first if msg.part == 'recent']
+        self.recent_user_messages = [msg for msg in newest_first if msg.part == 'user']
+
+    def _progress_percentage(self) -> float:
+        """Same as UserLearningPath.progress_percentage, computed from the snapshot"""
+        if not self.subtopics:
+            return 0
+        completed_subtopics = len([p for p in self.progress_records if p.status == 'completed'])
+        return (completed_subtopics / len(self.subtopics)) * 100
     
-    async def _get_learning_profile(self) -> Dict:
+    def _get_learning_profile(self) -> Dict:
         """Get student's learning profile and preferences"""
-        user = await sync_to_async(lambda: self.user_learning_path.user)()
-        topic = await sync_to_async(lambda: self.user_learning_path.topic)()
+        user = self.user_learning_path.user
+        topic = self.user_learning_path.topic
         
         return {
             "topic_name": topic.name,
@@ -44,18 +84,12 @@ class LearningContextGenerator:
             "is_active": self.user_learning_path.is_active
         }
     
-    async def _get_current_progress(self) -> Dict:
+    def _get_current_progress(self) -> Dict:
         """Get detailed current progress information"""
-        current_subtopic = await sync_to_async(lambda: self.user_learning_path.current_subtopic)()
-        
-        progress_records = await sync_to_async(list)(
-            SubtopicProgress.objects.filter(
-                user_path=self.user_learning_path
-            ).select_related('subtopic').order_by('subtopic__order')
-        )
+        current_subtopic = self.user_learning_path.current_subtopic
         
         progress_summary = []
-        for progress in progress_records:
+        for progress in self.progress_records:
             progress_summary.append({
                 "subtopic_name": progress.subtopic.name,
                 "status": progress.status,
@@ -67,8 +101,8 @@ class LearningContextGenerator:
                 "notes": progress.notes
             })
         
-        progress_percentage = await sync_to_async(lambda: self.user_learning_path.progress_percentage)()
-        is_completed = await sync_to_async(lambda: self.user_learning_path.is_completed)()
+        progress_percentage = self._progress_percentage()
+        is_completed = progress_percentage == 100
         
         return {
             "current_subtopic": {
@@ -82,13 +116,11 @@ class LearningContextGenerator:
             "subtopic_progress": progress_summary
         }
     
-    async def _get_performance_patterns(self) -> Dict:
+    def _get_performance_patterns(self) -> Dict:
         """Analyze learning patterns and performance trends"""
-        progress_records = await sync_to_async(list)(
-            SubtopicProgress.objects.filter(
-                user_path=self.user_learning_path,
-                started_at__isnull=False
-            ).order_by('started_at')
+        progress_records = sorted(
+            (p for p in self.progress_records if p.started_at is not None),
+            key=lambda p: p.started_at
         )
         
         if not progress_records:
@@ -159,15 +191,9 @@ class LearningContextGenerator:
         else:
             return "struggling"
     
-    async def _get_conversation_context(self) -> Dict:
+    def _get_conversation_context(self) -> Dict:
         """Get recent conversation context for continuity"""
-        conversation = await sync_to_async(lambda: self.user_learning_path.conversation)()
-        
-        recent_messages = await sync_to_async(list)(
-            Message.objects.filter(
-                conversation=conversation
-            ).order_by('-created_at')[:10]
-        )
+        recent_messages = list(self.recent_messages)
         
         if not recent_messages:
             return {"recent_messages": [], "conversation_tone": "new"}
@@ -185,10 +211,10 @@ class LearningContextGenerator:
         
         user_messages = [msg for msg in recent_messages if msg.sender == 'user']
         if user_messages:
-            last_user_message = user_messages[-1].content.lower()
-            if any(word in last_user_message for word in ['confused', 'don\'t understand', 'stuck', 'help']):
+            signals = message_signals(user_messages[-1])
+            if 'needs_help' in signals:
                 tone = "needs_help"
-            elif any(word in last_user_message for word in ['got it', 'understand', 'clear', 'thanks']):
+            elif 'understood' in signals:
                 tone = "confident"
             else:
                 tone = "neutral"
@@ -201,15 +227,12 @@ class LearningContextGenerator:
             "message_count": len(recent_messages)
         }
     
-    async def _get_suggested_next_steps(self) -> Dict:
+    def _get_suggested_next_steps(self) -> Dict:
         """Determine appropriate next steps based on progress"""
-        current_subtopic = await sync_to_async(lambda: self.user_learning_path.current_subtopic)()
-        topic = await sync_to_async(lambda: self.user_learning_path.topic)()
+        current_subtopic = self.user_learning_path.current_subtopic
         
         if not current_subtopic:
-            first_subtopic = await sync_to_async(
-                lambda: topic.subtopics.filter(is_active=True).order_by('order').first()
-            )()
+            first_subtopic = self.subtopics[0] if self.subtopics else None
             
             return {
                 "action": "start_learning_path",
@@ -217,12 +240,10 @@ class LearningContextGenerator:
                 "recommendation": "Begin with topic introduction and first subtopic"
             }
         
-        current_progress = await sync_to_async(
-            lambda: SubtopicProgress.objects.filter(
-                user_path=self.user_learning_path,
-                subtopic=current_subtopic
-            ).first()
-        )()
+        current_progress = next(
+            (p for p in self.progress_records if p.subtopic_id == current_subtopic.id),
+            None
+        )
         
         if not current_progress or current_progress.status == 'not_started':
             return {
@@ -243,12 +264,10 @@ class LearningContextGenerator:
                 "recommendation": "Provide practice challenges and assess mastery"
             }
         elif current_progress.status == 'completed':
-            next_subtopic = await sync_to_async(
-                lambda: topic.subtopics.filter(
-                    is_active=True,
-                    order__gt=current_subtopic.order
-                ).order_by('order').first()
-            )()
+            next_subtopic = next(
+                (s for s in self.subtopics if s.order > current_subtopic.order),
+                None
+            )
             
             if next_subtopic:
                 return {
@@ -267,38 +286,27 @@ class LearningContextGenerator:
             "recommendation": "Assess current understanding and determine next steps"
         }
     
-    async def _get_emotional_indicators(self) -> Dict:
+    def _get_emotional_indicators(self) -> Dict:
         """Detect emotional state indicators from recent interactions"""
-        conversation = await sync_to_async(lambda: self.user_learning_path.conversation)()
-        
-        recent_messages = await sync_to_async(list)(
-            Message.objects.filter(
-                conversation=conversation,
-                sender='user'
-            ).order_by('-created_at')[:5]
-        )
+        recent_messages = self.recent_user_messages
         
         if not recent_messages:
             return {"emotional_state": "neutral", "indicators": []}
         
-        frustration_words = ['frustrated', 'confused', 'stuck', 'don\'t get it', 'hard', 'difficult']
-        confidence_words = ['got it', 'understand', 'clear', 'easy', 'makes sense']
-        engagement_words = ['interesting', 'cool', 'awesome', 'love', 'like']
-        
         indicators = []
         emotional_state = "neutral"
         
         for msg in recent_messages:
-            content_lower = msg.content.lower()
+            signals = message_signals(msg)
             
-            if any(word in content_lower for word in frustration_words):
+            if 'frustration' in signals:
                 indicators.append("frustration")
                 emotional_state = "frustrated"
-            elif any(word in content_lower for word in confidence_words):
+            elif 'confidence' in signals:
                 indicators.append("confidence")
                 if emotional_state == "neutral":
                     emotional_state = "confident"
-            elif any(word in content_lower for word in engagement_words):
+            elif 'engagement' in signals:
                 indicators.append("engagement")
                 if emotional_state == "neutral":
                     emotional_state = "engaged"
@@ -0,0 +1,119 @@
+import copy
+import threading
+import time
+from typing import Collection, Optional
+from django.conf import settings
+from django.db import transaction
+from learning_paths.models import LearningSubtopic
+
+# Per-process cache of each topic's active subtopics in learning order, so
+# next/previous/position lookups don't each run an ORDER BY query.
+# Entries are dropped when a subtopic is saved or deleted in this process (see
+# learning_paths.signals); other processes pick the change up after the TTL.
+# The cached instances never leave the cache: every lookup returns copies.
+SUBTOPIC_ORDER_CACHE_TTL_SECONDS = getattr(settings, "SUBTOPIC_ORDER_CACHE_TTL_SECONDS", 300)
+
+
+class SubtopicOrderCache:
+    """Thread-safe topic_id -> (ordered subtopics, cached_at, version)."""
+
+    def __init__(self, ttl_seconds: float = SUBTOPIC_ORDER_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._entries = {}
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, topic_id: str) -> Optional[tuple]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(topic_id)
+            if entry is None:
+                return None
+            subtopics, cached_at, version = entry
+            if version != self._versions.get(topic_id, 0) or now - cached_at > self.ttl_seconds:
+                del self._entries[topic_id]
+                return None
+            return subtopics
+
+    def version(self, topic_id: str) -> int:
+        with self._lock:
+            return self._versions.get(topic_id, 0)
+
+    def set(self, topic_id: str, subtopics: tuple, version: int) -> None:
+        with self._lock:
+            if version == self._versions.get(topic_id, 0):
+                self._entries[topic_id] = (subtopics, time.time(), version)
+
+    def invalidate(self, topic_id) -> None:
+        topic_id = str(topic_id)
+        with self._lock:
+            self._versions[topic_id] = self._versions.get(topic_id, 0) + 1
+            self._entries.pop(topic_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+
+subtopic_order_cache = SubtopicOrderCache()
+
+
+def _copy_subtopic(subtopic: LearningSubtopic) -> LearningSubtopic:
+    subtopic = copy.copy(subtopic)
+    # the only mutable column; progress rows take it as their remaining points
+    subtopic.learning_objectives = copy.deepcopy(subtopic.learning_objectives)
+    return subtopic
+
+
+def get_ordered_subtopics(topic_id) -> tuple:
+    """
+    Active subtopics of a topic in learning order, as copies the caller owns.
+    Sync; hits the DB only on a miss.
+    """
+    topic_id = str(topic_id)
+    subtopics = subtopic_order_cache.get(topic_id)
+    if subtopics is None:
+        version = subtopic_order_cache.version(topic_id)
+        subtopics = tuple(LearningSubtopic.objects.filter(topic_id=topic_id, is_active=True).order_by('order'))
+        subtopic_order_cache.set(topic_id, tuple(_copy_subtopic(subtopic) for subtopic in subtopics), version)
+        return subtopics
+    return tuple(_copy_subtopic(subtopic) for subtopic in subtopics)
+
+
+def first_subtopic(topic_id) -> Optional[LearningSubtopic]:
+    subtopics = get_ordered_subtopics(topic_id)
+    return subtopics[0] if subtopics else None
+
+
+def next_subtopic(topic_id, after_order: int, skip_ids: Collection = ()) -> Optional[LearningSubtopic]:
+    """First active subtopic after `after_order`, ignoring any id in `skip_ids`."""
+    return next(
+        (s for s in get_ordered_subtopics(topic_id) if s.order > after_order and s.id not in skip_ids),
+        None,
+    )
+
+
+def previous_subtopic(topic_id, before_order: int) -> Optional[LearningSubtopic]:
+    return next(
+        (s for s in reversed(get_ordered_subtopics(topic_id)) if s.order < before_order),
+        None,
+    )
+
+
+def subtopic_position(topic_id, subtopic_id) -> Optional[int]:
+    """0-based position of the subtopic among the topic's active subtopics."""
+    return next(
+        (index for index, s in enumerate(get_ordered_subtopics(topic_id)) if s.id == subtopic_id),
+        None,
+    )
+
+
+def invalidate_topic(topic_id):
+    """Clears the topic's cached order once the surrounding write commits."""
+    transaction.on_commit(lambda: subtopic_order_cache.invalidate(topic_id))
+
+
+def invalidate_topic_subtopics(sender, instance, **kwargs):
+    """post_save / post_delete receiver for LearningSubtopic."""
+    invalidate_topic(instance.topic_id)
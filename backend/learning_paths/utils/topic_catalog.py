@@ -0,0 +1,136 @@
+import threading
+import time
+from typing import Optional, Tuple
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Prefetch, Q
+from learning_paths.api_types import LearningSubtopicResponse, LearningTopicDetailResponse, LearningTopicResponse
+from learning_paths.models import LearningTopic
+from users.utils.etags import make_etag, render_json
+
+# The public topic catalog is the same for every user and changes rarely, so
+# the rendered JSON bodies and their ETags are cached per process. Any topic,
+# subtopic or prerequisite write in this process clears the cache once the
+# transaction commits (see learning_paths.signals); other processes rebuild
+# after the TTL.
+TOPIC_CATALOG_CACHE_TTL_SECONDS = getattr(settings, "TOPIC_CATALOG_CACHE_TTL_SECONDS", 60)
+
+
+class TopicCatalogCache:
+    """Thread-safe key -> (body, etag, cached_at) store with a catalog-wide version."""
+
+    def __init__(self, ttl_seconds: float = TOPIC_CATALOG_CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._entries = {}
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def get(self, key) -> Optional[Tuple[bytes, str]]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            body, etag, cached_at = entry
+            if now - cached_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            return body, etag
+
+    @property
+    def version(self) -> int:
+        with self._lock:
+            return self._version
+
+    def set(self, key, body: bytes, etag: str, version: int) -> None:
+        with self._lock:
+            if version == self._version:
+                self._entries[key] = (body, etag, time.time())
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+
+
+topic_catalog_cache = TopicCatalogCache()
+
+
+def _topic_response(topic: LearningTopic, prerequisites=()) -> LearningTopicResponse:
+    return LearningTopicResponse(
+        id=topic.id,
+        name=topic.name,
+        description=topic.description,
+        difficulty_level=topic.difficulty_level,
+        estimated_duration=topic.estimated_duration,
+        is_active=topic.is_active,
+        created_at=topic.created_at,
+        subtopics_count=topic.active_subtopics_count,
+        prerequisites=[_topic_response(prereq) for prereq in prerequisites]
+    )
+
+
+def _with_subtopic_counts(queryset):
+    return queryset.annotate(active_subtopics_count=Count('subtopics', filter=Q(subtopics__is_active=True)))
+
+
+def _render_topics() -> bytes:
+    # Two queries regardless of catalog size: the topics and their prerequisites, each with counts
+    topics = _with_subtopic_counts(LearningTopic.objects.filter(is_active=True)).prefetch_related(
+        Prefetch('prerequisites', queryset=_with_subtopic_counts(LearningTopic.objects.all()))
+    )
+    return render_json([_topic_response(topic, topic.prerequisites.all()) for topic in topics])
+
+
+def _render_topic_details(topic_id) -> Optional[bytes]:
+    topic = LearningTopic.objects.filter(id=topic_id, is_active=True).prefetch_related('subtopics').first()
+    if topic is None:
+        return None
+    subtopics = sorted((s for s in topic.subtopics.all() if s.is_active), key=lambda s: s.order)
+    return render_json(LearningTopicDetailResponse(
+        id=topic.id,
+        name=topic.name,
+        description=topic.description,
+        difficulty_level=topic.difficulty_level,
+        estimated_duration=topic.estimated_duration,
+        is_active=topic.is_active,
+        created_at=topic.created_at,
+        subtopics=[
+            LearningSubtopicResponse(
+                id=subtopic.id,
+                name=subtopic.name,
+                description=subtopic.description,
+                order=subtopic.order,
+                learning_objectives=subtopic.learning_objectives,
+                estimated_duration=subtopic.estimated_duration,
+                is_active=subtopic.is_active
+            ) for subtopic in subtopics
+        ]
+    ))
+
+
+def _cached(key, render) -> Optional[Tuple[bytes, str]]:
+    cached = topic_catalog_cache.get(key)
+    if cached is None:
+        version = topic_catalog_cache.version
+        body = render()
+        if body is None:
+            return None
+        cached = (body, make_etag(body))
+        topic_catalog_cache.set(key, *cached, version)
+    return cached
+
+
+def get_topics_catalog() -> Tuple[bytes, str]:
+    """Rendered body and ETag for /topics."""
+    return _cached('topics', _render_topics)
+
+
+def get_topic_details(topic_id) -> Optional[Tuple[bytes, str]]:
+    """Rendered body and ETag for /topics/{topic_id}, or None if the topic isn't available."""
+    return _cached(('topic', str(topic_id)), lambda: _render_topic_details(topic_id))
+
+
+def invalidate_catalog(sender=None, **kwargs):
+    """Receiver for topic, subtopic and prerequisite changes; clears once the write commits."""
+    transaction.on_commit(topic_catalog_cache.invalidate)
@@ -1,4 +1,6 @@
 from ninja import Schema
+from datetime import date
+from typing import List
 from users.models import SkillLevelChoices
 
 class CreateUserSchema(Schema):
@@ -60,5 +62,13 @@ class UserProfileResponse(Schema):
     stats: UserStatsResponse
 
 
+class ActivityCalendarResponse(Schema):
+    since: date
+    until: date
+    active_days: List[date]
+    current_streak_days: int
+    longest_streak_days: int
+
+
 class GoogleAuthParams(Schema):
     credential: str  # Google ID token
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from users.models import CustomUser
+from users.utils.stats import rebuild_user_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalized UserStats rollup from the source tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            action='append',
+            dest='emails',
+            default=[],
+            help='Only rebuild stats for the user with this email (can be repeated)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of user ids fetched per batch',
+        )
+
+    def handle(self, *args, **options):
+        users = CustomUser.objects.order_by('id')
+        if options['emails']:
+            users = users.filter(email__in=options['emails'])
+
+        rebuilt = 0
+        for user_id in users.values_list('id', flat=True).iterator(chunk_size=options['batch_size']):
+            rebuild_user_stats(user_id)
+            rebuilt += 1
+            if rebuilt % options['batch_size'] == 0:
+                self.stdout.write(f'Rebuilt stats for {rebuilt} users...')
+
+        self.stdout.write(self.style.SUCCESS(f'Successfully rebuilt stats for {rebuilt} users'))
@@ -0,0 +1,414 @@
+import argparse
+import math
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, time as dt_time, timedelta, timezone as dt_timezone
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from ai_core.models import (
+    Conversation,
+    ConversationTypeChoices,
+    Message,
+    MessageSenderChoices,
+    MessageTypeChoices,
+    Summary,
+)
+from ai_core.utils.message_signals import classify
+from execution.models import CodeExecutionLog
+from learning_paths.models import (
+    DifficultyLevelChoices,
+    LearningSubtopic,
+    LearningTopic,
+    MessageNote,
+    SubtopicProgress,
+    SubtopicProgressChoices,
+    UserLearningPath,
+)
+from users.models import CustomUser, SkillLevelChoices
+from users.utils.stats import rebuild_user_stats
+
+# Insert order; Postgres checks the foreign keys at commit, but keep parents first anyway
+MODELS = (
+    CustomUser,
+    LearningTopic,
+    LearningSubtopic,
+    Conversation,
+    Message,
+    Summary,
+    UserLearningPath,
+    SubtopicProgress,
+    MessageNote,
+    CodeExecutionLog,
+)
+
+
+class Distribution:
+    """
+    An integer distribution given as 'fixed:N', 'uniform:MIN:MAX' or
+    'lognormal:MEDIAN:SIGMA[:MAX]' (long-tailed, like real per-user activity).
+    """
+
+    def __init__(self, spec: str):
+        self.spec = spec
+        kind, *args = spec.split(':')
+        try:
+            values = [float(arg) for arg in args]
+        except ValueError:
+            raise argparse.ArgumentTypeError(f'invalid distribution {spec!r}')
+        if kind == 'fixed' and len(values) == 1:
+            self._sample = lambda rng: values[0]
+            self.mean = values[0]
+        elif kind == 'uniform' and len(values) == 2 and values[0] <= values[1]:
+            self._sample = lambda rng: rng.randint(int(values[0]), int(values[1]))
+            self.mean = sum(values) / 2
+        elif kind == 'lognormal' and len(values) in (2, 3) and values[0] > 0:
+            median, sigma = values[:2]
+            cap = values[2] if len(values) == 3 else math.inf
+            self._sample = lambda rng: min(rng.lognormvariate(math.log(median), sigma), cap)
+            self.mean = min(median * math.exp(sigma ** 2 / 2), cap)
+        else:
+            raise argparse.ArgumentTypeError(
+                f'invalid distribution {spec!r}; use fixed:N, uniform:MIN:MAX or lognormal:MEDIAN:SIGMA[:MAX]'
+            )
+
+    def sample(self, rng: random.Random) -> int:
+        return max(0, round(self._sample(rng)))
+
+    def __str__(self):
+        return self.spec
+
+
+@contextmanager
+def explicit_timestamps():
+    """Keep the timestamps set on the seeded rows instead of letting auto_now(_add) stamp them all with now()."""
+    fields = [
+        field
+        for model in MODELS
+        for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class BatchWriter:
+    """Buffers unsaved rows per model and bulk-inserts them `batch_size` at a time."""
+
+    def __init__(self, batch_size: int):
+        self.batch_size = batch_size
+        self.pending = {model: [] for model in MODELS}
+        self.written = {model: 0 for model in MODELS}
+
+    def add(self, obj):
+        rows = self.pending[type(obj)]
+        rows.append(obj)
+        if len(rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        for model, rows in self.pending.items():
+            if rows:
+                model.objects.bulk_create(rows, batch_size=self.batch_size)
+                self.written[model] += len(rows)
+                rows.clear()
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate deterministic synthetic users, conversations, messages, learning paths, notes and '
+        'execution logs at production-like volumes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42, help='Random seed; the same seed and --until give the same data')
+        parser.add_argument('--prefix', default='seed', help='Seeded users are <prefix>-<n>@example.com')
+        parser.add_argument('--users', type=int, default=1000, help='Users to create')
+        parser.add_argument('--topics', type=int, default=20, help='Learning topics to create')
+        parser.add_argument('--subtopics-per-topic', type=Distribution, default=Distribution('uniform:4:10'))
+        parser.add_argument('--conversations-per-user', type=Distribution, default=Distribution('lognormal:20:1.0:2000'))
+        parser.add_argument('--messages-per-conversation', type=Distribution, default=Distribution('lognormal:12:0.8:500'))
+        parser.add_argument('--paths-per-user', type=Distribution, default=Distribution('uniform:0:4'))
+        parser.add_argument('--messages-per-subtopic', type=Distribution, default=Distribution('lognormal:16:0.7:300'))
+        parser.add_argument('--notes-per-user', type=Distribution, default=Distribution('lognormal:3:1.0:200'))
+        parser.add_argument('--executions-per-user', type=Distribution, default=Distribution('lognormal:25:1.0:3000'))
+        parser.add_argument('--days', type=int, default=365, help='Spread activity over this many days before --until')
+        parser.add_argument('--until', type=datetime.fromisoformat, default=None,
+                            help='Latest timestamp to generate (ISO date, defaults to today); fix it for reproducible runs')
+        parser.add_argument('--password', default='scale-password', help='Password shared by every seeded user')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT')
+        parser.add_argument('--users-per-transaction', type=int, default=100, help='Users seeded per committed transaction')
+        parser.add_argument('--skip-stats', action='store_true', help="Don't rebuild the UserStats rollup afterwards")
+        parser.add_argument('--dry-run', action='store_true', help='Only print the expected row counts')
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.rng = random.Random(options['seed'])
+        until = options['until'] or datetime.combine(timezone.now().date(), dt_time.min)
+        self.until = until if timezone.is_aware(until) else timezone.make_aware(until, dt_timezone.utc)
+        self.since = self.until - timedelta(days=options['days'])
+
+        self._print_estimate()
+        if options['dry_run']:
+            return
+        if CustomUser.objects.filter(email__startswith=f'{options["prefix"]}-').exists():
+            raise CommandError(f'Users with prefix {options["prefix"]!r} already exist; use another --prefix or a fresh database')
+
+        self.password = make_password(options['password'])
+        writer = BatchWriter(options['batch_size'])
+        started = time.monotonic()
+        user_ids = []
+        with explicit_timestamps():
+            with transaction.atomic():
+                self.subtopics = self._seed_topics(writer)
+                writer.flush()
+
+            for first in range(0, options['users'], options['users_per_transaction']):
+                last = min(first + options['users_per_transaction'], options['users'])
+                with transaction.atomic():
+                    for n in range(first, last):
+                        user_ids.append(self._seed_user(writer, n))
+                    writer.flush()
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f'{last}/{options["users"]} users, {writer.written[Message]} messages '
+                    f'({sum(writer.written.values()) / elapsed:,.0f} rows/s)'
+                )
+
+        if not options['skip_stats']:
+            self.stdout.write('Rebuilding UserStats...')
+            for user_id in user_ids:
+                rebuild_user_stats(user_id)
+
+        if connection.vendor == 'postgresql':
+            # fresh planner statistics so EXPLAIN reflects the new volume
+            with connection.cursor() as cursor:
+                for model in MODELS:
+                    cursor.execute(f'ANALYZE {connection.ops.quote_name(model._meta.db_table)}')
+
+        summary = ', '.join(f'{count:,} {model.__name__}' for model, count in writer.written.items())
+        self.stdout.write(self.style.SUCCESS(f'Seeded {summary} in {time.monotonic() - started:.0f}s'))
+
+    def _print_estimate(self):
+        o = self.options
+        conversations = o['users'] * o['conversations_per_user'].mean
+        path_subtopics = o['users'] * o['paths_per_user'].mean * (o['subtopics_per_topic'].mean / 2 + 1)
+        messages = conversations * o['messages_per_conversation'].mean + path_subtopics * o['messages_per_subtopic'].mean
+        self.stdout.write(
+            f'Expecting roughly {o["users"]:,} users, {conversations:,.0f} conversations, {messages:,.0f} messages, '
+            f'{path_subtopics:,.0f} subtopic progress rows, {o["users"] * o["notes_per_user"].mean:,.0f} notes and '
+            f'{o["users"] * o["executions_per_user"].mean:,.0f} execution logs (seed {o["seed"]})'
+        )
+
+    def _uuid(self):
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def _moment(self, after=None):
+        """A random timestamp between `after` (or the start of the window) and --until."""
+        start = after or self.since
+        return start + (self.until - start) * self.rng.random()
+
+    def _seed_topics(self, writer):
+        author = CustomUser(
+            id=self._uuid(),
+            email=f'{self.options["prefix"]}-author@example.com',
+            first_name='Seed',
+            last_name='Author',
+            password=self.password,
+            date_joined=self.since,
+        )
+        writer.add(author)
+
+        subtopics = {}
+        for n in range(self.options['topics']):
+            topic = LearningTopic(
+                id=self._uuid(),
+                name=f'Seeded topic {n}',
+                description=f'Synthetic topic {n} for scale testing',
+                difficulty_level=self.rng.choice(DifficultyLevelChoices.values),
+                estimated_duration=timedelta(hours=self.rng.randint(5, 40)),
+                created_by=author,
+                created_at=self.since,
+                updated_at=self.since,
+            )
+            writer.add(topic)
+            subtopics[topic] = []
+            for order in range(1, max(1, self.options['subtopics_per_topic'].sample(self.rng)) + 1):
+                subtopic = LearningSubtopic(
+                    id=self._uuid(),
+                    topic=topic,
+                    name=f'{topic.name} part {order}',
+                    description=f'Part {order} of {topic.name}',
+                    order=order,
+                    learning_objectives=[f'objective {order}.{i}' for i in range(1, 4)],
+                    estimated_duration=timedelta(hours=1),
+                    created_at=self.since,
+                    updated_at=self.since,
+                )
+                writer.add(subtopic)
+                subtopics[topic].append(subtopic)
+        return subtopics
+
+    def _seed_user(self, writer, n):
+        joined = self._moment()
+        user = CustomUser(
+            id=self._uuid(),
+            email=f'{self.options["prefix"]}-{n}@example.com',
+            first_name='Seed',
+            last_name=str(n),
+            password=self.password,
+            skill_level=self.rng.choice(SkillLevelChoices.values),
+            date_joined=joined,
+        )
+        writer.add(user)
+
+        ai_messages = []
+        for i in range(self.options['conversations_per_user'].sample(self.rng)):
+            conversation = self._conversation(user, joined, f'Seeded conversation {i}')
+            writer.add(conversation)
+            ai_messages += self._messages(writer, conversation, self.options['messages_per_conversation'].sample(self.rng))
+
+        topics = list(self.subtopics)
+        for topic in self.rng.sample(topics, min(len(topics), self.options['paths_per_user'].sample(self.rng))):
+            ai_messages += self._seed_path(writer, user, joined, topic)
+
+        for message in self.rng.sample(ai_messages, min(len(ai_messages), self.options['notes_per_user'].sample(self.rng))):
+            start = self.rng.randint(0, 20)
+            noted_at = self._moment(after=message.created_at)
+            writer.add(MessageNote(
+                id=self._uuid(),
+                message=message,
+                user=user,
+                selection_start=start,
+                selection_end=start + 12,
+                selection_text=message.content[start:start + 12],
+                content='Seeded note',
+                created_at=noted_at,
+                updated_at=noted_at,
+            ))
+
+        for _ in range(self.options['executions_per_user'].sample(self.rng)):
+            success = self.rng.random() < 0.8
+            writer.add(CodeExecutionLog(
+                id=self._uuid(),
+                user=user,
+                language='python' if self.rng.random() < 0.9 else 'javascript',
+                code_length=self.options['messages_per_conversation'].sample(self.rng) * 20 + 10,
+                execution_time_ms=int(self.rng.lognormvariate(math.log(150), 0.8)),
+                success=success,
+                error_type=None if success else self.rng.choice(['SyntaxError', 'NameError', 'TypeError', 'Timeout']),
+                executed_at=self._moment(after=joined),
+            ))
+        return user.id
+
+    def _conversation(self, user, joined, title, conversation_type=ConversationTypeChoices.GENERAL):
+        started = self._moment(after=joined)
+        return Conversation(
+            id=self._uuid(),
+            user=user,
+            title=title,
+            conversation_type=conversation_type,
+            title_generated=True,
+            created_at=started,
+            last_active_at=started,
+        )
+
+    def _messages(self, writer, conversation, count):
+        """Alternate user/AI messages a minute or so apart, plus the current summary; returns the AI messages."""
+        sent_at = conversation.created_at
+        message = None
+        ai_messages = []
+        for i in range(count):
+            sent_at += timedelta(seconds=self.rng.lognormvariate(math.log(60), 1.0))
+            is_user = i % 2 == 0
+            has_code = self.rng.random() < 0.15
+            content = f'Seeded message {i} ' + 'lorem ipsum dolor sit amet ' * self.rng.randint(1, 30)
+            message = Message(
+                id=self._uuid(),
+                conversation=conversation,
+                sender=MessageSenderChoices.USER if is_user else MessageSenderChoices.AI,
+                content=content,
+                code_snippet="print('hello world')" if has_code else None,
+                language='python' if has_code else None,
+                message_type=MessageTypeChoices.CONVERSATION,
+                signals=classify(content) if is_user else None,
+                created_at=sent_at,
+            )
+            writer.add(message)
+            if not is_user:
+                ai_messages.append(message)
+
+        conversation.last_active_at = sent_at
+        if message is not None and count >= 4:
+            writer.add(Summary(
+                id=self._uuid(),
+                conversation=conversation,
+                content='The student is working through the material.',
+                last_message=message,
+                last_updated_at=sent_at,
+            ))
+        return ai_messages
+
+    def _seed_path(self, writer, user, joined, topic):
+        subtopics = self.subtopics[topic]
+        # how far the learner got; len(subtopics) means the path is finished
+        reached = self.rng.randint(0, len(subtopics))
+        path_conversation = self._conversation(
+            user, joined, f'Learning: {topic.name}', ConversationTypeChoices.LEARNING_PATH
+        )
+        writer.add(path_conversation)
+
+        ai_messages = []
+        last_activity = path_conversation.created_at
+        progress_rows = []
+        for subtopic in subtopics[:reached + 1]:
+            conversation = self._conversation(
+                user, joined, f'{topic.name} - {subtopic.name}', ConversationTypeChoices.LEARNING_PATH
+            )
+            writer.add(conversation)
+            ai_messages += self._messages(writer, conversation, self.options['messages_per_subtopic'].sample(self.rng))
+            finished = subtopic.order <= reached
+            attempted = self.rng.randint(0, 8)
+            progress_rows.append(SubtopicProgress(
+                id=self._uuid(),
+                subtopic=subtopic,
+                conversation=conversation,
+                status=(
+                    (SubtopicProgressChoices.SKIPPED if self.rng.random() < 0.1 else SubtopicProgressChoices.COMPLETED)
+                    if finished else SubtopicProgressChoices.LEARNING
+                ),
+                covered_points=subtopic.learning_objectives if finished else subtopic.learning_objectives[:1],
+                remaining_points=[] if finished else subtopic.learning_objectives[1:],
+                ai_confidence=0.9 if finished else round(self.rng.random() * 0.7, 2),
+                started_at=conversation.created_at,
+                completed_at=conversation.last_active_at if finished else None,
+                challenges_attempted=attempted,
+                challenges_completed=self.rng.randint(0, attempted),
+            ))
+            last_activity = max(last_activity, conversation.last_active_at)
+
+        completed = reached == len(subtopics)
+        path = UserLearningPath(
+            id=self._uuid(),
+            user=user,
+            topic=topic,
+            conversation=path_conversation,
+            current_subtopic=None if completed else subtopics[reached],
+            started_at=path_conversation.created_at,
+            completed_at=last_activity if completed else None,
+            updated_at=last_activity,
+        )
+        writer.add(path)
+        for progress in progress_rows:
+            progress.user_path = path
+            writer.add(progress)
+        return ai_messages
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_customuser_auth_provider_customuser_google_id_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_conversations', models.PositiveIntegerField(default=0)),
+                ('messages_sent', models.PositiveIntegerField(default=0)),
+                ('messages_received', models.PositiveIntegerField(default=0)),
+                ('learning_paths_enrolled', models.PositiveIntegerField(default=0)),
+                ('learning_paths_completed', models.PositiveIntegerField(default=0)),
+                ('challenges_completed', models.PositiveIntegerField(default=0)),
+                ('challenges_attempted', models.PositiveIntegerField(default=0)),
+                ('code_executions', models.PositiveIntegerField(default=0)),
+                ('successful_executions', models.PositiveIntegerField(default=0)),
+                ('total_time_spent_seconds', models.PositiveBigIntegerField(default=0)),
+                ('activity_session_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_userstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='activity_bitmap',
+            field=models.BinaryField(default=bytes, help_text='One bit per day since activity_bitmap_start'),
+        ),
+        migrations.AddField(
+            model_name='userstats',
+            name='activity_bitmap_start',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='userstats',
+            name='current_streak_days',
+            field=models.PositiveIntegerField(default=0, help_text='Consecutive active days ending at last_active_date'),
+        ),
+        migrations.AddField(
+            model_name='userstats',
+            name='last_active_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='userstats',
+            name='longest_streak_days',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -2,6 +2,7 @@ from django.db import models
 from django.contrib.auth.models import PermissionsMixin,AbstractBaseUser
 from uuid import uuid4
 from users.managers import CustomUserManager
+from users.utils.activity import decode_days
 
 
 class SkillLevelChoices(models.TextChoices):
@@ -72,4 +73,56 @@ class UserActivitySession(models.Model):
         ]
 
     def __str__(self):
-        return f"{self.user.email} - {self.started_at}"
\ No newline at end of file
+        return f"{self.user.email} - {self.started_at}"
+
+
+class UserStats(models.Model):
+    """
+    Denormalized per-user rollup of the profile statistics.
+    Kept up to date from the write paths (see users.signals) and
+    repairable with the `rebuild_user_stats` management command.
+    """
+    user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    total_conversations = models.PositiveIntegerField(default=0)
+    messages_sent = models.PositiveIntegerField(default=0)
+    messages_received = models.PositiveIntegerField(default=0)
+    learning_paths_enrolled = models.PositiveIntegerField(default=0)
+    learning_paths_completed = models.PositiveIntegerField(default=0)
+    challenges_completed = models.PositiveIntegerField(default=0)
+    challenges_attempted = models.PositiveIntegerField(default=0)
+    code_executions = models.PositiveIntegerField(default=0)
+    successful_executions = models.PositiveIntegerField(default=0)
+    total_time_spent_seconds = models.PositiveBigIntegerField(default=0)
+    activity_session_count = models.PositiveIntegerField(default=0)
+    # Daily activity, see users.utils.activity
+    last_active_date = models.DateField(null=True, blank=True)
+    current_streak_days = models.PositiveIntegerField(
+        default=0, help_text="Consecutive active days ending at last_active_date"
+    )
+    longest_streak_days = models.PositiveIntegerField(default=0)
+    activity_bitmap_start = models.DateField(null=True, blank=True)
+    activity_bitmap = models.BinaryField(default=bytes, help_text="One bit per day since activity_bitmap_start")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Stats for {self.user_id}"
+
+    @property
+    def total_messages(self):
+        return self.messages_sent + self.messages_received
+
+    @property
+    def average_session_duration_seconds(self):
+        if self.activity_session_count == 0:
+            return 0
+        return self.total_time_spent_seconds // self.activity_session_count
+
+    def streak_as_of(self, today):
+        """The streak is still alive if the user was active today or yesterday."""
+        if self.last_active_date is None or (today - self.last_active_date).days > 1:
+            return 0
+        return self.current_streak_days
+
+    def active_days(self, since=None, until=None):
+        """Active dates in [since, until] for calendar heatmaps."""
+        return decode_days(self.activity_bitmap_start, bytes(self.activity_bitmap), since, until)
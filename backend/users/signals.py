@@ -0,0 +1,258 @@
+"""
+Keep the UserStats rollup in sync with the write paths.
+
+Counters are applied as deltas with a single UPDATE per write. Models whose
+counted fields change in place (progress, learning paths, activity sessions)
+snapshot those fields on load so the save handler can work out the delta.
+Bulk operations (bulk_create, queryset.update) bypass signals; run
+`manage.py rebuild_user_stats` after those.
+
+Messages have no delete receiver here: a conversation takes its message
+counts off in its own pre_delete UPDATE, so deleting it costs the same
+queries however many messages it has. A learning path does the same for its
+progress rows. Rows deleted because their user is being deleted are
+skipped, the rollup row goes with the user.
+"""
+from django.db.models import Count, QuerySet, Sum
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete
+from django.utils import timezone
+from users.models import CustomUser, UserActivitySession, UserStats
+from users.utils.stats import (
+    increment_user_stats,
+    record_activity,
+    refresh_activity_stats,
+    refresh_learning_stats,
+    subquery_total,
+    subtract_user_stats,
+)
+from users.utils.user_cache import invalidate_user
+
+
+def _snapshot(instance, fields):
+    """Remember the loaded values of `fields`, or None if any of them is deferred."""
+    if instance.get_deferred_fields() & set(fields):
+        return None
+    return {field: getattr(instance, field) for field in fields}
+
+
+def _deleted_with(origin, *models) -> bool:
+    """Whether the delete() that reached this row was called on one of `models` (instance or queryset)."""
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return issubclass(model, models)
+
+
+def _related_user_id(instance, relation, related_model):
+    """The user behind `instance.<relation>`, without loading the related row unless it already is."""
+    descriptor = getattr(type(instance), relation)
+    if descriptor.is_cached(instance):
+        return getattr(instance, relation).user_id
+    return (
+        related_model.objects.filter(pk=getattr(instance, f'{relation}_id'))
+        .values_list('user_id', flat=True)
+        .first()
+    )
+
+
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+def conversation_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        increment_user_stats(instance.user_id, total_conversations=1)
+
+
+def conversation_deleting(sender, instance, origin=None, **kwargs):
+    from ai_core.models import Message, MessageSenderChoices
+
+    if _deleted_with(origin, CustomUser):
+        return
+    messages = Message.objects.filter(conversation_id=instance.id)
+    subtract_user_stats(
+        instance.user_id,
+        total_conversations=1,
+        messages_sent=subquery_total(messages.filter(sender=MessageSenderChoices.USER), Count('id')),
+        messages_received=subquery_total(messages.filter(sender=MessageSenderChoices.AI), Count('id')),
+    )
+
+
+def _message_counter(message):
+    from ai_core.models import MessageSenderChoices
+
+    if message.sender == MessageSenderChoices.USER:
+        return 'messages_sent'
+    if message.sender == MessageSenderChoices.AI:
+        return 'messages_received'
+    return None
+
+
+def message_saved(sender, instance, created, raw=False, **kwargs):
+    from ai_core.models import Conversation
+
+    counter = _message_counter(instance)
+    if created and not raw and counter:
+        increment_user_stats(_related_user_id(instance, 'conversation', Conversation), **{counter: 1})
+
+
+def execution_logged(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        increment_user_stats(
+            instance.user_id,
+            code_executions=1,
+            successful_executions=1 if instance.success else 0,
+        )
+
+
+def execution_deleted(sender, instance, origin=None, **kwargs):
+    if _deleted_with(origin, CustomUser):
+        return
+    increment_user_stats(
+        instance.user_id,
+        create_missing=False,
+        code_executions=-1,
+        successful_executions=-1 if instance.success else 0,
+    )
+
+
+PATH_FIELDS = ('completed_at',)
+
+
+def learning_path_loaded(sender, instance, **kwargs):
+    instance._stats_snapshot = _snapshot(instance, PATH_FIELDS)
+
+
+def learning_path_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    was_completed = None
+    if not created:
+        snapshot = getattr(instance, '_stats_snapshot', None)
+        if snapshot is None:
+            refresh_learning_stats(instance.user_id)
+            instance._stats_snapshot = _snapshot(instance, PATH_FIELDS)
+            return
+        was_completed = snapshot['completed_at'] is not None
+
+    is_completed = instance.completed_at is not None
+    deltas = {'learning_paths_enrolled': 1} if created else {}
+    if is_completed != bool(was_completed):
+        deltas['learning_paths_completed'] = 1 if is_completed else -1
+    if deltas:
+        increment_user_stats(instance.user_id, **deltas)
+    instance._stats_snapshot = _snapshot(instance, PATH_FIELDS)
+
+
+def learning_path_deleting(sender, instance, origin=None, **kwargs):
+    from learning_paths.models import SubtopicProgress
+
+    if _deleted_with(origin, CustomUser):
+        return
+    progress = SubtopicProgress.objects.filter(user_path_id=instance.id)
+    subtract_user_stats(
+        instance.user_id,
+        learning_paths_enrolled=1,
+        learning_paths_completed=1 if instance.completed_at else 0,
+        challenges_completed=subquery_total(progress, Sum('challenges_completed')),
+        challenges_attempted=subquery_total(progress, Sum('challenges_attempted')),
+    )
+
+
+PROGRESS_FIELDS = ('challenges_completed', 'challenges_attempted')
+
+
+def progress_loaded(sender, instance, **kwargs):
+    instance._stats_snapshot = _snapshot(instance, PROGRESS_FIELDS)
+
+
+def progress_saved(sender, instance, created, raw=False, **kwargs):
+    from learning_paths.models import UserLearningPath
+
+    if raw:
+        return
+    user_id = _related_user_id(instance, 'user_path', UserLearningPath)
+    snapshot = {field: 0 for field in PROGRESS_FIELDS} if created else getattr(instance, '_stats_snapshot', None)
+    if snapshot is None:
+        refresh_learning_stats(user_id)
+    else:
+        deltas = {
+            field: getattr(instance, field) - snapshot[field]
+            for field in PROGRESS_FIELDS
+            if getattr(instance, field) != snapshot[field]
+        }
+        if deltas:
+            increment_user_stats(user_id, **deltas)
+    instance._stats_snapshot = _snapshot(instance, PROGRESS_FIELDS)
+
+
+def progress_deleted(sender, instance, origin=None, **kwargs):
+    from learning_paths.models import UserLearningPath
+
+    # a deleted path has already taken its progress off
+    if _deleted_with(origin, CustomUser, UserLearningPath):
+        return
+    user_id = _related_user_id(instance, 'user_path', UserLearningPath)
+    if user_id is not None:
+        refresh_learning_stats(user_id, create_missing=False)
+
+
+SESSION_FIELDS = ('duration_seconds',)
+
+
+def activity_session_loaded(sender, instance, **kwargs):
+    instance._stats_snapshot = _snapshot(instance, SESSION_FIELDS)
+
+
+def activity_session_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    snapshot = {'duration_seconds': 0} if created else getattr(instance, '_stats_snapshot', None)
+    if snapshot is None:
+        refresh_activity_stats(instance.user_id)
+    else:
+        deltas = {'activity_session_count': 1} if created else {}
+        duration_delta = instance.duration_seconds - snapshot['duration_seconds']
+        if duration_delta:
+            deltas['total_time_spent_seconds'] = duration_delta
+        if deltas:
+            increment_user_stats(instance.user_id, **deltas)
+    # both ends, like the rebuild, so a session running past midnight marks both days
+    for day in sorted({timezone.localdate(value) for value in (instance.started_at, instance.last_activity_at) if value}):
+        record_activity(instance.user_id, day)
+    instance._stats_snapshot = _snapshot(instance, SESSION_FIELDS)
+
+
+def activity_session_deleted(sender, instance, origin=None, **kwargs):
+    if _deleted_with(origin, CustomUser):
+        return
+    increment_user_stats(
+        instance.user_id,
+        create_missing=False,
+        activity_session_count=-1,
+        total_time_spent_seconds=-instance.duration_seconds,
+    )
+
+
+def connect_signals():
+    """Called from UsersConfig.ready(); senders are lazy so app load order doesn't matter."""
+    post_save.connect(create_user_stats, sender=CustomUser)
+    post_save.connect(invalidate_user, sender=CustomUser)
+    post_delete.connect(invalidate_user, sender=CustomUser)
+
+    post_save.connect(conversation_saved, sender='ai_core.Conversation')
+    pre_delete.connect(conversation_deleting, sender='ai_core.Conversation')
+    post_save.connect(message_saved, sender='ai_core.Message')
+
+    post_save.connect(execution_logged, sender='execution.CodeExecutionLog')
+    post_delete.connect(execution_deleted, sender='execution.CodeExecutionLog')
+
+    post_init.connect(learning_path_loaded, sender='learning_paths.UserLearningPath')
+    post_save.connect(learning_path_saved, sender='learning_paths.UserLearningPath')
+    pre_delete.connect(learning_path_deleting, sender='learning_paths.UserLearningPath')
+    post_init.connect(progress_loaded, sender='learning_paths.SubtopicProgress')
+    post_save.connect(progress_saved, sender='learning_paths.SubtopicProgress')
+    post_delete.connect(progress_deleted, sender='learning_paths.SubtopicProgress')
+
+    post_init.connect(activity_session_loaded, sender=UserActivitySession)
+    post_save.connect(activity_session_saved, sender=UserActivitySession)
+    post_delete.connect(activity_session_deleted, sender=UserActivitySession)
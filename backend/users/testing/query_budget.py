@@ -0,0 +1,166 @@
+import json
+import math
+import os
+import time
+from datetime import date
+from pathlib import Path
+from django.conf import settings
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from ai_core.utils.context_cache import context_cache
+from learning_paths.utils.subtopic_order import subtopic_order_cache
+from learning_paths.utils.topic_catalog import topic_catalog_cache
+from users.utils.auth import create_jwt
+from users.utils.rate_limit import rate_limiter
+from users.testing.scale_data import ScaleDataFactory
+from users.utils.user_cache import user_cache
+
+# Per-endpoint query and latency budgets for the REST layer, checked in at
+# backend/query_budgets.json. Tests measure each endpoint with the in-process
+# caches cold, so the counts are what a fresh worker pays.
+#
+#   QUERY_BUDGET_UPDATE=1          rewrite the budgets from the measurements
+#   QUERY_BUDGET_REPORT=<path>     also write every measurement to <path> as JSON
+#   QUERY_BUDGET_LATENCY_FACTOR=n  also check latency, against the budgets scaled by n
+#
+# Only query counts are asserted by default: wall time depends on the machine
+# and on whatever else the suite is doing, so latency is recorded in the
+# report and checked only on request (e.g. on a quiet benchmark host).
+#
+# The checked-in file is generated, never hand-edited: run the budget test
+# classes against Postgres with
+#
+#   QUERY_BUDGET_UPDATE=1 python manage.py test ai_core execution learning_paths users
+#
+# Query budgets are the measured counts; latency budgets are the measured time
+# with LATENCY_HEADROOM, rounded up to 50ms and never under MIN_LATENCY_MS.
+# The "_generated" entry records the command, database and date of the run.
+QUERY_BUDGETS_PATH = Path(settings.BASE_DIR) / 'query_budgets.json'
+UPDATE_COMMAND = 'QUERY_BUDGET_UPDATE=1 python manage.py test ai_core execution learning_paths users'
+LATENCY_HEADROOM = 4
+MIN_LATENCY_MS = 100
+
+# Only present because tests run inside a transaction; production requests don't issue them
+TRANSACTION_CONTROL = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+_measurements = {}
+
+
+def load_budgets() -> dict:
+    with open(QUERY_BUDGETS_PATH) as f:
+        return json.load(f)
+
+
+def reset_caches() -> None:
+    """Empty every in-process cache that can hide queries from a measurement."""
+    user_cache.clear()
+    context_cache.clear()
+    subtopic_order_cache.clear()
+    topic_catalog_cache.invalidate()
+    # not a cache, but a class full of requests from one user would trip it
+    rate_limiter.reset()
+
+
+def latency_budget(measured_ms: float) -> int:
+    """A latency budget with headroom for the measured time of a request."""
+    return max(MIN_LATENCY_MS, math.ceil(measured_ms * LATENCY_HEADROOM / 50) * 50)
+
+
+def _save_measurements() -> None:
+    if os.getenv('QUERY_BUDGET_UPDATE'):
+        budgets = load_budgets()
+        for name, measured in _measurements.items():
+            budgets[name] = {'queries': measured['queries'], 'latency_ms': latency_budget(measured['latency_ms'])}
+        major, minor = divmod(connection.pg_version, 10000) if connection.vendor == 'postgresql' else (None, None)
+        budgets['_generated'] = {
+            'command': UPDATE_COMMAND,
+            'database': f'PostgreSQL {major}.{minor}' if major else connection.vendor,
+            'date': date.today().isoformat(),
+        }
+        with open(QUERY_BUDGETS_PATH, 'w') as f:
+            json.dump(dict(sorted(budgets.items())), f, indent=2)
+            f.write('\n')
+
+    report_path = os.getenv('QUERY_BUDGET_REPORT')
+    if report_path:
+        report = {}
+        if os.path.exists(report_path):
+            with open(report_path) as f:
+                report = json.load(f)
+        report.update(_measurements)
+        with open(report_path, 'w') as f:
+            json.dump(dict(sorted(report.items())), f, indent=2)
+
+
+class QueryBudgetTestCase(TestCase):
+    """
+    Base class for holding endpoints to their budgets.
+
+    With `scale_data_prefix` set, the class is seeded once with
+    ScaleDataFactory volumes under that prefix: the rows are in `cls.data` and
+    the first seeded user is `cls.user`. Extend setUpTestData (calling super)
+    to pick out the rows a test needs.
+
+    `self.assert_within_budget(name, method, path, user=...)` issues the
+    request with cold caches, counts its queries (savepoints excluded) and
+    times it, and fails if the count is over query_budgets.json[name] (or the
+    time, when QUERY_BUDGET_LATENCY_FACTOR is set).
+    """
+
+    scale_data_prefix = None
+    budgets = None
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.budgets = load_budgets()
+
+    @classmethod
+    def setUpTestData(cls):
+        if cls.scale_data_prefix:
+            cls.data = ScaleDataFactory(prefix=cls.scale_data_prefix).build()
+            cls.user = cls.data['users'][0]
+
+    @classmethod
+    def tearDownClass(cls):
+        _save_measurements()
+        super().tearDownClass()
+
+    def request(self, method: str, path: str, user=None, data=None, **headers):
+        if user is not None:
+            headers['HTTP_AUTHORIZATION'] = f'Bearer {create_jwt(user.id, "access")}'
+        if data is not None:
+            return getattr(self.client, method)(path, data=json.dumps(data), content_type='application/json', **headers)
+        return getattr(self.client, method)(path, **headers)
+
+    def assert_within_budget(self, name: str, method: str, path: str, user=None, data=None, cold: bool = True,
+                             expected_status: int = 200, **headers):
+        """Run one request against its budget and return the response."""
+        if cold:
+            reset_caches()
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter()
+            response = self.request(method, path, user=user, data=data, **headers)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+        self.assertEqual(response.status_code, expected_status, f'{name}: {response.content[:500]!r}')
+        queries = [query['sql'] for query in context.captured_queries if not query['sql'].startswith(TRANSACTION_CONTROL)]
+        _measurements[name] = {'queries': len(queries), 'latency_ms': round(elapsed_ms, 1)}
+
+        budget = self.budgets.get(name)
+        self.assertIsNotNone(budget, f'No budget for {name} in {QUERY_BUDGETS_PATH.name}')
+        if not os.getenv('QUERY_BUDGET_UPDATE'):
+            self.assertLessEqual(
+                len(queries),
+                budget['queries'],
+                f'{name} ran {len(queries)} queries (budget {budget["queries"]}):\n' + '\n'.join(queries),
+            )
+        latency_factor = float(os.getenv('QUERY_BUDGET_LATENCY_FACTOR') or 0)
+        if latency_factor and not os.getenv('QUERY_BUDGET_UPDATE'):
+            self.assertLessEqual(
+                elapsed_ms,
+                budget['latency_ms'] * latency_factor,
+                f'{name} took {elapsed_ms:.0f}ms (budget {budget["latency_ms"]}ms)',
+            )
+        return response
@@ -0,0 +1,259 @@
+from datetime import timedelta
+from django.db import transaction
+from ai_core.models import (
+    Conversation,
+    ConversationTypeChoices,
+    Message,
+    MessageSenderChoices,
+    MessageTypeChoices,
+    Summary,
+)
+from learning_paths.models import (
+    ExploreBranch,
+    LearningSubtopic,
+    LearningTopic,
+    MessageNote,
+    SubtopicProgress,
+    SubtopicProgressChoices,
+    UserLearningPath,
+)
+from learning_paths.utils.subtopic_order import subtopic_order_cache
+from learning_paths.utils.topic_catalog import topic_catalog_cache
+from users.models import CustomUser
+from users.utils.stats import rebuild_user_stats
+
+# Seeds production-like volumes for query-budget tests and local load testing.
+# Everything is written with bulk_create, which skips the signals that keep the
+# UserStats rollup and the in-process caches fresh, so build() rebuilds and
+# invalidates those itself once the rows exist.
+
+
+class ScaleDataFactory:
+    """
+    Builds `users` users, each with `conversations_per_user` general
+    conversations of `messages_per_conversation` messages (plus a current
+    summary), enrolled in every one of `topics` topics with progress and a
+    tutoring conversation on every subtopic up to the current one, and with
+    notes and explore branches on their learning-path messages.
+    """
+
+    def __init__(
+        self,
+        prefix: str = 'scale',
+        users: int = 3,
+        conversations_per_user: int = 200,
+        messages_per_conversation: int = 10,
+        topics: int = 3,
+        subtopics_per_topic: int = 5,
+        messages_per_subtopic: int = 20,
+        notes_per_user: int = 30,
+        branches_per_user: int = 5,
+        batch_size: int = 5000,
+    ):
+        self.prefix = prefix
+        self.users = users
+        self.conversations_per_user = conversations_per_user
+        self.messages_per_conversation = messages_per_conversation
+        self.topics = topics
+        self.subtopics_per_topic = subtopics_per_topic
+        self.messages_per_subtopic = messages_per_subtopic
+        self.notes_per_user = notes_per_user
+        self.branches_per_user = branches_per_user
+        self.batch_size = batch_size
+
+    def build(self) -> dict:
+        """Seed everything in one transaction; returns the created rows keyed by kind."""
+        with transaction.atomic():
+            users = CustomUser.objects.bulk_create([
+                CustomUser(email=f'{self.prefix}-{i}@example.com', first_name='Scale', last_name=str(i), password='!')
+                for i in range(self.users)
+            ], batch_size=self.batch_size)
+            topics, subtopics = self._create_topics(users[0])
+            conversations, messages = self._create_conversations(users)
+            paths, progress, path_messages = self._create_learning_paths(users, topics, subtopics)
+            notes, branches = self._create_highlights(users, path_messages)
+
+        for user in users:
+            rebuild_user_stats(user.id)
+        for topic in topics:
+            subtopic_order_cache.invalidate(topic.id)
+        topic_catalog_cache.invalidate()
+
+        return {
+            'users': users,
+            'topics': topics,
+            'subtopics': subtopics,
+            'conversations': conversations,
+            'messages': messages,
+            'paths': paths,
+            'progress': progress,
+            'notes': notes,
+            'branches': branches,
+        }
+
+    def _create_topics(self, author):
+        topics = LearningTopic.objects.bulk_create([
+            LearningTopic(
+                name=f'{self.prefix} topic {i}',
+                description=f'Seeded topic {i}',
+                estimated_duration=timedelta(hours=self.subtopics_per_topic),
+                created_by=author,
+            )
+            for i in range(self.topics)
+        ])
+        # every topic after the first requires the one before it
+        for previous, topic in zip(topics, topics[1:]):
+            topic.prerequisites.add(previous)
+
+        subtopics = {
+            topic.id: LearningSubtopic.objects.bulk_create([
+                LearningSubtopic(
+                    topic=topic,
+                    name=f'{topic.name} part {order}',
+                    description=f'Part {order} of {topic.name}',
+                    order=order,
+                    learning_objectives=[f'objective {order}.{n}' for n in range(1, 4)],
+                    estimated_duration=timedelta(hours=1),
+                )
+                for order in range(1, self.subtopics_per_topic + 1)
+            ])
+            for topic in topics
+        }
+        return topics, subtopics
+
+    def _create_messages(self, conversations, count):
+        messages = Message.objects.bulk_create(
+            (
+                Message(
+                    conversation=conversation,
+                    sender=MessageSenderChoices.USER if i % 2 == 0 else MessageSenderChoices.AI,
+                    content=f'Seeded message {i} ' + 'lorem ipsum ' * 20,
+                    code_snippet="print('hello')" if i % 5 == 4 else None,
+                    language='python' if i % 5 == 4 else None,
+                    message_type=MessageTypeChoices.CONVERSATION,
+                )
+                for conversation in conversations
+                for i in range(count)
+            ),
+            batch_size=self.batch_size,
+        )
+        Summary.objects.bulk_create(
+            (Summary(conversation=conversation, content='The student is working through the material.')
+             for conversation in conversations),
+            batch_size=self.batch_size,
+        )
+        return messages
+
+    def _create_conversations(self, users):
+        conversations = Conversation.objects.bulk_create(
+            (
+                Conversation(user=user, title=f'Seeded conversation {i}', title_generated=True)
+                for user in users
+                for i in range(self.conversations_per_user)
+            ),
+            batch_size=self.batch_size,
+        )
+        return conversations, self._create_messages(conversations, self.messages_per_conversation)
+
+    def _create_learning_paths(self, users, topics, subtopics):
+        # halfway through each topic: earlier subtopics completed, the current one in progress
+        current_index = self.subtopics_per_topic // 2
+        paths = UserLearningPath.objects.bulk_create([
+            UserLearningPath(
+                user=user,
+                topic=topic,
+                conversation=conversation,
+                current_subtopic=subtopics[topic.id][current_index],
+            )
+            for user, topic, conversation in self._with_conversations(
+                [(user, topic) for user in users for topic in topics],
+                lambda user, topic: Conversation(
+                    user=user,
+                    title=f'Learning: {topic.name}',
+                    conversation_type=ConversationTypeChoices.LEARNING_PATH,
+                    title_generated=True,
+                ),
+            )
+        ])
+
+        started = [(path, subtopic) for path in paths for subtopic in subtopics[path.topic_id][:current_index + 1]]
+        started_with_conversations = list(self._with_conversations(
+            started,
+            lambda path, subtopic: Conversation(
+                user_id=path.user_id,
+                title=f'{path.topic.name} - {subtopic.name}',
+                conversation_type=ConversationTypeChoices.LEARNING_PATH,
+                title_generated=True,
+            ),
+        ))
+        progress = SubtopicProgress.objects.bulk_create(
+            [
+                SubtopicProgress(
+                    user_path=path,
+                    subtopic=subtopic,
+                    conversation=conversation,
+                    status=SubtopicProgressChoices.COMPLETED if subtopic.order <= current_index else SubtopicProgressChoices.LEARNING,
+                    covered_points=subtopic.learning_objectives[:2],
+                    remaining_points=subtopic.learning_objectives[2:],
+                    ai_confidence=0.6,
+                    challenges_attempted=4,
+                    challenges_completed=3,
+                    notes='Seeded progress',
+                )
+                for path, subtopic, conversation in started_with_conversations
+            ]
+            + [
+                SubtopicProgress(user_path=path, subtopic=subtopic, remaining_points=subtopic.learning_objectives)
+                for path in paths
+                for subtopic in subtopics[path.topic_id][current_index + 1:]
+            ],
+            batch_size=self.batch_size,
+        )
+        path_messages = self._create_messages(
+            [conversation for _, _, conversation in started_with_conversations],
+            self.messages_per_subtopic,
+        )
+        return paths, progress, path_messages
+
+    def _with_conversations(self, pairs, make_conversation):
+        """Bulk-create one conversation per (a, b) pair and yield (a, b, conversation)."""
+        conversations = Conversation.objects.bulk_create(
+            [make_conversation(a, b) for a, b in pairs],
+            batch_size=self.batch_size,
+        )
+        for (a, b), conversation in zip(pairs, conversations):
+            yield a, b, conversation
+
+    def _create_highlights(self, users, path_messages):
+        by_user = {}
+        for message in path_messages:
+            if message.sender == MessageSenderChoices.AI:
+                by_user.setdefault(message.conversation.user_id, []).append(message)
+
+        notes, branches = [], []
+        for user in users:
+            messages = by_user.get(user.id, [])
+            for message in messages[:self.notes_per_user]:
+                notes.append(MessageNote(
+                    message=message,
+                    user=user,
+                    selection_start=0,
+                    selection_end=12,
+                    selection_text='Seeded messa',
+                    content='Remember this',
+                ))
+            for message in messages[:self.branches_per_user]:
+                branches.append(ExploreBranch(
+                    message=message,
+                    user=user,
+                    selection_start=0,
+                    selection_end=12,
+                    selection_text='Seeded messa',
+                    branch_conversation=Conversation(user=user, title='Explore: Seeded messa', title_generated=True),
+                ))
+
+        Conversation.objects.bulk_create([branch.branch_conversation for branch in branches], batch_size=self.batch_size)
+        return (
+            MessageNote.objects.bulk_create(notes, batch_size=self.batch_size),
+            ExploreBranch.objects.bulk_create(branches, batch_size=self.batch_size),
+        )
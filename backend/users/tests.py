@@ -1,3 +1,401 @@
-from django.test import TestCase
+import ipaddress
+from datetime import date, timedelta
+from unittest import mock
+from uuid import uuid4
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from fakeredis import FakeRedis
+from ai_core.models import Conversation, Message, MessageSenderChoices
+from learning_paths.models import LearningSubtopic, LearningTopic, SubtopicProgress, UserLearningPath
+from users.models import CustomUser, RefreshToken, UserActivitySession, UserStats
+from users.utils import metrics
+from users.utils.activity import add_day, decode_days, encode_days, longest_streak, trailing_streak
+from users.utils.auth import create_jwt
+from users.utils import rate_limit
+from users.utils.rate_limit import _REDIS_SCRIPT, RateLimiter, client_identity, parse_rate
+from users.testing.query_budget import QueryBudgetTestCase
+from users.utils.stats import compute_user_stats, rebuild_user_stats, record_activity
+from users.utils.user_cache import UserCache, get_active_user, user_cache
 
-# Create your tests here.
+
+class UserEndpointQueryBudgetTests(QueryBudgetTestCase):
+    PASSWORD = 'correct horse battery staple'
+    scale_data_prefix = 'users-budget'
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.login_user = CustomUser.objects.create_user(
+            email='budget-login@example.com', password=cls.PASSWORD, first_name='Budget', last_name='Login'
+        )
+
+    def _refresh_token(self):
+        jti = str(uuid4())
+        token = create_jwt(self.login_user.id, 'refresh', jti)
+        RefreshToken.objects.create(jti=jti, user=self.login_user, expires_at=timezone.now() + timedelta(days=30))
+        return token
+
+    def test_login(self):
+        self.assert_within_budget(
+            'users.login', 'post', '/api/users/login',
+            data={'email': self.login_user.email, 'password': self.PASSWORD},
+        )
+
+    def test_refresh(self):
+        self.client.cookies['refresh_token'] = self._refresh_token()
+        self.assert_within_budget('users.refresh', 'post', '/api/users/refresh')
+
+    def test_logout(self):
+        self.assert_within_budget('users.logout', 'post', '/api/users/logout', data={'refresh_token': self._refresh_token()})
+
+    def test_create_user(self):
+        self.assert_within_budget(
+            'users.create_user', 'post', '/api/users/create-user',
+            data={
+                'email': 'budget-new@example.com',
+                'first_name': 'Budget',
+                'last_name': 'New',
+                'password': self.PASSWORD,
+                'skill_level': 'beginner',
+            },
+        )
+
+    def test_profile(self):
+        response = self.assert_within_budget('users.profile', 'get', '/api/users/profile', user=self.user)
+        self.assertEqual(response.json()['stats']['total_conversations'], 200 + 3 + 3 * 3 + 5)
+
+    def test_activity_calendar(self):
+        self.assert_within_budget('users.activity_calendar', 'get', '/api/users/activity-calendar', user=self.user)
+
+
+class MetricsTests(SimpleTestCase):
+    def setUp(self):
+        metrics.reset_metrics()
+
+    def test_histogram_renders_cumulative_buckets(self):
+        histogram = metrics.CHAT_STAGE_SECONDS
+        histogram.observe(0.003, consumer='chat', stage='llm')
+        histogram.observe(0.2, consumer='chat', stage='llm')
+        histogram.observe(120, consumer='chat', stage='llm')
+
+        lines = metrics.render_metrics().splitlines()
+        self.assertIn('chat_stage_seconds_bucket{consumer="chat",stage="llm",le="0.005"} 1', lines)
+        self.assertIn('chat_stage_seconds_bucket{consumer="chat",stage="llm",le="0.25"} 2', lines)
+        self.assertIn('chat_stage_seconds_bucket{consumer="chat",stage="llm",le="+Inf"} 3', lines)
+        self.assertIn('chat_stage_seconds_count{consumer="chat",stage="llm"} 3', lines)
+
+    def test_track_llm_call_counts_errors(self):
+        with self.assertRaises(RuntimeError), metrics.track_llm_call('title'):
+            raise RuntimeError('quota exceeded')
+        with metrics.track_llm_call('title'):
+            pass
+
+        self.assertEqual(metrics.LLM_CALLS.value(call='title', outcome='error'), 1)
+        self.assertEqual(metrics.LLM_CALLS.value(call='title', outcome='ok'), 1)
+        self.assertEqual(metrics.LLM_CALL_SECONDS.count(call='title'), 2)
+
+    def test_metrics_endpoint_checks_token(self):
+        with mock.patch.object(metrics, 'METRICS_TOKEN', 'scrape-secret'):
+            self.assertEqual(self.client.get('/metrics').status_code, 401)
+            response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'# TYPE http_request_seconds histogram', response.content)
+
+
+class RateLimiterTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 1000.0
+        clock = mock.patch('users.utils.rate_limit.time.monotonic', side_effect=lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+        self.limiter = RateLimiter({'llm_turn': ['3/m', '2/s']}, store='memory')
+
+    def test_every_rate_must_have_a_token(self):
+        self.assertEqual(self.limiter.hit('llm_turn', 'user:1'), 0)
+        self.assertEqual(self.limiter.hit('llm_turn', 'user:1'), 0)
+        # the per-second bucket is empty; it refills at 2 tokens/s
+        self.assertAlmostEqual(self.limiter.hit('llm_turn', 'user:1'), 0.5)
+
+        self.now += 1
+        self.assertEqual(self.limiter.hit('llm_turn', 'user:1'), 0)
+        # the per-minute bucket is spent now, and refused hits didn't take a token
+        self.assertAlmostEqual(self.limiter.hit('llm_turn', 'user:1'), 19.0)
+
+    def test_identities_and_unknown_scopes_are_independent(self):
+        for _ in range(2):
+            self.limiter.hit('llm_turn', 'user:1')
+        self.assertEqual(self.limiter.hit('llm_turn', 'user:2'), 0)
+        self.assertEqual(self.limiter.hit('code_run', 'user:1'), 0)
+
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate('120/m'), (120, 2.0))
+        with self.assertRaises(ValueError):
+            parse_rate('10/week')
+
+    def test_refused_scope_spends_nothing_from_the_others(self):
+        limiter = RateLimiter({'default': ['3/m'], 'code_run': ['1/m']}, store='memory')
+        self.assertEqual(limiter.hit_all(('code_run', 'default'), 'ip:1'), 0)
+        for _ in range(3):
+            self.assertTrue(limiter.hit_all(('code_run', 'default'), 'ip:1'))
+        # only the first request took a token from "default"
+        self.assertEqual(limiter.hit('default', 'ip:1'), 0)
+        self.assertEqual(limiter.hit('default', 'ip:1'), 0)
+        self.assertTrue(limiter.hit('default', 'ip:1'))
+
+    def test_redis_store_checks_every_scope_first(self):
+        limiter = RateLimiter({'default': ['3/m'], 'code_run': ['1/m']}, store='redis')
+        limiter._redis = FakeRedis()
+        limiter._script = limiter._redis.register_script(_REDIS_SCRIPT)
+        self.assertEqual(limiter.hit_all(('code_run', 'default'), 'ip:1'), 0)
+        self.assertAlmostEqual(limiter.hit_all(('code_run', 'default'), 'ip:1'), 60, delta=1)
+        self.assertEqual(limiter.hit('default', 'ip:1'), 0)
+        self.assertEqual(limiter.hit('default', 'ip:1'), 0)
+        self.assertTrue(limiter.hit('default', 'ip:1'))
+
+
+class ClientIdentityTests(SimpleTestCase):
+    def request(self, remote_addr, **headers):
+        return RequestFactory().get('/', REMOTE_ADDR=remote_addr, **headers)
+
+    def test_forwarding_headers_are_ignored_without_a_trusted_proxy(self):
+        request = self.request('203.0.113.5', HTTP_X_REAL_IP='198.51.100.1', HTTP_X_FORWARDED_FOR='198.51.100.2')
+        self.assertEqual(client_identity(request), 'ip:203.0.113.5')
+
+    def test_trusted_proxy_supplies_the_client_address(self):
+        with mock.patch.object(rate_limit, 'RATE_LIMIT_TRUSTED_PROXIES', (ipaddress.ip_network('172.28.0.0/24'),)):
+            self.assertEqual(
+                client_identity(self.request('172.28.0.10', HTTP_X_REAL_IP='198.51.100.1')), 'ip:198.51.100.1'
+            )
+            # anyone else's header is still ignored
+            self.assertEqual(
+                client_identity(self.request('203.0.113.5', HTTP_X_REAL_IP='198.51.100.1')), 'ip:203.0.113.5'
+            )
+
+
+class UserStatsRollupTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email='rollup@example.com', password='password', first_name='Roll', last_name='Up'
+        )
+
+    def stats(self):
+        return UserStats.objects.get(user=self.user)
+
+    def conversation(self, user_messages=1, ai_messages=1):
+        conversation = Conversation.objects.create(user=self.user, title='Rollup')
+        for sender, count in ((MessageSenderChoices.USER, user_messages), (MessageSenderChoices.AI, ai_messages)):
+            for _ in range(count):
+                Message.objects.create(conversation=conversation, sender=sender, content='hello')
+        return conversation
+
+    def learning_path(self):
+        topic = LearningTopic.objects.create(
+            name='Rollups', description='Rollups', estimated_duration=timedelta(hours=1), created_by=self.user
+        )
+        subtopic = LearningSubtopic.objects.create(
+            topic=topic, name='Counting', description='Counting', order=1, estimated_duration=timedelta(hours=1)
+        )
+        path = UserLearningPath.objects.create(
+            user=self.user,
+            topic=topic,
+            current_subtopic=subtopic,
+            conversation=Conversation.objects.create(user=self.user, title='Learning: Rollups'),
+        )
+        return path, SubtopicProgress.objects.create(user_path=path, subtopic=subtopic)
+
+    def assert_matches_rebuild(self):
+        stats = self.stats()
+        for field, value in compute_user_stats(self.user.id).items():
+            self.assertEqual(getattr(stats, field), value, field)
+
+    def test_writes_increment_counters(self):
+        self.conversation(user_messages=2, ai_messages=3)
+        # a message whose conversation isn't loaded resolves its user without fetching the row
+        conversation_id = Conversation.objects.values_list('id', flat=True).get()
+        with self.assertNumQueries(3):
+            Message.objects.create(conversation_id=conversation_id, sender=MessageSenderChoices.USER, content='hi')
+
+        path, progress = self.learning_path()
+        progress = SubtopicProgress.objects.get(id=progress.id)
+        progress.challenges_attempted = 4
+        progress.challenges_completed = 3
+        progress.save()
+        path.completed_at = timezone.now()
+        path.save()
+
+        stats = self.stats()
+        self.assertEqual(stats.total_conversations, 2)
+        self.assertEqual((stats.messages_sent, stats.messages_received), (3, 3))
+        self.assertEqual((stats.learning_paths_enrolled, stats.learning_paths_completed), (1, 1))
+        self.assertEqual((stats.challenges_attempted, stats.challenges_completed), (4, 3))
+        self.assert_matches_rebuild()
+
+    def test_deleting_a_conversation_takes_its_messages_in_one_update(self):
+        self.conversation(user_messages=1, ai_messages=1)
+        updates, totals = [], []
+        for messages in (2, 20):
+            conversation = self.conversation(user_messages=messages, ai_messages=messages)
+            with CaptureQueriesContext(connection) as queries:
+                conversation.delete()
+            updates.append(sum('UPDATE "users_userstats"' in query['sql'] for query in queries))
+            totals.append(len(queries))
+
+        self.assertEqual(updates, [1, 1])
+        self.assertEqual(totals[0], totals[1])
+        stats = self.stats()
+        self.assertEqual((stats.total_conversations, stats.messages_sent, stats.messages_received), (1, 1, 1))
+        self.assert_matches_rebuild()
+
+    def test_deleting_a_learning_path_takes_its_progress(self):
+        path, progress = self.learning_path()
+        SubtopicProgress.objects.filter(id=progress.id).update(challenges_attempted=5, challenges_completed=2)
+        rebuild_user_stats(self.user.id)
+
+        path.delete()
+
+        stats = self.stats()
+        self.assertEqual((stats.learning_paths_enrolled, stats.challenges_attempted, stats.challenges_completed), (0, 0, 0))
+        self.assert_matches_rebuild()
+
+    def test_deleting_the_user_skips_per_row_updates(self):
+        self.conversation(user_messages=3, ai_messages=3)
+        self.learning_path()
+        with CaptureQueriesContext(connection) as queries:
+            self.user.delete()
+        self.assertFalse([query for query in queries if 'UPDATE "users_userstats"' in query['sql']])
+
+    def test_rebuild_repairs_drift(self):
+        self.conversation(user_messages=2, ai_messages=2)
+        UserStats.objects.filter(user=self.user).update(total_conversations=9, messages_sent=0)
+
+        rebuild_user_stats(self.user.id)
+
+        stats = self.stats()
+        self.assertEqual((stats.total_conversations, stats.messages_sent, stats.messages_received), (1, 2, 2))
+
+
+class ActivityBitmapTests(SimpleTestCase):
+    def test_encode_decode_round_trip(self):
+        days = [date(2025, 1, 1), date(2025, 1, 2), date(2025, 1, 9), date(2025, 3, 1)]
+        start, bitmap = encode_days(days + [date(2025, 1, 2)])
+        self.assertEqual(start, date(2025, 1, 1))
+        self.assertEqual(len(bitmap), (date(2025, 3, 1) - start).days // 8 + 1)
+        self.assertEqual(decode_days(start, bitmap), days)
+        self.assertEqual(decode_days(start, bitmap, since=date(2025, 1, 2), until=date(2025, 1, 9)), days[1:3])
+        self.assertEqual(encode_days([]), (None, b''))
+        self.assertEqual(decode_days(None, b''), [])
+
+    def test_add_day_grows_across_byte_boundaries(self):
+        start, bitmap = encode_days([date(2025, 1, 1)])
+        for offset in (7, 8, 16):
+            start, bitmap = add_day(start, bitmap, date(2025, 1, 1) + timedelta(days=offset))
+        self.assertEqual(start, date(2025, 1, 1))
+        self.assertEqual(len(bitmap), 3)
+        self.assertEqual(
+            decode_days(start, bitmap),
+            [date(2025, 1, 1), date(2025, 1, 8), date(2025, 1, 9), date(2025, 1, 17)],
+        )
+
+    def test_add_day_before_start_reanchors(self):
+        start, bitmap = encode_days([date(2025, 1, 10), date(2025, 1, 11)])
+        start, bitmap = add_day(start, bitmap, date(2024, 12, 31))
+        self.assertEqual(start, date(2024, 12, 31))
+        self.assertEqual(decode_days(start, bitmap), [date(2024, 12, 31), date(2025, 1, 10), date(2025, 1, 11)])
+        # setting a day twice changes nothing
+        self.assertEqual(add_day(start, bitmap, date(2025, 1, 10)), (start, bitmap))
+
+    def test_streaks(self):
+        days = [date(2024, 12, 30), date(2024, 12, 31), date(2025, 1, 1), date(2025, 1, 5), date(2025, 1, 6)]
+        self.assertEqual(trailing_streak(days), 2)
+        self.assertEqual(longest_streak(days), 3)
+        self.assertEqual(trailing_streak([]), 0)
+        self.assertEqual(longest_streak([]), 0)
+
+
+class RecordActivityTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(
+            email='streak@example.com', password='password', first_name='Streak', last_name='Keeper'
+        )
+
+    def stats(self):
+        return UserStats.objects.get(user=self.user)
+
+    def test_out_of_order_days_join_runs(self):
+        for day in (date(2025, 1, 1), date(2025, 1, 3), date(2025, 1, 2)):
+            record_activity(self.user.id, day)
+
+        stats = self.stats()
+        self.assertEqual(stats.last_active_date, date(2025, 1, 3))
+        self.assertEqual((stats.current_streak_days, stats.longest_streak_days), (3, 3))
+        self.assertEqual(stats.active_days(), [date(2025, 1, 1), date(2025, 1, 2), date(2025, 1, 3)])
+
+    def test_known_past_day_writes_nothing(self):
+        record_activity(self.user.id, date(2025, 1, 1))
+        record_activity(self.user.id, date(2025, 1, 3))
+        # the fast-path read misses, then the locked read finds the bit already set
+        with self.assertNumQueries(4):
+            record_activity(self.user.id, date(2025, 1, 1))
+
+    def test_session_past_midnight_marks_both_days_like_the_rebuild(self):
+        session = UserActivitySession.objects.create(user=self.user)
+        yesterday = timezone.now() - timedelta(days=1)
+        UserActivitySession.objects.filter(id=session.id).update(started_at=yesterday)
+        session = UserActivitySession.objects.get(id=session.id)
+        session.duration_seconds = 600
+        session.save()
+
+        incremental = self.stats()
+        rebuilt = compute_user_stats(self.user.id)
+        self.assertEqual(incremental.active_days(), [timezone.localdate(yesterday), timezone.localdate()])
+        for field in ('last_active_date', 'current_streak_days', 'longest_streak_days', 'activity_bitmap_start'):
+            self.assertEqual(getattr(incremental, field), rebuilt[field], field)
+        self.assertEqual(bytes(incremental.activity_bitmap), rebuilt['activity_bitmap'])
+
+
+class UserCacheTests(TestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.user = CustomUser.objects.create_user(
+            email='cached@example.com', password='password', first_name='Cached', last_name='User'
+        )
+
+    def test_hits_serve_copies_without_queries(self):
+        with self.assertNumQueries(1):
+            first = get_active_user(self.user.id)
+        with self.assertNumQueries(0):
+            second = get_active_user(self.user.id)
+        self.assertIsNot(first, second)
+        second.first_name = 'Mutated'
+        self.assertEqual(get_active_user(self.user.id).first_name, 'Cached')
+
+    def test_save_and_deactivate_invalidate(self):
+        get_active_user(self.user.id)
+        self.user.first_name = 'Renamed'
+        self.user.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(get_active_user(self.user.id).first_name, 'Renamed')
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(get_active_user(self.user.id))
+        user_id = self.user.id
+        self.user.delete()
+        self.assertIsNone(get_active_user(user_id))
+
+    def test_tokens_issued_since_caching_reload(self):
+        cache = UserCache(ttl_seconds=30)
+        with mock.patch('users.utils.user_cache.time.time', return_value=1000.7):
+            cache.set(self.user, cache.version(str(self.user.id)))
+            self.assertIsNotNone(cache.get(str(self.user.id), issued_at=999))
+            # iat has whole seconds: a token from 1000.9 carries 1000
+            self.assertIsNone(cache.get(str(self.user.id), issued_at=1000))
+
+    def test_entries_expire(self):
+        cache = UserCache(ttl_seconds=30)
+        with mock.patch('users.utils.user_cache.time.time', return_value=1000.0):
+            cache.set(self.user, cache.version(str(self.user.id)))
+        with mock.patch('users.utils.user_cache.time.time', return_value=1031.0):
+            self.assertIsNone(cache.get(str(self.user.id)))
@@ -0,0 +1,66 @@
+from datetime import date, timedelta
+from typing import Iterable, List, Optional, Tuple
+
+# Daily activity is stored as a bitset anchored at the user's first active day:
+# bit i (LSB-first within each byte) is set when the user was active on start + i days.
+# One year of history costs 46 bytes.
+
+
+def encode_days(days: Iterable[date]) -> Tuple[Optional[date], bytes]:
+    """Encode a collection of dates into (start, bitmap)."""
+    days = sorted(set(days))
+    if not days:
+        return None, b""
+    start = days[0]
+    bitmap = bytearray((days[-1] - start).days // 8 + 1)
+    for day in days:
+        offset = (day - start).days
+        bitmap[offset // 8] |= 1 << (offset % 8)
+    return start, bytes(bitmap)
+
+
+def decode_days(start: Optional[date], bitmap: bytes, since: Optional[date] = None, until: Optional[date] = None) -> List[date]:
+    """Return the active dates in [since, until], oldest first."""
+    if start is None or not bitmap:
+        return []
+    first = max(0, (since - start).days) if since else 0
+    last = min(len(bitmap) * 8 - 1, (until - start).days) if until else len(bitmap) * 8 - 1
+    return [
+        start + timedelta(days=offset)
+        for offset in range(first, last + 1)
+        if bitmap[offset // 8] & (1 << (offset % 8))
+    ]
+
+
+def add_day(start: Optional[date], bitmap: bytes, day: date) -> Tuple[date, bytes]:
+    """Set the bit for `day`, growing (or re-anchoring) the bitmap as needed."""
+    if start is None or day < start:
+        return encode_days(decode_days(start, bitmap) + [day])
+    offset = (day - start).days
+    data = bytearray(bitmap)
+    if offset // 8 >= len(data):
+        data.extend(bytes(offset // 8 - len(data) + 1))
+    data[offset // 8] |= 1 << (offset % 8)
+    return start, bytes(data)
+
+
+def trailing_streak(days: Iterable[date]) -> int:
+    """Length of the run of consecutive days ending at the latest day."""
+    days = sorted(set(days), reverse=True)
+    streak = 0
+    for offset, day in enumerate(days):
+        if day != days[0] - timedelta(days=offset):
+            break
+        streak += 1
+    return streak
+
+
+def longest_streak(days: Iterable[date]) -> int:
+    """Length of the longest run of consecutive days."""
+    longest = current = 0
+    previous = None
+    for day in sorted(set(days)):
+        current = current + 1 if previous and day - previous == timedelta(days=1) else 1
+        longest = max(longest, current)
+        previous = day
+    return longest
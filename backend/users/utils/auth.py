@@ -7,6 +7,7 @@ from django.conf import settings
 from typing import Literal
 from django.http import HttpRequest
 from users.models import CustomUser
+from users.utils.user_cache import get_active_user
 from ninja.security import HttpBearer
 from typing import Optional
 
@@ -61,9 +62,8 @@ class JWTAuth(HttpBearer):
         if not user_id:
             return None
         
-        try:
-            user = CustomUser.objects.get(id=user_id)
-            request.user = user
-            return user
-        except CustomUser.DoesNotExist:
+        user = get_active_user(user_id, payload.get("iat"))
+        if user is None:
             return None
+        request.user = user
+        return user
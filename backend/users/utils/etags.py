@@ -0,0 +1,56 @@
+import hashlib
+import json
+from typing import Any
+from django.http import HttpRequest, HttpResponse, HttpResponseNotModified
+from ninja.responses import NinjaJSONEncoder
+
+# Conditional GET support for ninja routes. A route renders (or fetches from a
+# cache) its JSON body, then returns `etag_response(...)`, which answers 304 Not
+# Modified when the client's If-None-Match already names the current ETag.
+
+
+def render_json(payload: Any) -> bytes:
+    """Render response schemas the same way ninja's JSONRenderer does."""
+    if isinstance(payload, list):
+        payload = [item.model_dump() if hasattr(item, 'model_dump') else item for item in payload]
+    elif hasattr(payload, 'model_dump'):
+        payload = payload.model_dump()
+    return json.dumps(payload, cls=NinjaJSONEncoder).encode()
+
+
+def make_etag(*parts: Any) -> str:
+    """Weak ETag from a body or any version parts (timestamps, counters, ids)."""
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode())
+        digest.update(b'\0')
+    return f'W/"{digest.hexdigest()[:20]}"'
+
+
+def etag_matches(request: HttpRequest, etag: str) -> bool:
+    """Weak comparison against the request's If-None-Match header."""
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    opaque = etag.removeprefix('W/')
+    return any(candidate.strip().removeprefix('W/') == opaque for candidate in header.split(','))
+
+
+def _set_validators(response: HttpResponse, etag: str) -> HttpResponse:
+    response['ETag'] = etag
+    # let browsers keep the body but revalidate it on every use
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def not_modified(etag: str) -> HttpResponseNotModified:
+    return _set_validators(HttpResponseNotModified(), etag)
+
+
+def etag_response(request: HttpRequest, body: bytes, etag: str) -> HttpResponse:
+    """200 with the body, or 304 if the client already has this version."""
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    return _set_validators(HttpResponse(body, content_type='application/json'), etag)
@@ -0,0 +1,186 @@
+import bisect
+import hmac
+import threading
+import time
+from contextlib import contextmanager
+from django.conf import settings
+from django.http import HttpResponse
+
+# In-process latency histograms and counters, rendered in the Prometheus text
+# format by metrics_view (GET /metrics). Recording an event is a lock and a few
+# list increments, no I/O; every worker keeps its own series, so scrape each
+# worker (or sum them in Prometheus) rather than expecting global totals here.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+METRICS_TOKEN = getattr(settings, 'METRICS_TOKEN', None)
+
+_registry = []
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=()) -> str:
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name: str, description: str, label_names: tuple = ()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self._series = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> list:
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for key, values in sorted(series.items()):
+            lines += self._render_series(key, values)
+        return lines
+
+
+class Counter(_Metric):
+    """A monotonically increasing count per label set."""
+
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            values = self._series.setdefault(key, [0])
+            values[0] += amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._series.get(self._key(labels), [0])[0]
+
+    def _render_series(self, key, values):
+        return [f'{self.name}_total{_format_labels(self.label_names, key)} {_format_value(values[0])}']
+
+
+class Histogram(_Metric):
+    """
+    Cumulative-bucket histogram of durations in seconds.
+    `with histogram.time(**labels):` observes the block's wall time, including
+    when it raises.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, description: str, label_names: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, description, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            values = self._series.get(key)
+            if values is None:
+                # one count per bucket plus +Inf, then sum and count
+                values = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            values[index] += 1
+            values[-2] += value
+            values[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            values = self._series.get(self._key(labels))
+            return values[-1] if values else 0
+
+    def _render_series(self, key, values):
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*self.buckets, '+Inf'), values):
+            cumulative += count
+            le = ('le', bound if bound == '+Inf' else _format_value(float(bound)))
+            lines.append(f'{self.name}_bucket{_format_labels(self.label_names, key, [le])} {cumulative}')
+        labels = _format_labels(self.label_names, key)
+        lines.append(f'{self.name}_sum{labels} {_format_value(values[-2])}')
+        lines.append(f'{self.name}_count{labels} {values[-1]}')
+        return lines
+
+
+CHAT_STAGE_SECONDS = Histogram(
+    'chat_stage_seconds',
+    'Time spent in each stage of a WebSocket chat turn.',
+    ('consumer', 'stage'),
+)
+LLM_CALL_SECONDS = Histogram(
+    'llm_call_seconds',
+    'Latency of model calls by call type.',
+    ('call',),
+)
+LLM_CALLS = Counter(
+    'llm_calls',
+    'Model calls by call type and outcome.',
+    ('call', 'outcome'),
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    'http_request_seconds',
+    'REST endpoint latency by view; outcome is "error" when the view raised.',
+    ('method', 'endpoint', 'outcome'),
+)
+
+
+@contextmanager
+def track_llm_call(call: str):
+    """Time one model call and count it as ok or error."""
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        yield
+        outcome = 'ok'
+    finally:
+        LLM_CALL_SECONDS.observe(time.perf_counter() - started, call=call)
+        LLM_CALLS.inc(call=call, outcome=outcome)
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in _registry:
+        lines += metric.render()
+    return '\n'.join(lines) + '\n'
+
+
+def reset_metrics() -> None:
+    for metric in _registry:
+        metric.clear()
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint; with METRICS_TOKEN set it requires `Authorization: Bearer <token>`."""
+    if METRICS_TOKEN:
+        supplied = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not hmac.compare_digest(supplied, METRICS_TOKEN):
+            return HttpResponse(status=401)
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
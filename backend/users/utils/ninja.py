@@ -1,9 +1,15 @@
 from ninja import Router
-from typing import Dict, Any, Callable
+from typing import Dict, Any, Callable, Optional
+from django.http import JsonResponse
 from users.utils.auth import JWTAuth
+from users.utils.metrics import HTTP_REQUEST_SECONDS
+from users.utils.rate_limit import client_identity, rate_limiter, retry_after_header
 import functools
+import time
 
-RATE_LIMIT = ["1000/h", "100/m", "10/s"]
+# Every route draws from this bucket set (settings.RATE_LIMITS); expensive
+# routes name an extra, tighter scope with rate_limit=...
+DEFAULT_RATE_LIMIT_SCOPE = "default"
 
 
 def setup_route(
@@ -12,11 +18,14 @@ def setup_route(
     path: str,
     response: Dict[int, Any],
     auth: Any = None,
+    rate_limit: Optional[str] = None,
 ):
     """
     Factory that returns a decorator.
     This decorator will register the route with the router.
+    Requests over the caller's rate limit get a 429 with Retry-After.
     """
+    scopes = tuple(scope for scope in (rate_limit, DEFAULT_RATE_LIMIT_SCOPE) if scope)
 
     def decorator(view_func: Callable):
         """This is the actual decorator that wraps your view function."""
@@ -25,7 +34,27 @@ def setup_route(
         # this @functools.wraps allows Ninja to track the signature and pass params.
         @functools.wraps(view_func)
         def wrapper(request, *args, **kwargs):
-            return view_func(request, *args, **kwargs)
+            # every scope is checked before a token is taken from any of them
+            wait = rate_limiter.hit_all(scopes, client_identity(request))
+            if wait:
+                limited = JsonResponse({"error": "Too many requests"}, status=429)
+                limited["Retry-After"] = retry_after_header(wait)
+                return limited
+
+            started = time.perf_counter()
+            outcome = "error"
+            try:
+                result = view_func(request, *args, **kwargs)
+                outcome = "ok"
+                return result
+            finally:
+                # labelled by view name, not URL, so path parameters don't multiply the series
+                HTTP_REQUEST_SECONDS.observe(
+                    time.perf_counter() - started,
+                    method=method,
+                    endpoint=view_func.__name__,
+                    outcome=outcome,
+                )
 
         router.add_api_operation(
             path,
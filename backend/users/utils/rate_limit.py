@@ -0,0 +1,221 @@
+import ipaddress
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from users.utils.metrics import Counter
+
+logger = logging.getLogger('users.utils.rate_limit')
+
+# Token-bucket rate limits, one set of buckets per (scope, identity). A scope
+# such as "llm_turn" lists rates like ["300/h", "20/m", "1/s"]; a hit is
+# allowed only when every bucket has a token, and then takes one from each.
+# hit_all() does the same across several scopes, so a request refused by one
+# scope spends nothing from the others.
+#
+# The memory store keeps buckets in this process. The redis store shares them
+# across workers with one atomic script call per hit; identities it has just
+# refused are also refused locally until their retry time, so a client
+# hammering the API costs no Redis round trips. If Redis is unreachable the
+# limiter falls back to the memory store rather than failing requests.
+RATE_LIMITS = getattr(settings, 'RATE_LIMITS', {})
+RATE_LIMIT_ENABLED = getattr(settings, 'RATE_LIMIT_ENABLED', True)
+RATE_LIMIT_STORE = getattr(settings, 'RATE_LIMIT_STORE', 'memory')
+RATE_LIMIT_MAX_KEYS = getattr(settings, 'RATE_LIMIT_MAX_KEYS', 100_000)
+# Anonymous callers are identified by REMOTE_ADDR, or by the X-Real-IP header
+# when REMOTE_ADDR is one of these proxies (addresses or CIDR ranges)
+RATE_LIMIT_TRUSTED_PROXIES = tuple(
+    ipaddress.ip_network(proxy.strip(), strict=False)
+    for proxy in getattr(settings, 'RATE_LIMIT_TRUSTED_PROXIES', ())
+)
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+RATE_LIMITED = Counter('rate_limited_requests', 'Requests and WebSocket turns refused by the rate limiter.', ('scope',))
+
+# KEYS: one bucket per rate. ARGV: now, cost, then capacity and refill/s per rate.
+# Returns {0, 0} when allowed, otherwise {milliseconds until it would be, the
+# index of the bucket furthest from a token}.
+_REDIS_SCRIPT = """
+local now = tonumber(ARGV[1])
+local cost = tonumber(ARGV[2])
+local levels = {}
+local wait = 0
+local limiting = 0
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[1 + 2 * i])
+    local rate = tonumber(ARGV[2 + 2 * i])
+    local bucket = redis.call('HMGET', key, 'tokens', 'at')
+    local tokens = tonumber(bucket[1]) or capacity
+    local at = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - at) * rate)
+    levels[i] = tokens
+    if tokens < cost and (cost - tokens) / rate > wait then
+        wait = (cost - tokens) / rate
+        limiting = i
+    end
+end
+if wait > 0 then
+    return {math.ceil(wait * 1000), limiting}
+end
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[1 + 2 * i])
+    local rate = tonumber(ARGV[2 + 2 * i])
+    redis.call('HSET', key, 'tokens', levels[i] - cost, 'at', now)
+    redis.call('PEXPIRE', key, math.ceil(capacity / rate * 1000))
+end
+return {0, 0}
+"""
+
+
+def parse_rate(rate: str) -> tuple:
+    """'100/m' -> (capacity 100, refill 100/60 tokens per second)."""
+    count, _, period = rate.strip().partition('/')
+    if period not in PERIODS or not count.isdigit() or int(count) == 0:
+        raise ValueError(f"Invalid rate {rate!r}; expected '<count>/<s|m|h|d>'")
+    return int(count), int(count) / PERIODS[period]
+
+
+class RateLimiter:
+    """
+    Thread-safe token-bucket limiter.
+    `hit(scope, identity)` returns 0 when the call may proceed, otherwise the
+    seconds until it would be allowed. Unknown scopes are never limited.
+    """
+
+    def __init__(self, limits: dict = RATE_LIMITS, store: str = RATE_LIMIT_STORE, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.limits = {scope: [parse_rate(rate) for rate in rates] for scope, rates in limits.items()}
+        self.store = store
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._blocked_until = {}
+        self._lock = threading.Lock()
+        self._redis = None
+        self._script = None
+
+    def hit(self, scope: str, identity: str, cost: int = 1) -> float:
+        return self.hit_all((scope,), identity, cost)
+
+    def hit_all(self, scopes, identity: str, cost: int = 1) -> float:
+        """hit() against several scopes at once: a token is taken from every scope or from none."""
+        limited = [scope for scope in scopes if self.limits.get(scope)]
+        if not RATE_LIMIT_ENABLED or not limited:
+            return 0
+        keys = [f'{scope}:{identity}' for scope in limited]
+        rates = [self.limits[scope] for scope in limited]
+        if self.store == 'redis':
+            wait, refused_by = self._blocked(keys), None
+            if not wait:
+                wait, refused_by = self._hit_redis(keys, rates, cost)
+        else:
+            wait, refused_by = self._hit_memory(keys, rates, cost)
+        if wait:
+            RATE_LIMITED.inc(scope=limited[refused_by] if refused_by is not None else limited[0])
+        return wait
+
+    async def ahit(self, scope: str, identity: str, cost: int = 1) -> float:
+        """hit() for async callers; only the redis store leaves the event loop."""
+        if self.store == 'redis' and not self._blocked([f'{scope}:{identity}']):
+            return await sync_to_async(self.hit, thread_sensitive=False)(scope, identity, cost)
+        return self.hit(scope, identity, cost)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+            self._blocked_until.clear()
+
+    def _blocked(self, keys: list) -> float:
+        blocked_key = '|'.join(keys)
+        with self._lock:
+            until = self._blocked_until.get(blocked_key)
+            if until is None:
+                return 0
+            wait = until - time.monotonic()
+            if wait <= 0:
+                del self._blocked_until[blocked_key]
+                return 0
+            return wait
+
+    def _hit_memory(self, keys: list, rates: list, cost: int) -> tuple:
+        """(wait, index of the scope that refused) for one set of buckets per key."""
+        now = time.monotonic()
+        with self._lock:
+            refilled = []
+            for key, key_rates in zip(keys, rates):
+                levels = self._buckets.get(key)
+                if levels is None:
+                    levels = [(capacity, now) for capacity, _ in key_rates]
+                refilled.append([
+                    min(capacity, tokens + (now - at) * rate)
+                    for (capacity, rate), (tokens, at) in zip(key_rates, levels)
+                ])
+            waits = [
+                max(((cost - tokens) / rate for (_, rate), tokens in zip(key_rates, key_levels) if tokens < cost), default=0)
+                for key_rates, key_levels in zip(rates, refilled)
+            ]
+            wait = max(waits)
+            for key, key_levels in zip(keys, refilled):
+                if not wait:
+                    key_levels = [tokens - cost for tokens in key_levels]
+                self._buckets[key] = [(tokens, now) for tokens in key_levels]
+                self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait, waits.index(wait) if wait else None
+
+    def _hit_redis(self, keys: list, rates: list, cost: int) -> tuple:
+        try:
+            if self._script is None:
+                import redis
+
+                self._redis = redis.Redis.from_url(settings.REDIS_URL, socket_timeout=0.5)
+                self._script = self._redis.register_script(_REDIS_SCRIPT)
+            bucket_keys, owners = [], []
+            for index, (key, key_rates) in enumerate(zip(keys, rates)):
+                bucket_keys += [f'ratelimit:{key}:{rate_index}' for rate_index in range(len(key_rates))]
+                owners += [index] * len(key_rates)
+            args = [time.time(), cost] + [value for key_rates in rates for rate in key_rates for value in rate]
+            wait_ms, limiting = self._script(keys=bucket_keys, args=args)
+        except Exception as exception:
+            logger.warning(f"Rate limit store unavailable, using in-process buckets: {exception}")
+            return self._hit_memory(keys, rates, cost)
+        if not wait_ms:
+            return 0, None
+        wait = wait_ms / 1000
+        with self._lock:
+            self._blocked_until['|'.join(keys)] = time.monotonic() + wait
+        # Lua indexes from 1
+        return wait, owners[limiting - 1]
+
+
+rate_limiter = RateLimiter()
+
+
+def client_identity(request) -> str:
+    """The authenticated user, else the client's address."""
+    user = getattr(request, 'auth', None)
+    if getattr(user, 'id', None):
+        return f'user:{user.id}'
+    address = request.META.get('REMOTE_ADDR', '')
+    if _is_trusted_proxy(address):
+        # nginx overwrites X-Real-IP with the address it saw, so clients can't choose their own
+        address = request.META.get('HTTP_X_REAL_IP', '').strip() or address
+    return f'ip:{address}'
+
+
+def _is_trusted_proxy(address: str) -> bool:
+    if not RATE_LIMIT_TRUSTED_PROXIES:
+        return False
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in RATE_LIMIT_TRUSTED_PROXIES)
+
+
+def retry_after_header(wait: float) -> str:
+    return str(max(1, math.ceil(wait)))
@@ -0,0 +1,196 @@
+import logging
+from datetime import date, timedelta
+from uuid import UUID
+from django.db.models import Count, F, Q, Subquery, Sum, Value
+from django.db import transaction
+from django.db.models.functions import Coalesce, Greatest, TruncDate
+from users.models import UserStats, UserActivitySession
+from users.utils.activity import add_day, encode_days, longest_streak, trailing_streak
+
+logger = logging.getLogger('users.utils.stats')
+
+
+def _learning_stats(user_id: UUID) -> dict:
+    # Import models here to avoid circular imports
+    from learning_paths.models import UserLearningPath, SubtopicProgress
+
+    path_stats = UserLearningPath.objects.filter(user_id=user_id).aggregate(
+        enrolled=Count('id'),
+        completed=Count('id', filter=Q(completed_at__isnull=False)),
+    )
+    challenge_stats = SubtopicProgress.objects.filter(user_path__user_id=user_id).aggregate(
+        completed=Sum('challenges_completed'),
+        attempted=Sum('challenges_attempted'),
+    )
+    return {
+        'learning_paths_enrolled': path_stats['enrolled'] or 0,
+        'learning_paths_completed': path_stats['completed'] or 0,
+        'challenges_completed': challenge_stats['completed'] or 0,
+        'challenges_attempted': challenge_stats['attempted'] or 0,
+    }
+
+
+def _activity_stats(user_id: UUID) -> dict:
+    activity_stats = UserActivitySession.objects.filter(user_id=user_id).aggregate(
+        total_time=Sum('duration_seconds'),
+        session_count=Count('id'),
+    )
+    return {
+        'total_time_spent_seconds': activity_stats['total_time'] or 0,
+        'activity_session_count': activity_stats['session_count'] or 0,
+    }
+
+
+def _activity_day_stats(user_id: UUID) -> dict:
+    sessions = UserActivitySession.objects.filter(user_id=user_id)
+    days = set(sessions.annotate(day=TruncDate('started_at')).values_list('day', flat=True))
+    days |= set(sessions.annotate(day=TruncDate('last_activity_at')).values_list('day', flat=True))
+    start, bitmap = encode_days(days)
+    return {
+        'last_active_date': max(days) if days else None,
+        'current_streak_days': trailing_streak(days),
+        'longest_streak_days': longest_streak(days),
+        'activity_bitmap_start': start,
+        'activity_bitmap': bitmap,
+    }
+
+
+def compute_user_stats(user_id: UUID) -> dict:
+    """
+    Compute every rollup field from the source tables.
+    This is the slow path used by rebuilds and self-healing.
+    """
+    from ai_core.models import Conversation, Message, MessageSenderChoices
+    from execution.models import CodeExecutionLog
+
+    message_stats = Message.objects.filter(conversation__user_id=user_id).aggregate(
+        sent=Count('id', filter=Q(sender=MessageSenderChoices.USER)),
+        received=Count('id', filter=Q(sender=MessageSenderChoices.AI)),
+    )
+    execution_stats = CodeExecutionLog.objects.filter(user_id=user_id).aggregate(
+        total=Count('id'),
+        successful=Count('id', filter=Q(success=True)),
+    )
+    return {
+        'total_conversations': Conversation.objects.filter(user_id=user_id).count(),
+        'messages_sent': message_stats['sent'] or 0,
+        'messages_received': message_stats['received'] or 0,
+        'code_executions': execution_stats['total'] or 0,
+        'successful_executions': execution_stats['successful'] or 0,
+        **_learning_stats(user_id),
+        **_activity_stats(user_id),
+        **_activity_day_stats(user_id),
+    }
+
+
+def rebuild_user_stats(user_id: UUID) -> UserStats:
+    """Recompute the rollup row for a user from scratch."""
+    stats, _ = UserStats.objects.update_or_create(
+        user_id=user_id,
+        defaults=compute_user_stats(user_id),
+    )
+    return stats
+
+
+def get_user_stats(user_id: UUID) -> UserStats:
+    """Single-row read of the rollup, building it on first access."""
+    stats = UserStats.objects.filter(user_id=user_id).first()
+    if stats is None:
+        stats = rebuild_user_stats(user_id)
+    return stats
+
+
+def increment_user_stats(user_id: UUID, create_missing: bool = True, **deltas: int) -> None:
+    """
+    Apply counter deltas with a single UPDATE.
+    If the row does not exist yet (e.g. users created before the rollup existed)
+    it is rebuilt from the source tables instead, which already includes this write.
+    Decrements pass create_missing=False so cascaded user deletes don't recreate the row.
+    """
+    # Clamp decrements at zero so a drifted row can't violate the positive-integer checks
+    updated = UserStats.objects.filter(user_id=user_id).update(
+        **{
+            field: F(field) + delta if delta >= 0 else Greatest(F(field) + delta, 0)
+            for field, delta in deltas.items()
+        }
+    )
+    if not updated and create_missing:
+        rebuild_user_stats(user_id)
+
+
+def subquery_total(queryset, aggregate):
+    """`aggregate` over every row of `queryset` as a scalar subquery, 0 when there are none."""
+    totals = queryset.order_by().annotate(_all=Value(1)).values('_all').annotate(total=aggregate).values('total')
+    return Coalesce(Subquery(totals), 0)
+
+
+def subtract_user_stats(user_id: UUID, **amounts) -> None:
+    """
+    Take amounts off counters with a single UPDATE, clamped at zero.
+    Amounts may be expressions such as subquery_total(), so a parent about to
+    be deleted can take its children's counts with it before they are gone.
+    """
+    UserStats.objects.filter(user_id=user_id).update(
+        **{field: Greatest(F(field) - amount, 0) for field, amount in amounts.items()}
+    )
+
+
+def refresh_learning_stats(user_id: UUID, create_missing: bool = True) -> None:
+    """Recompute learning path and challenge counters for one user."""
+    updated = UserStats.objects.filter(user_id=user_id).update(**_learning_stats(user_id))
+    if not updated and create_missing:
+        rebuild_user_stats(user_id)
+
+
+def refresh_activity_stats(user_id: UUID, create_missing: bool = True) -> None:
+    """Recompute time-spent counters for one user."""
+    updated = UserStats.objects.filter(user_id=user_id).update(**_activity_stats(user_id))
+    if not updated and create_missing:
+        rebuild_user_stats(user_id)
+
+
+def record_activity(user_id: UUID, day: date) -> None:
+    """
+    Mark `day` as active and advance the streak.
+    Repeat activity on the same day is a single indexed read.
+    """
+    if UserStats.objects.filter(user_id=user_id, last_active_date=day).exists():
+        return
+
+    with transaction.atomic():
+        stats = UserStats.objects.select_for_update().filter(user_id=user_id).first()
+        if stats is None:
+            rebuild_user_stats(user_id)
+            return
+
+        last_active = stats.last_active_date
+        if last_active is None or day > last_active:
+            if last_active == day - timedelta(days=1):
+                stats.current_streak_days += 1
+            else:
+                stats.current_streak_days = 1
+            stats.last_active_date = day
+            stats.longest_streak_days = max(stats.longest_streak_days, stats.current_streak_days)
+        else:
+            if stats.active_days(since=day, until=day):
+                return
+            # Out-of-order activity can join runs in the past; recompute from the bitmap
+            stats.activity_bitmap_start, stats.activity_bitmap = add_day(
+                stats.activity_bitmap_start, bytes(stats.activity_bitmap), day
+            )
+            active_days = stats.active_days()
+            stats.current_streak_days = trailing_streak(active_days)
+            stats.longest_streak_days = longest_streak(active_days)
+            stats.save(update_fields=[
+                'activity_bitmap_start', 'activity_bitmap',
+                'current_streak_days', 'longest_streak_days', 'updated_at',
+            ])
+            return
+
+        stats.activity_bitmap_start, stats.activity_bitmap = add_day(
+            stats.activity_bitmap_start, bytes(stats.activity_bitmap), day
+        )
+        stats.save(update_fields=[
+            'last_active_date', 'current_streak_days', 'longest_streak_days',
+            'activity_bitmap_start', 'activity_bitmap', 'updated_at',
+        ])
@@ -0,0 +1,117 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from django.conf import settings
+from users.models import CustomUser
+
+# Short-lived, per-process cache of authenticated users so every API call and
+# WebSocket connect doesn't pay a primary-key lookup.
+# Entries are dropped when the user is saved or deleted in this process (see
+# users.signals); other processes only see the change once the TTL runs out,
+# which bounds how long a deactivated user stays signed in on other workers.
+USER_CACHE_TTL_SECONDS = getattr(settings, "USER_CACHE_TTL_SECONDS", 30)
+USER_CACHE_MAX_SIZE = getattr(settings, "USER_CACHE_MAX_SIZE", 10_000)
+
+
+class UserCache:
+    """
+    Thread-safe LRU of user_id -> (user, cached_at, version).
+    Each user has an invalidation version that is bumped on every update;
+    entries carrying an older version are treated as misses.
+    """
+
+    def __init__(self, ttl_seconds: float = USER_CACHE_TTL_SECONDS, max_size: int = USER_CACHE_MAX_SIZE):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str, issued_at: Optional[int] = None) -> Optional[CustomUser]:
+        """
+        Return a copy of the cached user, or None on a miss.
+        A token issued after the entry was cached (e.g. a fresh login after a
+        profile change in another process) forces a reload. `iat` only has
+        whole seconds, so a token from the second the entry was cached in
+        counts as newer.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            user, cached_at, version = entry
+            if (
+                version != self._versions.get(user_id, 0)
+                or now - cached_at > self.ttl_seconds
+                or (issued_at is not None and issued_at >= int(cached_at))
+            ):
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+        # each request gets its own instance; the cached one is never handed out
+        return copy.copy(user)
+
+    def version(self, user_id: str) -> int:
+        with self._lock:
+            return self._versions.get(user_id, 0)
+
+    def set(self, user: CustomUser, version: int) -> None:
+        """
+        Cache `user` as loaded under `version` (read before the DB query), so a
+        load that races with an invalidation is never served.
+        """
+        user_id = str(user.id)
+        with self._lock:
+            if version != self._versions.get(user_id, 0):
+                return
+            self._entries[user_id] = (user, time.time(), version)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id) -> None:
+        user_id = str(user_id)
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+
+
+user_cache = UserCache()
+
+
+def load_active_user(user_id: str) -> Optional[CustomUser]:
+    """
+    Load the user from the DB and cache it; the miss path of get_active_user.
+    Deactivated and deleted users resolve to None.
+    """
+    user_id = str(user_id)
+    version = user_cache.version(user_id)
+    user = CustomUser.objects.filter(id=user_id).first()
+    if user is None:
+        return None
+    user_cache.set(copy.copy(user), version)
+    return user if user.is_active else None
+
+
+def get_active_user(user_id: str, issued_at: Optional[int] = None) -> Optional[CustomUser]:
+    """
+    Resolve the user for a decoded token, hitting the DB only on a cache miss.
+    Deactivated and deleted users resolve to None.
+    """
+    user = user_cache.get(str(user_id), issued_at)
+    if user is None:
+        return load_active_user(user_id)
+    return user if user.is_active else None
+
+
+def invalidate_user(sender, instance, **kwargs):
+    """post_save / post_delete receiver for CustomUser."""
+    user_cache.invalidate(instance.pk)
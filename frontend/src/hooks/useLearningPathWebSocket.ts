@@ -1,4 +1,5 @@
 import { useEffect, useRef, useState } from "react";
+import { useQueryClient } from "@tanstack/react-query";
 import { getAccessToken } from "../api/apiClient";
 
 const MAX_RECONNECT_ATTEMPTS = 5;
@@ -37,7 +38,7 @@ export const useLearningPathWebSocket = (
   const [isConnected, setIsConnected] = useState(false);
   const [isTyping, setIsTyping] = useState(false);
   const reconnectAttemptsRef = useRef(0);
-
+  const queryClient = useQueryClient();
 
   const token = getAccessToken();
 
@@ -60,56 +61,68 @@ export const useLearningPathWebSocket = (
       ws.onopen = () => {
         console.log("Learning Path WebSocket connected");
         setIsConnected(true);
+        if (reconnectAttemptsRef.current > 0) {
+          // Frames sent while we were disconnected are only in the history now
+          queryClient.invalidateQueries({ queryKey: ["subtopic-messages", learningTopicId, subtopicId] });
+        }
         reconnectAttemptsRef.current = 0;
       };
 
-      ws.onmessage = (event) => {
-        try {
-          const data = JSON.parse(event.data);
-          
-          // Handle different event types
-          if (data.type === "typing_start") {
-            // Handle typing indicator
-            setIsTyping(true);
-          } else if (data.type === "done") {
-            // AI finished typing
-            setIsTyping(false);
-          } else if (data.type === "subtopic_complete") {
-            // AI detected subtopic completion
-            if (handleSubtopicComplete) {
-              handleSubtopicComplete();
-            }
-          } else if (data.type === "progress_update") {
-            // Progress update from backend
-            if (handleProgressUpdate && data.content) {
-              try {
-                const progressData = JSON.parse(data.content);
-                handleProgressUpdate(progressData);
-              } catch (err) {
-                console.error("Failed to parse progress data:", err);
-              }
-            }
-          } else if (data.type === "ready_for_next_subtopic") {
-            // User is ready to move to next subtopic
-            if (handleReadyForNext) {
-              handleReadyForNext();
-            }
-          } else if (data.type === "subtopic_changed") {
-            // Subtopic has changed
-            if (handleSubtopicChanged && data.content) {
-              try {
-                const changeData = JSON.parse(data.content);
-                handleSubtopicChanged(changeData);
-              } catch (err) {
-                console.error("Failed to parse subtopic change data:", err);
-              }
+      const handleFrame = (data: any) => {
+        // Several events from one turn can arrive coalesced in a single frame
+        if (data.type === "batch" && Array.isArray(data.frames)) {
+          data.frames.forEach(handleFrame);
+          return;
+        }
+
+        // Handle different event types
+        if (data.type === "typing_start") {
+          // Handle typing indicator
+          setIsTyping(true);
+        } else if (data.type === "done") {
+          // AI finished typing
+          setIsTyping(false);
+        } else if (data.type === "subtopic_complete") {
+          // AI detected subtopic completion
+          if (handleSubtopicComplete) {
+            handleSubtopicComplete();
+          }
+        } else if (data.type === "progress_update") {
+          // Progress update from backend
+          if (handleProgressUpdate && data.content) {
+            try {
+              const progressData = JSON.parse(data.content);
+              handleProgressUpdate(progressData);
+            } catch (err) {
+              console.error("Failed to parse progress data:", err);
             }
-          } else if (data.payload) {
-            // This is a message (user or AI) - has payload with message data
-            if (handleNewMessage) {
-              handleNewMessage(data.payload);
+          }
+        } else if (data.type === "ready_for_next_subtopic") {
+          // User is ready to move to next subtopic
+          if (handleReadyForNext) {
+            handleReadyForNext();
+          }
+        } else if (data.type === "subtopic_changed") {
+          // Subtopic has changed
+          if (handleSubtopicChanged && data.content) {
+            try {
+              const changeData = JSON.parse(data.content);
+              handleSubtopicChanged(changeData);
+            } catch (err) {
+              console.error("Failed to parse subtopic change data:", err);
             }
           }
+        } else if (data.payload) {
+          // This is a message (user or AI) - has payload with message data
+          if (handleNewMessage) {
+            handleNewMessage(data.payload);
+          }
+        }
+      };
+
+      ws.onmessage = (event) => {
+        try {
+          handleFrame(JSON.parse(event.data));
         } catch (err) {
           console.error("Failed to parse message:", err);
         }
@@ -145,7 +158,7 @@ export const useLearningPathWebSocket = (
         socketRef.current = null;
       }
     };
-  }, [learningTopicId, subtopicId, token, handleNewMessage, handleSubtopicComplete, handleProgressUpdate, handleReadyForNext, handleSubtopicChanged]);
+  }, [learningTopicId, subtopicId, token, queryClient, handleNewMessage, handleSubtopicComplete, handleProgressUpdate, handleReadyForNext, handleSubtopicChanged]);
 
 
   const sendMessage = (message: string, codeSnippet?: string, language?: string) => {
@@ -1,4 +1,5 @@
 import { useCallback, useEffect, useRef, useState } from "react";
+import { useQueryClient } from "@tanstack/react-query";
 import { getAccessToken } from "../api/apiClient";
 
 interface Message {
@@ -39,6 +40,7 @@ export const useWebSocket = (conversationId: string) => {
   const [isTyping, setIsTyping] = useState(false); // <-- New state for typing indicator
   const reconnectAttemptsRef = useRef(0);
   const maxReconnectAttempts = 5;
+  const queryClient = useQueryClient();
 
   const token = getAccessToken();
 
@@ -62,28 +64,40 @@ export const useWebSocket = (conversationId: string) => {
       ws.onopen = () => {
         console.log("WebSocket connected");
         setIsConnected(true);
+        if (reconnectAttemptsRef.current > 0) {
+          // Frames sent while we were disconnected are only in the history now
+          queryClient.invalidateQueries({ queryKey: ["conversation", conversationId] });
+        }
         reconnectAttemptsRef.current = 0;
       };
 
+      const handleFrame = (data: any) => {
+        // Several events from one turn can arrive coalesced in a single frame
+        if (data && data.type === 'batch' && Array.isArray(data.frames)) {
+          data.frames.forEach(handleFrame);
+          return;
+        }
+
+        // Check if it's a message event
+        if (isMessage(data)) {
+          setMessages((prev) =>
+            prev.some((m) => m.id === data.id) ? prev : [...prev, data]
+          );
+        // Check if it's an event for typing status
+        } else if (isEvent(data)) {
+            if (data.type === 'typing_start') {
+                setIsTyping(true);
+            } else if (data.type === 'done') {
+                setIsTyping(false);
+            }
+        } else {
+          console.warn("Invalid data format received:", data);
+        }
+      };
+
       ws.onmessage = (event) => {
         try {
-          const data = JSON.parse(event.data);
-
-          // Check if it's a message event
-          if (isMessage(data)) {
-            setMessages((prev) =>
-              prev.some((m) => m.id === data.id) ? prev : [...prev, data]
-            );
-          // Check if it's an event for typing status
-          } else if (isEvent(data)) {
-              if (data.type === 'typing_start') {
-                  setIsTyping(true);
-              } else if (data.type === 'done') {
-                  setIsTyping(false);
-              }
-          } else {
-            console.warn("Invalid data format received:", data);
-          }
+          handleFrame(JSON.parse(event.data));
         } catch (err) {
           console.error("Failed to parse message:", err);
         }
@@ -117,7 +131,7 @@ export const useWebSocket = (conversationId: string) => {
         socketRef.current = null;
       }
     };
-  }, [conversationId, token]);
+  }, [conversationId, token, queryClient]);
 
   const sendMessage = useCallback((payload: OutgoingMessage) => {
     if (socketRef.current && socketRef.current.readyState === WebSocket.OPEN) {
@@ -7,6 +7,13 @@
 
 export type SkillLevelChoices = "beginner" | "intermediate" | "advanced";
 
+export interface ActivityCalendarResponse {
+  since: string;
+  until: string;
+  active_days: string[];
+  current_streak_days: number;
+  longest_streak_days: number;
+}
 export interface CreateUserResponse {
   id: string;
   attributes: UserResponseAttributes;